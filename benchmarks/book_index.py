@@ -0,0 +1,132 @@
+"""Benchmark de importación y consulta del índice local de libros.
+
+Genera volcados sintéticos con el formato de Open Library (misma semilla, mismos
+datos), los importa midiendo registros/s y memoria máxima, y mide la latencia
+de las búsquedas.
+
+Uso: python -m benchmarks.book_index [--works N] [--authors N] [--queries N] [--seed S]
+"""
+import argparse
+import gzip
+import itertools
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+
+from utils.book_index import BookIndex
+
+SYLLABLES = ["a", "ba", "ca", "da", "e", "fe", "ga", "lo", "ma", "ne", "o", "pe", "qui", "ra", "so", "ta",
+             "u", "va", "za", "ri", "mo", "lu", "ni", "ve", "ño", "cha", "tra", "bre", "dor", "sol"]
+NAMES = ["Gabriel", "Julio", "Isabel", "Jorge", "Carmen", "Miguel", "Laura", "Pablo", "Elena", "Mario"]
+SURNAMES = ["García", "Cortázar", "Allende", "Borges", "Laforet", "Cervantes", "Esquivel", "Neruda", "Matute", "Vargas"]
+
+
+def dump_line(record_type, record):
+    return f"{record_type}\t{record['key']}\t1\t2024-01-01T00:00:00\t{json.dumps(record)}\n"
+
+
+def vocabulary(rng, size):
+    """Palabras inventadas con frecuencias de Zipf, como las de los títulos reales"""
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    weights = [1 / (rank + 1) for rank in range(size)]
+    return words, list(itertools.accumulate(weights))
+
+
+def write_dumps(directory, works, authors, seed, vocabulary_size=50_000):
+    """Volcados de autores y obras comprimidos como los de Open Library"""
+    rng = random.Random(seed)
+    words, cum_weights = vocabulary(rng, vocabulary_size)
+
+    def phrase(count):
+        return ' '.join(rng.choices(words, cum_weights=cum_weights, k=count))
+
+    authors_path = os.path.join(directory, "ol_dump_authors.txt.gz")
+    works_path = os.path.join(directory, "ol_dump_works.txt.gz")
+    with gzip.open(authors_path, 'wt', encoding='utf-8') as f:
+        for i in range(authors):
+            f.write(dump_line("/type/author", {
+                "key": f"/authors/OL{i}A", "name": f"{rng.choice(NAMES)} {rng.choice(SURNAMES)}",
+            }))
+    titles = []
+    with gzip.open(works_path, 'wt', encoding='utf-8') as f:
+        for i in range(works):
+            title = phrase(rng.randint(2, 5)).capitalize()
+            titles.append(title)
+            record = {
+                "key": f"/works/OL{i}W",
+                "title": title,
+                "authors": [{"author": {"key": f"/authors/OL{rng.randrange(authors)}A"},
+                             "type": {"key": "/type/author_role"}} for _ in range(rng.randint(1, 2))],
+                "first_publish_date": str(rng.randint(1500, 2024)),
+                "covers": [rng.randint(1, 10_000_000)],
+                "subjects": phrase(3).split(),
+            }
+            if rng.random() < 0.3:
+                record["subtitle"] = phrase(3)
+            f.write(dump_line("/type/work", record))
+    return authors_path, works_path, titles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--works', type=int, default=200_000, help="obras en el volcado sintético")
+    parser.add_argument('--authors', type=int, default=20_000, help="autores en el volcado sintético")
+    parser.add_argument('--queries', type=int, default=5000, help="búsquedas para medir la latencia")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="book-index-") as directory:
+        start = time.perf_counter()
+        authors_path, works_path, titles = write_dumps(directory, args.works, args.authors, args.seed)
+        dump_size = (os.path.getsize(authors_path) + os.path.getsize(works_path)) / 1e6
+        print(f"Volcados: {args.works} obras y {args.authors} autores ({dump_size:.1f} MB comprimidos) "
+              f"en {time.perf_counter() - start:.1f}s")
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        index = BookIndex(os.path.join(directory, "books.db"))
+        index.connect()
+        start = time.perf_counter()
+        for path in (authors_path, works_path):
+            index.import_dump(path)
+        imported = time.perf_counter() - start
+        index.finalize()
+        total = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        records = args.works + args.authors
+        print(f"Importación: {records / imported:.0f} registros/s | con índice FTS: {total:.1f}s | "
+              f"base de datos: {os.path.getsize(index.path) / 1e6:.1f} MB | "
+              f"RSS máximo: {rss_before:.0f} -> {rss_after:.0f} MB")
+
+        rng = random.Random(args.seed + 1)
+        queries = []
+        for _ in range(args.queries):
+            words = rng.choice(titles).split()
+            query = ' '.join(rng.sample(words, min(len(words), rng.randint(1, 3))))
+            if rng.random() < 0.3:
+                query = query[:max(2, len(query) - 2)]  # palabra incompleta: búsqueda por prefijo
+            queries.append(query)
+
+        for page in (0, 3):
+            times = []
+            empty = 0
+            for query in queries:
+                t = time.perf_counter()
+                data = index.search_sync(query, page=page)
+                times.append(time.perf_counter() - t)
+                empty += not data["docs"]
+            times.sort()
+            print(f"Búsquedas (página {page + 1}): p50 {times[len(times) // 2] * 1000:.3f}ms | "
+                  f"p99 {times[int(len(times) * 0.99)] * 1000:.3f}ms | "
+                  f"máx {times[-1] * 1000:.3f}ms | sin resultados: {empty}")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark de autojuego del solucionador de Fama y Toque.
+
+Uso: python -m benchmarks.fama_solver [--games N] [--table data/fama_scores.npy]
+"""
+import argparse
+import random
+import time
+
+from utils.fama_solver import CODES, FamaToqueSolver, build_score_table, load_score_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=500, help="partidas de autojuego")
+    parser.add_argument('--table', default=None, help="ruta de la tabla precalculada (.npy)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = load_score_table(args.table) if args.table else build_score_table()
+    print(f"Tabla de resultados: {table.nbytes / 1e6:.1f} MB en {time.perf_counter() - start:.2f}s")
+
+    solver = FamaToqueSolver(table)
+    rng = random.Random(args.seed)
+    secrets = [rng.choice(CODES) for _ in range(args.games)]
+
+    depths = []
+    suggest_times = []
+    start = time.perf_counter()
+    for secret in secrets:
+        history = []
+        while True:
+            t = time.perf_counter()
+            guess, _ = solver.suggest(history)
+            suggest_times.append(time.perf_counter() - t)
+            famas, toques = solver.score(secret, guess)
+            history.append((guess, famas, toques))
+            if famas == 4:
+                break
+        depths.append(len(history))
+    elapsed = time.perf_counter() - start
+
+    suggest_times.sort()
+    p50 = suggest_times[len(suggest_times) // 2] * 1000
+    p99 = suggest_times[int(len(suggest_times) * 0.99)] * 1000
+    print(f"Partidas: {len(depths)} | Intentos medios: {sum(depths) / len(depths):.3f} | Máximo: {max(depths)}")
+    print(f"Partidas/s: {len(depths) / elapsed:.1f} | Pista p50: {p50:.2f}ms | p99: {p99:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
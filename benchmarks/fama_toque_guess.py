@@ -0,0 +1,66 @@
+"""Micro-benchmark del coste por intento de FamaToque.process_guess.
+
+Mide el tiempo medio de cada número de intento (1..7) sobre muchas partidas
+simultáneas para comprobar que el coste no crece con los intentos previos.
+
+Uso: python -m benchmarks.fama_toque_guess [--games N]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("FAMA_TOQUE_STORE", "memory")
+
+from cogs.fama_toque import FamaToque  # noqa: E402
+from utils.game_store import Game  # noqa: E402
+from utils.message_router import MessageRouter  # noqa: E402
+
+
+class NullChannel:
+    async def send(self, *args, **kwargs):
+        return None
+
+
+async def run(games):
+    bot = SimpleNamespace()
+    bot.router = MessageRouter(bot)
+    cog = FamaToque(bot)
+    channel = NullChannel()
+    rng = random.Random(0)
+
+    players = []
+    for user_id in range(games):
+        digits = rng.sample('0123456789', 4)
+        game = Game(user_id, 0, ''.join(digits))
+        cog.active_games[user_id] = game
+        author = SimpleNamespace(id=user_id, name=f"jugador{user_id}", bot=False)
+        players.append(SimpleNamespace(author=author, channel=channel))
+
+    # Intentos que nunca aciertan para llegar siempre hasta el séptimo
+    timings = []
+    for attempt in range(1, 8):
+        start = time.perf_counter()
+        for message in players:
+            game = cog.active_games[message.author.id]
+            guess = next(c for c in ('0123', '4567', '8901', '2345', '6789', '1357', '2468', '3579')
+                         if c != game.number and c not in game.guesses)
+            await cog.process_guess(message.author, message.channel.send, guess)
+        timings.append((time.perf_counter() - start) / games)
+
+    for attempt, elapsed in enumerate(timings, 1):
+        print(f"Intento {attempt}: {elapsed * 1e6:.1f} µs/intento")
+    print(f"Intentos/s: {games * len(timings) / sum(t * games for t in timings):.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=5000, help="partidas simultáneas")
+    args = parser.parse_args()
+    asyncio.run(run(args.games))
+
+
+if __name__ == '__main__':
+    main()
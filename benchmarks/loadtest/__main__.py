@@ -0,0 +1,376 @@
+"""Prueba de carga sin conexión del bot completo.
+
+Arranca el `commands.Bot` real de main.py contra un sustituto local de la API
+REST de Discord, un gateway simulado y servidores simulados de Open Library,
+yt-dlp y Lavalink, y ejecuta varios escenarios con usuarios virtuales en
+bucle cerrado (cada usuario espera la respuesta antes de enviar el siguiente
+mensaje).
+
+Uso: python -m benchmarks.loadtest [--games N] [--burst N] [--music N] [--purge N] [--lavalink-nodes N]
+                                   [--scenarios fama,libro,...]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import discord
+import wavelink
+
+from benchmarks.loadtest.fake_discord import FakeDiscordREST
+from benchmarks.loadtest.fake_gateway import FakeGateway, wait_for
+from benchmarks.loadtest.mock_lavalink import MockLavalink
+from benchmarks.loadtest.mock_services import MockServices
+
+BOOK_TITLES = ["don quijote", "cien años de soledad", "dune", "1984", "el principito",
+               "rayuela", "la sombra del viento", "ficciones", "pedro páramo", "hamlet"]
+SONGS = ["bohemian rhapsody", "despacito", "la bamba", "bailando", "thriller"]
+
+
+class Recorder:
+    """Latencias por escenario"""
+
+    def __init__(self):
+        self.samples = {}
+        self.elapsed = {}
+
+    async def timed(self, scenario, coro):
+        start = time.perf_counter()
+        await coro
+        self.samples.setdefault(scenario, []).append(time.perf_counter() - start)
+
+    def report(self):
+        print(f"\n{'Escenario':<12} {'Mensajes':>9} {'msg/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+        for scenario, samples in self.samples.items():
+            ordered = sorted(samples)
+            p50 = ordered[len(ordered) // 2] * 1000
+            p99 = ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1000
+            rate = len(samples) / self.elapsed[scenario]
+            print(f"{scenario:<12} {len(samples):>9} {rate:>9.0f} {p50:>8.1f} {p99:>8.1f} {ordered[-1] * 1000:>8.1f}")
+
+
+async def jobs_idle(gateway, timeout=60.0):
+    """Espera a que la cola de trabajos termine lo pendiente (los comandos lentos responden desde ella)"""
+    return await wait_for(lambda: not gateway.bot.jobs.active, timeout=timeout)
+
+
+async def scenario_fama(gateway, recorder, games):
+    """`games` partidas simultáneas de Fama y Toque, cada jugador en su propio canal"""
+    guild = gateway.create_guild(text_channels=games)
+    rng = random.Random(1)
+
+    async def player(channel):
+        user_id = gateway.new_user()
+        await recorder.timed('fama', gateway.send_message(channel, user_id, "!famatoque"))
+        cog = gateway.bot.get_cog('FamaToque')
+        for _ in range(7):
+            if user_id not in cog.active_games:
+                break
+            guess = ''.join(rng.sample('0123456789', 4))
+            await recorder.timed('fama', gateway.send_message(channel, user_id, guess))
+
+    await asyncio.gather(*(player(channel) for channel in guild.text_channels))
+
+
+async def scenario_libro(gateway, recorder, burst):
+    """Ráfaga de búsquedas de libros, muchas de ellas repetidas"""
+    guild = gateway.create_guild(text_channels=min(burst, 50))
+    channels = guild.text_channels
+    rng = random.Random(2)
+    await asyncio.gather(*(
+        recorder.timed('libro', gateway.send_message(channels[i % len(channels)], gateway.new_user(),
+                                                     f"!libro {rng.choice(BOOK_TITLES)}"))
+        for i in range(burst)
+    ))
+    await jobs_idle(gateway)
+
+
+async def scenario_libro_pages(gateway, recorder, burst):
+    """Búsquedas de libros recorridas con los botones: páginas siguientes, detalles y vuelta atrás"""
+    sessions = max(1, burst // 10)
+    guild = gateway.create_guild(text_channels=sessions)
+    requests_before = gateway.services.requests['openlibrary']
+
+    async def session(i, channel):
+        user_id = gateway.new_user()
+        await recorder.timed('libro_pages', gateway.send_message(channel, user_id, f"!libro {BOOK_TITLES[i % len(BOOK_TITLES)]}"))
+        # Si la búsqueda pasó por la cola, los botones llegan al editar el mensaje provisional
+        await wait_for(lambda: str(channel.id) in gateway.rest.components)
+        for label, values in (("Siguiente", ()), ("Siguiente", ()), (None, ("3",)), ("Anterior", ()), ("Cerrar", ())):
+            await recorder.timed('libro_pages', gateway.click(channel, user_id, label, values))
+
+    await asyncio.gather(*(session(i, channel) for i, channel in enumerate(guild.text_channels)))
+    print(f"libro_pages: {gateway.services.requests['openlibrary'] - requests_before} peticiones a Open Library "
+          f"para {sessions} búsquedas paginadas")
+
+
+async def scenario_rubius(gateway, recorder, burst):
+    """Ráfaga de !rubiusnew (servidos desde el listado en memoria)"""
+    guild = gateway.create_guild(text_channels=min(burst, 50))
+    channels = guild.text_channels
+    await asyncio.gather(*(
+        recorder.timed('rubiusnew', gateway.send_message(channels[i % len(channels)], gateway.new_user(), "!rubiusnew"))
+        for i in range(burst)
+    ))
+    await jobs_idle(gateway)
+
+
+async def scenario_slash(gateway, recorder, burst):
+    """Ráfaga de comandos de barra: /ping, /libro y /rubiusnew repartidos entre usuarios y canales"""
+    guild = gateway.create_guild(text_channels=min(burst, 50))
+    channels = guild.text_channels
+    rng = random.Random(5)
+    commands = [("ping", {}), ("rubiusnew", {})] + [("libro", {"query": title}) for title in BOOK_TITLES[:3]]
+    await asyncio.gather(*(
+        recorder.timed('slash', gateway.slash(channels[i % len(channels)], gateway.new_user(), name, **options))
+        for i, (name, options) in enumerate(rng.choice(commands) for _ in range(burst))
+    ))
+    await jobs_idle(gateway)
+
+
+async def scenario_music(gateway, recorder, sessions):
+    """Sesiones de música en `sessions` servidores: cola, pausa, reanudar, saltar y salir"""
+    async def session(i):
+        user_id = gateway.new_user()
+        guild = gateway.create_guild(text_channels=1, voice_members=[user_id])
+        channel = guild.text_channels[0]
+        songs = [f"!play {SONGS[(i + j) % len(SONGS)]}" for j in range(4)]
+        for content in (*songs, "!queue", "!shuffle", "!pause", "!resume", "!skip", "!skip", "!leave"):
+            await recorder.timed('music', gateway.send_message(channel, user_id, content))
+
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+
+
+async def scenario_failover(gateway, recorder, sessions):
+    """Tumba el nodo Lavalink con más players y mide cuánto tardan en reanudarse en otro nodo"""
+    lavalinks = gateway.lavalinks
+    if len(lavalinks) < 2:
+        print("failover: se necesitan al menos 2 nodos (--lavalink-nodes)")
+        return
+
+    guilds = {}
+    for i in range(sessions):
+        user_id = gateway.new_user()
+        guild = gateway.create_guild(text_channels=1, voice_members=[user_id])
+        await gateway.send_message(guild.text_channels[0], user_id, f"!play {SONGS[i % len(SONGS)]}")
+        guilds[guild] = user_id
+
+    nodes = wavelink.NodePool.nodes
+    victim_id = max(nodes, key=lambda node_id: len(nodes[node_id].players))
+    victim = lavalinks[victim_id]
+    moved = len(nodes[victim_id].players)
+    survivors = [mock for node_id, mock in lavalinks.items() if node_id != victim_id]
+
+    def resumed():
+        # Cada servidor vuelve a tener una pista sonando en un nodo vivo
+        return all(any((mock.players.get(str(guild.id)) or {}).get("track") for mock in survivors)
+                   for guild in guilds)
+
+    start = time.perf_counter()
+    await victim.stop()
+    ok = await wait_for(resumed, timeout=30.0)
+    recorder.samples.setdefault('failover', []).append(time.perf_counter() - start)
+    print(f"failover: {moved} players en el nodo '{victim_id}' -> "
+          f"{'reanudados' if ok else 'NO reanudados'} en {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    # El nodo vuelve y el pool lo reconecta
+    start = time.perf_counter()
+    await victim.start(port=victim.port)
+    ok = await wait_for(lambda: victim.sockets and nodes[victim_id].status is wavelink.NodeStatus.CONNECTED,
+                        timeout=90.0)
+    print(f"failover: nodo '{victim_id}' {'reconectado' if ok else 'NO reconectado'} "
+          f"en {time.perf_counter() - start:.1f}s")
+
+    for guild, user_id in guilds.items():
+        await gateway.send_message(guild.text_channels[0], user_id, "!leave")
+
+
+async def scenario_purge(gateway, recorder, count):
+    """!limpiartodo en un canal con `count` mensajes: la mitad de hace un mes y la otra mitad recientes"""
+    guild = gateway.create_guild(text_channels=1)
+    channel = guild.text_channels[0]
+    rest = gateway.rest
+    rest.fill_history(channel.id, count // 2, datetime.timedelta(days=45))
+    rest.fill_history(channel.id, count - count // 2, datetime.timedelta(days=1))
+    calls_before = rest.calls.copy()
+
+    await recorder.timed('purge', gateway.send_message(channel, gateway.new_user(), "!limpiartodo",
+                                                        manage_messages=True))
+    await jobs_idle(gateway, timeout=300.0)
+    calls = rest.calls - calls_before
+    remaining = len(rest.history.get(str(channel.id), []))
+    print(f"purge: quedan {remaining}/{count} mensajes | "
+          f"borrado masivo: {calls['POST /channels/{channel}/messages/bulk-delete']} | "
+          f"borrado individual: {calls['DELETE /channels/{channel}/messages/{message}']} | "
+          f"páginas de historial: {calls['GET /channels/{channel}/messages']}")
+
+
+async def scenario_serverinfo(gateway, recorder, burst):
+    """Ráfaga de !serverinfo en pocos servidores (dueño y recuentos pedidos a la API) y un !memoria"""
+    guilds = [gateway.create_guild(text_channels=1) for _ in range(10)]
+    calls_before = gateway.rest.calls.copy()
+    await asyncio.gather(*(
+        recorder.timed('serverinfo', gateway.send_message(guilds[i % len(guilds)].text_channels[0],
+                                                          gateway.new_user(), "!serverinfo"))
+        for i in range(burst)
+    ))
+    await recorder.timed('serverinfo', gateway.send_message(guilds[0].text_channels[0], gateway.new_user(), "!memoria"))
+    calls = gateway.rest.calls - calls_before
+    print(f"serverinfo: {calls['GET /guilds/{guild}']} consultas del servidor para {burst} comandos")
+
+
+SCENARIOS = {
+    "fama": (scenario_fama, "games"),
+    "libro": (scenario_libro, "burst"),
+    "libro_pages": (scenario_libro_pages, "burst"),
+    "rubiusnew": (scenario_rubius, "burst"),
+    "music": (scenario_music, "music"),
+    "failover": (scenario_failover, "music"),
+    "purge": (scenario_purge, "purge"),
+    "serverinfo": (scenario_serverinfo, "burst"),
+    "slash": (scenario_slash, "burst"),
+}
+
+
+async def watch_loop_lag(samples, interval=0.05):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+async def run(args):
+    rest = FakeDiscordREST(latency=args.rest_latency / 1000)
+    services = MockServices(openlibrary_latency=args.api_latency / 1000, ytdl_latency=args.ytdl_latency / 1000)
+    lavalinks = {f"mock-{i + 1}": MockLavalink(search_latency=args.api_latency / 1000,
+                                               track_seconds=args.track_seconds)
+                 for i in range(args.lavalink_nodes)}
+    await rest.start()
+    await services.start()
+    for lavalink in lavalinks.values():
+        await lavalink.start()
+
+    # Configuración del bot antes de importar main.py
+    discord.http.Route.BASE = rest.base_url
+    os.environ.update({
+        "LAVALINK_NODES": json.dumps([{"id": node_id, "uri": f"127.0.0.1:{lavalink.port}",
+                                       "password": lavalink.password} for node_id, lavalink in lavalinks.items()]),
+        "LAVALINK_HEALTH_INTERVAL": "0.5",
+        "METRICS_PORT": "0",
+        "PURGE_PROGRESS_INTERVAL": "0.5",
+        "DISCORD_CACHE_PROFILE": args.cache_profile,
+    })
+    if not args.cooldowns:
+        # Sin --cooldowns se miden los comandos sin los límites por usuario y servidor
+        os.environ["COMMAND_COOLDOWNS"] = json.dumps({
+            command: {"user": [1_000_000, 1], "guild": [1_000_000, 1]} for command in ("libro", "rubiusnew", "play")
+        })
+    os.chdir(tempfile.mkdtemp(prefix="loadtest-"))
+    import main
+    from utils.metrics import (ADMISSION_SHED, COMMAND_ERRORS, COOLDOWN_REJECTIONS, JOB_DURATION, JOB_WAIT,
+                               JOBS_FINISHED)
+
+    bot = main.bot
+    recorder = Recorder()
+    lag_samples = []
+    async with bot:
+        await bot.login("loadtest-token")  # ejecuta setup_hook y carga los cogs
+        gateway = FakeGateway(bot)
+        gateway.lavalinks = lavalinks
+        gateway.rest = rest
+        gateway.services = services
+        gateway.connect()
+
+        # Apuntar los cogs a los servidores simulados
+        bot.get_cog('BookSearch').api_url = services.openlibrary_url
+        bot.get_cog('RubiusVideos').extract_channel = services.extract_channel
+        await wait_for(lambda: len(wavelink.NodePool.nodes) == len(lavalinks) and all(
+            node.status is wavelink.NodeStatus.CONNECTED for node in wavelink.NodePool.nodes.values()))
+        await wait_for(lambda: bot.get_cog('RubiusVideos').snapshot is not None)
+
+        watchdog = asyncio.create_task(watch_loop_lag(lag_samples))
+        started = time.perf_counter()
+        for name in args.scenarios:
+            scenario, size_arg = SCENARIOS[name]
+            start = time.perf_counter()
+            await scenario(gateway, recorder, getattr(args, size_arg))
+            recorder.elapsed[name] = time.perf_counter() - start
+        total_elapsed = time.perf_counter() - started
+        watchdog.cancel()
+
+        recorder.report()
+        total = sum(len(samples) for samples in recorder.samples.values())
+        lag_samples.sort()
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"\nTotal: {total} mensajes en {total_elapsed:.2f}s ({total / total_elapsed:.0f} msg/s)")
+        if lag_samples:
+            print(f"Retraso del event loop: p50 {lag_samples[len(lag_samples) // 2] * 1000:.1f}ms | "
+                  f"p99 {lag_samples[int(len(lag_samples) * 0.99)] * 1000:.1f}ms | máx {lag_samples[-1] * 1000:.1f}ms")
+        print(f"RSS máximo: {peak_rss:.0f} MB")
+        errors = {f"{cog}.{command}": count for (cog, command), count in COMMAND_ERRORS.values.items()}
+        print(f"Comandos con error: {sum(errors.values())} {errors if errors else ''}")
+        shed = {backend: count for (backend,), count in ADMISSION_SHED.values.items()}
+        rejected = {f"{command}/{scope}": count for (command, scope), count in COOLDOWN_REJECTIONS.values.items()}
+        print(f"Rechazados por saturación: {sum(shed.values())} {shed if shed else ''} | "
+              f"por cooldown: {sum(rejected.values())} {rejected if rejected else ''}")
+        print(f"Comandos de barra: {len(rest.app_commands)} | "
+              f"sincronizaciones: {rest.calls['PUT /applications/{application}/commands']}")
+        print(f"Llamadas REST: {sum(rest.calls.values())} | Open Library: {services.requests['openlibrary']} | "
+              f"yt-dlp: {services.requests['ytdl']}")
+        finished = {f"{kind}/{status}": count for (kind, status), count in JOBS_FINISHED.values.items()}
+        print(f"Trabajos: {sum(finished.values())} {finished if finished else ''}")
+        for kind in sorted({key[0] for key in JOB_DURATION.series}):
+            print(f"  {kind:<10} espera p50 {JOB_WAIT.quantile(0.5, kind=kind) * 1000:.1f}ms "
+                  f"p99 {JOB_WAIT.quantile(0.99, kind=kind) * 1000:.1f}ms | "
+                  f"duración p50 {JOB_DURATION.quantile(0.5, kind=kind) * 1000:.1f}ms "
+                  f"p99 {JOB_DURATION.quantile(0.99, kind=kind) * 1000:.1f}ms")
+        for node_id, lavalink in lavalinks.items():
+            print(f"Lavalink {node_id}: {lavalink.requests}")
+        if args.verbose:
+            for route, count in rest.calls.most_common():
+                print(f"  {count:>7} {route}")
+
+        await bot.close()
+
+    for lavalink in lavalinks.values():
+        await lavalink.stop()
+    await services.stop()
+    await rest.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        type=lambda value: [name for name in value.split(',') if name])
+    parser.add_argument('--games', type=int, default=2000, help="partidas simultáneas de Fama y Toque")
+    parser.add_argument('--burst', type=int, default=500, help="tamaño de las ráfagas de !libro y !rubiusnew")
+    parser.add_argument('--music', type=int, default=50, help="sesiones de música simultáneas")
+    parser.add_argument('--purge', type=int, default=2000, help="mensajes en el canal de !limpiartodo")
+    parser.add_argument('--lavalink-nodes', type=int, default=2, help="nodos Lavalink simulados")
+    parser.add_argument('--rest-latency', type=float, default=0.0, help="latencia simulada de la API REST (ms)")
+    parser.add_argument('--api-latency', type=float, default=50.0, help="latencia de Open Library y Lavalink (ms)")
+    parser.add_argument('--ytdl-latency', type=float, default=500.0, help="duración de la extracción de yt-dlp (ms)")
+    parser.add_argument('--track-seconds', type=float, default=30.0)
+    parser.add_argument('--cache-profile', default='default', choices=('default', 'low_memory'),
+                        help="perfil de cachés de discord.py")
+    parser.add_argument('--cooldowns', action='store_true', help="aplica los cooldowns por usuario y servidor")
+    parser.add_argument('-v', '--verbose', action='store_true', help="muestra las llamadas REST por ruta")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(unknown)}")
+
+    sys.path.insert(0, os.getcwd())
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""Sustituto local de la API REST de Discord.
+
+Responde a las rutas que usa el bot (enviar/editar/borrar mensajes, historial,
+typing, usuario propio, respuestas a interacciones, sincronización de comandos
+de barra) con datos sintéticos y
+cuenta las llamadas por ruta.
+"""
+import asyncio
+import datetime
+import itertools
+import json
+from collections import Counter
+
+import discord
+from aiohttp import web
+
+API_PREFIX = '/api/v10'
+
+BOT_USER = {
+    "id": "100000000000000001",
+    "username": "loadtest-bot",
+    "discriminator": "0000",
+    "global_name": None,
+    "avatar": None,
+    "bot": True,
+    "flags": 0,
+}
+
+OWNER_USER = {
+    "id": "100000000000000002",
+    "username": "loadtest-owner",
+    "discriminator": "0000",
+    "global_name": None,
+    "avatar": None,
+}
+
+
+def snowflake_factory(start=200000000000000000):
+    return (str(value) for value in itertools.count(start))
+
+
+def json_response(data, status=200):
+    # discord.py exige exactamente "application/json", sin charset
+    return web.Response(body=json.dumps(data).encode(), status=status, content_type='application/json')
+
+
+def timestamp():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class FakeDiscordREST:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.ids = snowflake_factory()
+        self.sequence = itertools.count()
+        self.calls = Counter()
+        self.history = {}  # {channel_id: [mensajes]} para las rutas de historial
+        self.components = {}  # {channel_id: (message_id, componentes)} del último mensaje con botones
+        self.interactions = {}  # {token: Future} respuestas que espera el gateway simulado
+        self.app_commands = []  # último árbol de comandos de barra sincronizado
+        self.runner = None
+        self.port = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}{API_PREFIX}"
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        p = API_PREFIX
+        app.router.add_get(f'{p}/users/@me', self.handle_me)
+        app.router.add_get(f'{p}/oauth2/applications/@me', self.handle_application)
+        app.router.add_post(f'{p}/channels/{{channel}}/messages', self.handle_send)
+        app.router.add_get(f'{p}/channels/{{channel}}/messages', self.handle_history)
+        app.router.add_post(f'{p}/channels/{{channel}}/messages/bulk-delete', self.handle_bulk_delete)
+        app.router.add_patch(f'{p}/channels/{{channel}}/messages/{{message}}', self.handle_edit)
+        app.router.add_delete(f'{p}/channels/{{channel}}/messages/{{message}}', self.handle_delete)
+        app.router.add_post(f'{p}/channels/{{channel}}/typing', self.handle_no_content)
+        app.router.add_post(f'{p}/interactions/{{interaction}}/{{token}}/callback', self.handle_interaction)
+        app.router.add_get(f'{p}/webhooks/{{application}}/{{token}}/messages/@original', self.handle_original)
+        app.router.add_patch(f'{p}/webhooks/{{application}}/{{token}}/messages/@original', self.handle_followup)
+        app.router.add_post(f'{p}/webhooks/{{application}}/{{token}}', self.handle_followup)
+        app.router.add_put(f'{p}/applications/{{application}}/commands', self.handle_sync_commands)
+        app.router.add_get(f'{p}/guilds/{{guild}}', self.handle_guild)
+        app.router.add_get(f'{p}/guilds/{{guild}}/members/{{user}}', self.handle_member)
+        app.router.add_route('*', f'{p}/{{tail:.*}}', self.handle_unknown)
+        return app
+
+    async def start(self):
+        self.runner = web.AppRunner(self.make_app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.calls[f"{request.method} {route.removeprefix(API_PREFIX)}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def fill_history(self, channel_id, count, age):
+        """Añade `count` mensajes antiguos al historial del canal, repartidos en `age` (timedelta) hacia atrás"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        step = age / max(count, 1)
+        messages = []
+        for i in range(count):
+            created = now - age + step * i
+            payload = self.message_payload(str(channel_id), {"content": f"mensaje {i}"}, author=OWNER_USER)
+            payload["id"] = self.message_id(created)
+            payload["timestamp"] = created.isoformat()
+            messages.append(payload)
+        history = self.history.setdefault(str(channel_id), [])
+        history.extend(messages)
+        history.sort(key=lambda m: int(m["id"]), reverse=True)
+
+    def message_id(self, created=None):
+        # Snowflake con la fecha real: discord.py calcula `created_at` a partir del ID
+        created = created or datetime.datetime.now(datetime.timezone.utc)
+        return str(discord.utils.time_snowflake(created) + next(self.sequence) % (1 << 22))
+
+    def message_payload(self, channel_id, data, author=BOT_USER):
+        return {
+            "id": self.message_id(),
+            "channel_id": channel_id,
+            "author": author,
+            "content": data.get("content") or "",
+            "embeds": data.get("embeds") or [],
+            "attachments": [],
+            "mentions": [],
+            "mention_roles": [],
+            "mention_everyone": False,
+            "pinned": False,
+            "tts": False,
+            "timestamp": timestamp(),
+            "edited_timestamp": None,
+            "type": 0,
+            "flags": 0,
+            "components": data.get("components") or [],
+        }
+
+    async def read_payload(self, request):
+        if request.content_type == 'application/json':
+            return await request.json()
+        if request.content_type.startswith('multipart/'):
+            return {}
+        return {}
+
+    async def handle_me(self, request):
+        return json_response(BOT_USER)
+
+    async def handle_application(self, request):
+        return json_response({
+            "id": BOT_USER["id"], "name": BOT_USER["username"], "icon": None, "description": "",
+            "rpc_origins": [], "bot_public": True, "bot_require_code_grant": False, "owner": OWNER_USER,
+            "summary": "", "verify_key": "loadtest", "team": None, "flags": 0,
+        })
+
+    async def handle_send(self, request):
+        data = await self.read_payload(request)
+        payload = self.message_payload(request.match_info['channel'], data)
+        self.remember_components(payload, data)
+        return json_response(payload)
+
+    async def handle_edit(self, request):
+        data = await self.read_payload(request)
+        payload = self.message_payload(request.match_info['channel'], data)
+        payload["id"] = request.match_info['message']
+        payload["edited_timestamp"] = timestamp()
+        self.remember_components(payload, data)
+        return json_response(payload)
+
+    def remember_components(self, payload, data):
+        if "components" in data:
+            self.components[payload["channel_id"]] = (payload["id"], data["components"])
+
+    def resolve(self, token, response):
+        future = self.interactions.pop(token, None)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    async def handle_interaction(self, request):
+        data = await self.read_payload(request)
+        # 5 y 6: la interacción se confirma y la respuesta llega después por el webhook
+        if data.get("type") not in (5, 6):
+            self.resolve(request.match_info['token'], data)
+        return web.Response(status=204)
+
+    async def handle_followup(self, request):
+        data = await self.read_payload(request)
+        self.resolve(request.match_info['token'], data)
+        return json_response(self.message_payload("0", data))
+
+    async def handle_original(self, request):
+        return json_response(self.message_payload("0", {}))
+
+    async def handle_sync_commands(self, request):
+        data = await request.json()
+        self.app_commands = [dict(command, id=next(self.ids), application_id=request.match_info['application'],
+                                  version=next(self.ids)) for command in data]
+        return json_response(self.app_commands)
+
+    async def handle_history(self, request):
+        messages = self.history.get(request.match_info['channel'], [])
+        limit = int(request.query.get('limit', 50))
+        before = request.query.get('before')
+        if before:
+            messages = [m for m in messages if int(m["id"]) < int(before)]
+        return json_response(messages[:limit])
+
+    async def handle_bulk_delete(self, request):
+        data = await request.json()
+        self.forget(request.match_info['channel'], {str(message_id) for message_id in data.get("messages", [])})
+        return web.Response(status=204)
+
+    async def handle_delete(self, request):
+        self.forget(request.match_info['channel'], {request.match_info['message']})
+        return web.Response(status=204)
+
+    def forget(self, channel_id, message_ids):
+        if channel_id in self.history:
+            self.history[channel_id] = [m for m in self.history[channel_id] if m["id"] not in message_ids]
+
+    async def handle_guild(self, request):
+        guild_id = request.match_info['guild']
+        return json_response({
+            "id": guild_id, "name": f"loadtest-{guild_id}", "icon": None, "owner_id": BOT_USER["id"],
+            "features": [], "roles": [], "emojis": [], "stickers": [],
+            "approximate_member_count": 1000, "approximate_presence_count": 250,
+        })
+
+    async def handle_member(self, request):
+        user = dict(BOT_USER, id=request.match_info['user'], username=f"user-{request.match_info['user']}")
+        return json_response({"user": user, "roles": [], "joined_at": timestamp(), "deaf": False, "mute": False})
+
+    async def handle_no_content(self, request):
+        return web.Response(status=204)
+
+    async def handle_unknown(self, request):
+        return json_response({"message": "Unknown route", "code": 0}, status=404)
@@ -0,0 +1,218 @@
+"""Gateway simulado: alimenta al bot con eventos sintéticos sin conexión a Discord.
+
+Crea servidores, canales y miembros a través del mismo parser de eventos que
+usa discord.py, y entrega los mensajes al `on_message` real del bot
+esperando a que termine para poder medir la latencia extremo a extremo.
+"""
+import asyncio
+import datetime
+import itertools
+
+import discord
+
+from benchmarks.loadtest.fake_discord import BOT_USER, snowflake_factory
+
+ADMINISTRATOR = str(discord.Permissions.all().value)
+
+
+def user_payload(user_id):
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0000",
+            "global_name": None, "avatar": None, "bot": False}
+
+
+def member_payload(user, roles=()):
+    return {"user": user, "roles": list(roles), "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False, "mute": False, "flags": 0}
+
+
+class FakeWebSocket:
+    """Lo mínimo de DiscordWebSocket que usan el bot y wavelink (estado de voz)"""
+
+    latency = 0.001
+    open = False
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def is_ratelimited(self):
+        return False
+
+    async def change_presence(self, **kwargs):
+        pass
+
+    async def voice_state(self, guild_id, channel_id, self_mute=False, self_deaf=False):
+        # Discord responde con VOICE_STATE_UPDATE y VOICE_SERVER_UPDATE
+        self.gateway.voice_update(guild_id, channel_id)
+
+
+class FakeGateway:
+    def __init__(self, bot):
+        self.bot = bot
+        self.state = bot._connection
+        self.ids = snowflake_factory(300000000000000000)
+        self.users = itertools.count(400000000000000000)
+        self.voice_sessions = itertools.count(1)
+        self.ws = FakeWebSocket(self)
+        # Servidores simulados para los escenarios que los manipulan
+        self.rest = None  # FakeDiscordREST
+        self.services = None  # MockServices
+        self.lavalinks = {}  # {id del nodo: MockLavalink}
+
+    def connect(self):
+        """Sustituye al websocket real y marca el bot como listo"""
+        self.bot.ws = self.ws
+        self.bot._ready.set()
+
+    def snowflake(self):
+        """ID con la fecha actual: discord.py deduce de él la antigüedad de mensajes e interacciones"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return str(discord.utils.time_snowflake(now) + int(next(self.ids)) % (1 << 22))
+
+    def new_user(self):
+        return next(self.users)
+
+    def create_guild(self, text_channels=1, voice_members=()):
+        """Crea un servidor con `text_channels` canales de texto y un canal de voz con `voice_members`"""
+        guild_id = next(self.ids)
+        admin_role = next(self.ids)
+        channels = [{"id": next(self.ids), "type": 0, "name": f"texto-{i}", "position": i,
+                     "permission_overwrites": [], "nsfw": False, "parent_id": None}
+                    for i in range(text_channels)]
+        voice_channel = {"id": next(self.ids), "type": 2, "name": "voz", "position": text_channels,
+                         "permission_overwrites": [], "bitrate": 64000, "user_limit": 0, "parent_id": None}
+        members = [member_payload(BOT_USER, roles=[admin_role])]
+        members += [member_payload(user_payload(user_id)) for user_id in voice_members]
+        voice_states = [{"user_id": str(user_id), "channel_id": voice_channel["id"], "session_id": f"s{user_id}",
+                         "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+                         "self_video": False, "suppress": False, "request_to_speak_timestamp": None}
+                        for user_id in voice_members]
+        self.state.parse_guild_create({
+            "id": guild_id,
+            "name": f"Servidor {guild_id}",
+            "owner_id": BOT_USER["id"],
+            "member_count": len(members),
+            "large": False,
+            "unavailable": False,
+            "features": [],
+            "emojis": [],
+            "stickers": [],
+            "roles": [
+                {"id": guild_id, "name": "@everyone", "permissions": "104324673", "position": 0,
+                 "color": 0, "hoist": False, "managed": False, "mentionable": False},
+                {"id": admin_role, "name": "admin", "permissions": ADMINISTRATOR, "position": 1,
+                 "color": 0, "hoist": False, "managed": False, "mentionable": False},
+            ],
+            "channels": channels + [voice_channel],
+            "members": members,
+            "voice_states": voice_states,
+            "threads": [],
+            "stage_instances": [],
+            "guild_scheduled_events": [],
+        })
+        return self.bot.get_guild(int(guild_id))
+
+    def voice_update(self, guild_id, channel_id):
+        session_id = f"session-{next(self.voice_sessions)}"
+        self.state.parse_voice_state_update({
+            "guild_id": str(guild_id), "channel_id": str(channel_id) if channel_id else None,
+            "user_id": BOT_USER["id"], "session_id": session_id, "deaf": False, "mute": False,
+            "self_deaf": False, "self_mute": False, "self_video": False, "suppress": False,
+            "request_to_speak_timestamp": None, "member": member_payload(BOT_USER),
+        })
+        if channel_id:
+            self.state.parse_voice_server_update({
+                "guild_id": str(guild_id), "token": "mock-token", "endpoint": "mock.discord.media:443",
+            })
+
+    async def send_message(self, channel, user_id, content, manage_messages=False):
+        """Entrega un MESSAGE_CREATE y espera a que el bot termine de procesarlo"""
+        roles = [str(role.id) for role in channel.guild.roles[1:]] if manage_messages else []
+        data = {
+            # Como los del historial simulado: !limpiartodo borra lo anterior al comando
+            "id": self.snowflake(),
+            "channel_id": str(channel.id),
+            "guild_id": str(channel.guild.id),
+            "author": user_payload(user_id),
+            "member": member_payload(user_payload(user_id), roles=roles),
+            "content": content,
+            "embeds": [], "attachments": [], "mentions": [], "mention_roles": [],
+            "mention_everyone": False, "pinned": False, "tts": False, "type": 0, "flags": 0,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "edited_timestamp": None,
+        }
+        data["member"].pop("user")
+        message = discord.Message(channel=channel, data=data, state=self.state)
+        if self.state._messages is not None:
+            self.state._messages.append(message)
+        await self.bot.on_message(message)
+
+    def component_id(self, channel, label=None):
+        """custom_id del botón `label` (o del menú si no se indica) del último mensaje con componentes"""
+        message_id, rows = self.rest.components[str(channel.id)]
+        for row in rows:
+            for component in row["components"]:
+                if (label is None and component["type"] == 3) or (label is not None and component.get("label") == label):
+                    return message_id, component["type"], component["custom_id"]
+        raise LookupError(f"No hay ningún componente '{label}' en el canal {channel.id}")
+
+    async def click(self, channel, user_id, label=None, values=()):
+        """Entrega un INTERACTION_CREATE (botón o menú) y espera la respuesta del bot"""
+        message_id, component_type, custom_id = self.component_id(channel, label)
+        interaction_id = next(self.ids)
+        token = f"token-{interaction_id}"
+        future = asyncio.get_running_loop().create_future()
+        self.rest.interactions[token] = future
+        data = {"custom_id": custom_id, "component_type": component_type}
+        if component_type == 3:
+            data["values"] = list(values)
+        self.state.parse_interaction_create({
+            "id": interaction_id,
+            "application_id": BOT_USER["id"],
+            "type": 3,
+            "token": token,
+            "version": 1,
+            "guild_id": str(channel.guild.id),
+            "channel_id": str(channel.id),
+            "channel": {"id": str(channel.id), "type": 0},
+            "member": dict(member_payload(user_payload(user_id)), permissions="0"),
+            "message": self.rest.message_payload(str(channel.id), {}, author=BOT_USER) | {"id": message_id},
+            "data": data,
+        })
+        return await future
+
+    async def slash(self, channel, user_id, name, **options):
+        """Entrega un comando de barra (INTERACTION_CREATE de tipo 2) y espera la respuesta del bot"""
+        command = next(command for command in self.rest.app_commands if command["name"] == name)
+        types = {option["name"]: option["type"] for option in command.get("options", [])}
+        # Las interacciones caducan a los 15 minutos de la fecha de su ID
+        interaction_id = self.snowflake()
+        token = f"token-{interaction_id}"
+        future = asyncio.get_running_loop().create_future()
+        self.rest.interactions[token] = future
+        self.state.parse_interaction_create({
+            "id": interaction_id,
+            "application_id": BOT_USER["id"],
+            "type": 2,
+            "token": token,
+            "version": 1,
+            "guild_id": str(channel.guild.id),
+            "channel_id": str(channel.id),
+            "channel": {"id": str(channel.id), "type": 0},
+            "member": dict(member_payload(user_payload(user_id)), permissions="0"),
+            "data": {
+                "id": command["id"], "name": name, "type": 1,
+                "options": [{"name": key, "type": types[key], "value": value} for key, value in options.items()],
+            },
+        })
+        return await future
+
+
+async def wait_for(predicate, timeout=10.0, interval=0.05):
+    """Espera hasta que `predicate()` sea cierto o se agote el tiempo"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        if loop.time() > deadline:
+            return False
+        await asyncio.sleep(interval)
+    return True
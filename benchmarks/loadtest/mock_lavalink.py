@@ -0,0 +1,193 @@
+"""Servidor Lavalink (API v3) simulado para pruebas sin conexión.
+
+Implementa lo que usa wavelink: versión, websocket con `ready`, búsqueda de
+pistas, decodificación y actualización/borrado de players. Las pistas
+"terminan" tras `track_seconds` y se notifica por el websocket.
+
+Uso independiente: python -m benchmarks.loadtest.mock_lavalink [--port 2333]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+
+from aiohttp import web
+
+
+def encode_track(info):
+    return base64.b64encode(json.dumps(info).encode()).decode()
+
+
+def decode_track(encoded):
+    return json.loads(base64.b64decode(encoded))
+
+
+class MockLavalink:
+    def __init__(self, password="youshallnotpass", search_latency=0.02, track_seconds=30.0, results=5):
+        self.password = password
+        self.search_latency = search_latency
+        self.track_seconds = track_seconds
+        self.results = results
+        self.session_id = "mock-session"
+        self.sockets = set()
+        self.players = {}  # {guild_id: datos del player}
+        self.track_tasks = {}
+        self.requests = {"search": 0, "play": 0, "update": 0, "destroy": 0}
+        self.runner = None
+        self.port = None
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get('/', self.handle_websocket)
+        app.router.add_get('/version', self.handle_version)
+        app.router.add_get('/v3/loadtracks', self.handle_loadtracks)
+        app.router.add_get('/v3/decodetrack', self.handle_decodetrack)
+        app.router.add_patch('/v3/sessions/{session}/players/{guild}', self.handle_update_player)
+        app.router.add_delete('/v3/sessions/{session}/players/{guild}', self.handle_destroy_player)
+        return app
+
+    async def start(self, host='127.0.0.1', port=0):
+        self.runner = web.AppRunner(self.make_app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        for task in self.track_tasks.values():
+            task.cancel()
+        for ws in list(self.sockets):
+            await ws.close()
+        if self.runner:
+            await self.runner.cleanup()
+
+    def check_auth(self, request):
+        if request.headers.get('Authorization') != self.password:
+            raise web.HTTPUnauthorized()
+
+    async def handle_version(self, request):
+        return web.Response(text="3.7.11")
+
+    async def handle_websocket(self, request):
+        self.check_auth(request)
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        await ws.send_json({"op": "ready", "resumed": False, "sessionId": self.session_id})
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            self.sockets.discard(ws)
+        return ws
+
+    async def broadcast(self, payload):
+        for ws in list(self.sockets):
+            if not ws.closed:
+                await ws.send_json(payload)
+
+    def make_track(self, query, index):
+        identifier = hashlib.sha1(f"{query}:{index}".encode()).hexdigest()[:11]
+        info = {
+            "identifier": identifier,
+            "isSeekable": True,
+            "author": "Mock",
+            "length": int(self.track_seconds * 1000),
+            "isStream": False,
+            "position": 0,
+            "title": f"{query} ({index + 1})",
+            "uri": f"https://www.youtube.com/watch?v={identifier}",
+            "sourceName": "youtube",
+        }
+        return {"encoded": encode_track(info), "info": info}
+
+    async def handle_loadtracks(self, request):
+        self.check_auth(request)
+        self.requests["search"] += 1
+        identifier = request.query.get('identifier', '')
+        query = identifier.split(':', 1)[-1]
+        await asyncio.sleep(self.search_latency)
+        tracks = [self.make_track(query, i) for i in range(self.results)]
+        return web.json_response({"loadType": "SEARCH_RESULT", "playlistInfo": {}, "tracks": tracks})
+
+    async def handle_decodetrack(self, request):
+        self.check_auth(request)
+        encoded = request.query['encodedTrack']
+        return web.json_response({"encoded": encoded, "info": decode_track(encoded)})
+
+    async def handle_update_player(self, request):
+        self.check_auth(request)
+        guild_id = request.match_info['guild']
+        data = await request.json()
+        player = self.players.setdefault(guild_id, {
+            "guildId": guild_id, "track": None, "volume": 100, "paused": False,
+            "voice": {}, "filters": {}, "state": {"time": 0, "position": 0, "connected": True, "ping": 0},
+        })
+        self.requests["update"] += 1
+
+        if 'voice' in data:
+            player["voice"] = data['voice']
+        if 'paused' in data:
+            player["paused"] = data['paused']
+        if 'volume' in data:
+            player["volume"] = data['volume']
+        if 'encodedTrack' in data:
+            no_replace = request.query.get('noReplace') == 'True'
+            if not (no_replace and player["track"]):
+                self.requests["play"] += 1
+                self.start_track(guild_id, player, data['encodedTrack'])
+
+        return web.json_response(player)
+
+    def start_track(self, guild_id, player, encoded):
+        previous = self.track_tasks.pop(guild_id, None)
+        if previous:
+            previous.cancel()
+        if encoded is None:
+            player["track"] = None
+            return
+        player["track"] = {"encoded": encoded, "info": decode_track(encoded)}
+        self.track_tasks[guild_id] = asyncio.create_task(self.play_track(guild_id, encoded))
+
+    async def play_track(self, guild_id, encoded):
+        await self.broadcast({"op": "event", "type": "TrackStartEvent", "guildId": guild_id, "encodedTrack": encoded})
+        await asyncio.sleep(self.track_seconds)
+        player = self.players.get(guild_id)
+        if player:
+            player["track"] = None
+        self.track_tasks.pop(guild_id, None)
+        await self.broadcast({"op": "event", "type": "TrackEndEvent", "guildId": guild_id,
+                              "encodedTrack": encoded, "reason": "FINISHED"})
+
+    async def handle_destroy_player(self, request):
+        self.check_auth(request)
+        guild_id = request.match_info['guild']
+        self.requests["destroy"] += 1
+        task = self.track_tasks.pop(guild_id, None)
+        if task:
+            task.cancel()
+        self.players.pop(guild_id, None)
+        return web.Response(status=204)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2333)
+    parser.add_argument('--password', default='youshallnotpass')
+    parser.add_argument('--track-seconds', type=float, default=30.0)
+    args = parser.parse_args()
+
+    async def run():
+        server = MockLavalink(password=args.password, track_seconds=args.track_seconds)
+        port = await server.start(args.host, args.port)
+        print(f"Lavalink simulado escuchando en {args.host}:{port}")
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
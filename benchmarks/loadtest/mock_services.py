@@ -0,0 +1,76 @@
+"""Servidores simulados de Open Library y del listado de canal de yt-dlp"""
+import asyncio
+import json
+import urllib.request
+
+from aiohttp import web
+
+
+class MockServices:
+    def __init__(self, openlibrary_latency=0.05, ytdl_latency=0.5):
+        self.openlibrary_latency = openlibrary_latency
+        self.ytdl_latency = ytdl_latency
+        self.requests = {"openlibrary": 0, "ytdl": 0}
+        self.runner = None
+        self.port = None
+
+    @property
+    def openlibrary_url(self):
+        return f"http://127.0.0.1:{self.port}/search.json"
+
+    @property
+    def ytdl_url(self):
+        return f"http://127.0.0.1:{self.port}/ytdl/channel"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/search.json', self.handle_search)
+        app.router.add_get('/ytdl/channel', self.handle_channel)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def handle_search(self, request):
+        self.requests["openlibrary"] += 1
+        query = request.query.get('q', '')
+        limit = int(request.query.get('limit', 5))
+        offset = int(request.query.get('offset', 0))
+        fields = request.query.get('fields')
+        await asyncio.sleep(self.openlibrary_latency)
+        docs = [{
+            "key": f"/works/OL{abs(hash((query, i))) % 10_000_000}W",
+            "title": f"{query.title()} {i + 1}",
+            "author_name": [f"Autor {i + 1}"],
+            "first_publish_year": 1900 + i,
+            "language": ["spa", "eng"],
+            "cover_i": 1000 + i,
+            # Campos que Open Library devuelve si no se filtra con `fields`
+            "edition_key": [f"OL{i}{j}M" for j in range(20)],
+            "isbn": [f"978{i:010d}"] * 10,
+        } for i in range(offset, min(offset + limit, 120))]
+        if fields:
+            wanted = fields.split(',')
+            docs = [{field: doc[field] for field in wanted if field in doc} for doc in docs]
+        return web.json_response({"numFound": 120, "start": offset, "docs": docs})
+
+    async def handle_channel(self, request):
+        self.requests["ytdl"] += 1
+        await asyncio.sleep(self.ytdl_latency)
+        entries = [{
+            "id": f"video{i:06d}",
+            "title": f"Video {i + 1}",
+            "thumbnails": [{"url": f"https://i.ytimg.com/vi/video{i:06d}/hqdefault.jpg"}],
+        } for i in range(int(request.query.get('n', 5)))]
+        return web.json_response({"entries": entries, "thumbnails": [{"url": "https://yt3.ggpht.com/mock"}]})
+
+    def extract_channel(self, url):
+        """Sustituye a la extracción de yt-dlp: petición bloqueante (se ejecuta en el pool del cog)"""
+        with urllib.request.urlopen(self.ytdl_url) as response:
+            return json.load(response)
@@ -0,0 +1,65 @@
+"""Benchmark de mensajes/s a través del MessageRouter.
+
+Simula un canal con muchas partidas activas en el que la mayoría de mensajes
+son de usuarios sin partida, que deben descartarse sin trabajo adicional.
+
+Uso: python -m benchmarks.message_router [--messages N] [--games N]
+"""
+import argparse
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from utils.message_router import MessageRouter
+
+
+async def run(num_messages, num_games, game_ratio):
+    counters = {"commands": 0, "handled": 0}
+
+    async def process_commands(message):
+        counters["commands"] += 1
+
+    async def handler(message):
+        counters["handled"] += 1
+        return True
+
+    bot = SimpleNamespace(process_commands=process_commands)
+    router = MessageRouter(bot)
+    channels = [SimpleNamespace(id=channel_id) for channel_id in range(100)]
+    for user_id in range(num_games):
+        router.register(channels[user_id % len(channels)].id, user_id, handler)
+
+    rng = random.Random(0)
+    messages = []
+    for _ in range(num_messages):
+        if rng.random() < game_ratio:
+            user_id = rng.randrange(num_games)
+            channel = channels[user_id % len(channels)]
+        else:
+            user_id = num_games + rng.randrange(100_000)
+            channel = rng.choice(channels)
+        author = SimpleNamespace(id=user_id, bot=False)
+        messages.append(SimpleNamespace(author=author, channel=channel, content="hola"))
+
+    start = time.perf_counter()
+    for message in messages:
+        await router.dispatch(message)
+    elapsed = time.perf_counter() - start
+
+    print(f"Mensajes: {num_messages} | Partidas registradas: {len(router)}")
+    print(f"Enrutados a partidas: {counters['handled']} | A comandos: {counters['commands']}")
+    print(f"Mensajes/s: {num_messages / elapsed:,.0f} | {elapsed / num_messages * 1e6:.2f} µs/mensaje")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=500_000)
+    parser.add_argument('--games', type=int, default=10_000)
+    parser.add_argument('--game-ratio', type=float, default=0.1, help="fracción de mensajes de jugadores")
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.games, args.game_ratio))
+
+
+if __name__ == '__main__':
+    main()
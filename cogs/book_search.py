@@ -1,11 +1,31 @@
-import discord
+from discord import app_commands
 from discord.ext import commands
 import aiohttp
+import asyncio
 import logging
-from urllib.parse import quote
+import os
+import sqlite3
+from urllib.parse import urlencode
+
+from utils.admission import cooldown, limit
+from utils.book_index import BookIndex
+from utils.book_pages import BookResultsView
+from utils.cache import AsyncTTLCache
+from utils.jobs import PRIORITY_HIGH
+from utils.metrics import BOOK_INDEX_LOOKUPS, HTTP_LATENCY, register_cache, unregister_cache
 
 logger = logging.getLogger('discord_bot.books')
 
+# Resultados por página, máximo de resultados navegables y segundos que siguen activos los botones
+BOOK_PAGE_SIZE = int(os.environ.get("BOOK_PAGE_SIZE", "5"))
+BOOK_MAX_RESULTS = int(os.environ.get("BOOK_MAX_RESULTS", "100"))
+BOOK_VIEW_TIMEOUT = float(os.environ.get("BOOK_VIEW_TIMEOUT", "180"))
+# Solo se piden a Open Library los campos que se muestran
+SEARCH_FIELDS = ("key", "title", "author_name", "first_publish_year", "language", "cover_i")
+# Índice local opcional (python -m utils.book_index); si tiene más días que BOOK_INDEX_MAX_AGE se usa la API
+BOOK_INDEX_PATH = os.environ.get("BOOK_INDEX_PATH", "")
+BOOK_INDEX_MAX_AGE = float(os.environ.get("BOOK_INDEX_MAX_AGE", "30")) * 86400
+
 class BookSearch(commands.Cog):
     """Comandos para buscar libros en Open Library"""
     
@@ -13,102 +33,154 @@ class BookSearch(commands.Cog):
         self.bot = bot
         self.api_url = "https://openlibrary.org/search.json"
         self.book_url = "https://openlibrary.org/works/"
+        self.session = None
+        # Caché de respuestas por consulta normalizada (1 hora, 512 entradas)
+        self.cache = AsyncTTLCache(maxsize=512, ttl=3600)
+        self.index = None
+    
+    async def cog_load(self):
+        # Sesión compartida durante la vida del cog para reutilizar conexiones (keep-alive)
+        connector = aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=15)
+        )
+        register_cache('books', self.cache)
+        if BOOK_INDEX_PATH:
+            await self.open_index()
+    
+    async def cog_unload(self):
+        unregister_cache('books')
+        if self.session:
+            await self.session.close()
+        if self.index:
+            await asyncio.to_thread(self.index.close)
+    
+    async def open_index(self):
+        if not os.path.exists(BOOK_INDEX_PATH):
+            logger.warning(f"No existe el índice de libros {BOOK_INDEX_PATH}; se usará solo la API")
+            return
+        index = BookIndex(BOOK_INDEX_PATH)
+        await index.open()
+        if index.imported_at is None:
+            logger.warning(f"El índice de libros {BOOK_INDEX_PATH} está vacío; se usará solo la API")
+            await asyncio.to_thread(index.close)
+            return
+        self.index = index
+        logger.info(f"Índice de libros cargado ({index.age() / 86400:.0f} días)")
+    
+    async def search_index(self, query, page):
+        """Resultados del índice local o None si no hay índice, está desactualizado o no encuentra nada"""
+        if self.index is None or self.index.age() > BOOK_INDEX_MAX_AGE:
+            return None
+        try:
+            data = await self.index.search(query, page, BOOK_PAGE_SIZE, BOOK_MAX_RESULTS)
+        except sqlite3.Error as e:
+            logger.error(f"Error al consultar el índice de libros: {str(e)}")
+            return None
+        # Si el índice conoce la consulta, también sirve sus páginas siguientes aunque vengan vacías
+        BOOK_INDEX_LOOKUPS.inc(result="hit" if data["numFound"] else "miss")
+        return data if data["numFound"] else None
+    
+    @staticmethod
+    def normalize_query(query):
+        """Normaliza la consulta para usarla como clave de caché"""
+        return ' '.join(query.casefold().split())
     
-    @commands.command(name='libro')
+    async def fetch_results(self, query, page=0):
+        """Obtiene una página de resultados del índice local o de Open Library usando la caché compartida"""
+        key = self.normalize_query(query)
+        # El índice guarda la clasificación de sus consultas: no hace falta guardar sus páginas en caché
+        data = await self.search_index(key, page)
+        if data is not None:
+            return data
+        cache_key = f"{key}:{page}"
+        
+        async def fetch():
+            # Con varios procesos, lo que ya buscó otro se toma del almacén compartido
+            store = self.bot.shared_store
+            if store.shared:
+                data = await store.get(f"books:{cache_key}")
+                if data is not None:
+                    return data
+            
+            params = {"q": key, "fields": ','.join(SEARCH_FIELDS),
+                      "limit": BOOK_PAGE_SIZE, "offset": page * BOOK_PAGE_SIZE}
+            search_url = f"{self.api_url}?{urlencode(params)}"
+            async with limit('openlibrary'):
+                with HTTP_LATENCY.time(backend='openlibrary'):
+                    async with self.session.get(search_url) as response:
+                        if response.status != 200:
+                            logger.warning(f"Open Library respondió con estado {response.status}")
+                            return None
+                        data = await response.json()
+            
+            # En caché solo se guarda lo que se muestra
+            data = {
+                "numFound": data.get("numFound", 0),
+                "docs": [{field: doc[field] for field in SEARCH_FIELDS if field in doc} for doc in data.get("docs", [])],
+            }
+            if store.shared:
+                await store.set(f"books:{cache_key}", data, ttl=self.cache.ttl)
+            return data
+        
+        return await self.cache.get_or_fetch(cache_key, fetch)
+    
+    def results_message(self, query, author_id, data):
+        """kwargs del mensaje con los resultados y la vista con los botones (None si no hay resultados)"""
+        if data is None:
+            return {"content": "❌ Error al conectar con Open Library."}, None
+        
+        if not data.get('docs') or data.get('numFound', 0) == 0:
+            return {"content": f"❌ No se encontraron libros con el título: **{query}**"}, None
+        
+        # El primer resultado con botones para recorrer el resto
+        view = BookResultsView(self.fetch_results, query, data, author_id, page_size=BOOK_PAGE_SIZE,
+                               max_results=BOOK_MAX_RESULTS, timeout=BOOK_VIEW_TIMEOUT)
+        return {"content": None, "embed": view.build_embed(), "view": view}, view
+    
+    @commands.hybrid_command(name='libro')
+    @app_commands.describe(query="Título del libro")
+    @cooldown('libro')
     async def search_book(self, ctx, *, query):
         """Busca un libro en Open Library por título"""
         if not query:
             await ctx.send("❌ Por favor, especifica un título para buscar.")
             return
         
-        async with ctx.typing():
-            try:
-                # Informar al usuario que estamos procesando su solicitud
-                message = await ctx.send("🔍 Buscando libros... Esto puede tardar unos segundos.")
-                
-                # Realizar la búsqueda en Open Library
-                async with aiohttp.ClientSession() as session:
-                    # Codificar la consulta para URLs
-                    encoded_query = quote(query)
-                    search_url = f"{self.api_url}?q={encoded_query}&limit=5"
-                    
-                    async with session.get(search_url) as response:
-                        if response.status != 200:
-                            await message.edit(content="❌ Error al conectar con Open Library.")
-                            return
-                        
-                        data = await response.json()
-                        
-                        if not data.get('docs') or data.get('numFound', 0) == 0:
-                            await message.edit(content=f"❌ No se encontraron libros con el título: **{query}**")
-                            return
-                        
-                        # Obtener el primer resultado
-                        book = data['docs'][0]
-                        
-                        # Crear un embed con la información del libro
-                        embed = discord.Embed(
-                            title=book.get('title', 'Título desconocido'),
-                            color=discord.Color.blue()
-                        )
-                        
-                        # Añadir autor si está disponible
-                        authors = book.get('author_name', ['Autor desconocido'])
-                        author_text = ', '.join(authors[:3])
-                        if len(authors) > 3:
-                            author_text += f" y {len(authors) - 3} más"
-                        embed.add_field(name="✍️ Autor", value=author_text, inline=False)
-                        
-                        # Añadir año de publicación si está disponible
-                        if 'first_publish_year' in book:
-                            embed.add_field(name="📅 Año de publicación", value=book['first_publish_year'], inline=True)
-                        
-                        # Añadir idioma si está disponible
-                        languages = book.get('language', [])
-                        if languages:
-                            embed.add_field(name="🌐 Idioma", value=', '.join(languages[:3]), inline=True)
-                        
-                        # Añadir enlace a Open Library
-                        if 'key' in book:
-                            # Extraer el ID de la obra de la clave
-                            work_id = book['key'].split('/')[-1]
-                            book_link = f"https://openlibrary.org{book['key']}"
-                            embed.url = book_link
-                            
-                            # Añadir enlace para leer el libro si está disponible
-                            read_link = f"https://openlibrary.org/works/{work_id}/check-in"
-                            embed.add_field(
-                                name="📚 Leer", 
-                                value=f"[Ver en Open Library]({book_link}) | [Verificar disponibilidad]({read_link})", 
-                                inline=False
-                            )
-                        
-                        # Añadir portada si está disponible
-                        if 'cover_i' in book:
-                            cover_url = f"https://covers.openlibrary.org/b/id/{book['cover_i']}-L.jpg"
-                            embed.set_thumbnail(url=cover_url)
-                        
-                        # Si hay más resultados disponibles, mencionarlo
-                        if data['numFound'] > 1:
-                            remaining = min(data['numFound'] - 1, 4)  # Mostrar hasta 4 resultados más
-                            titles = [f"{i+2}. {doc.get('title', 'Título desconocido')}" 
-                                     for i, doc in enumerate(data['docs'][1:remaining+1])]
-                            
-                            if titles:
-                                embed.add_field(
-                                    name=f"🔍 Otros {remaining} resultados:",
-                                    value='\n'.join(titles),
-                                    inline=False
-                                )
-                        
-                        # Añadir footer con información sobre la búsqueda
-                        embed.set_footer(text=f"Búsqueda: {query} | Resultados totales: {data['numFound']}")
-                        
-                        await message.edit(content=None, embed=embed)
-                        
-            except Exception as e:
-                logger.error(f"Error al buscar libros: {str(e)}")
-                await ctx.send(f"❌ Error al buscar el libro: {str(e)}")
+        key = self.normalize_query(query)
+        # Si ya está en caché o en el índice local se responde directamente
+        data = self.cache.get(f"{key}:0") or await self.search_index(key, 0)
+        if data is not None:
+            kwargs, view = self.results_message(query, ctx.author.id, data)
+            message = await ctx.send(**kwargs)
+            if view is not None:
+                view.message = message
+                view.prefetch(1)
+            return
+        
+        # Si no, la búsqueda va a la cola de tareas; las búsquedas iguales simultáneas comparten la petición
+        def render(data, message):
+            kwargs, view = self.results_message(query, ctx.author.id, data)
+            if view is not None:
+                view.message = message
+                view.prefetch(1)
+            return kwargs
+        
+        await self.bot.jobs.submit(ctx, f"libro:{key}", f"!libro {query}", lambda job: self.fetch_results(query),
+                                   render, placeholder=f"🔍 Buscando **{query}** en Open Library...",
+                                   priority=PRIORITY_HIGH, error_message="❌ Error al buscar el libro")
+    
+    @commands.hybrid_command(name='librocache')
+    async def cache_stats(self, ctx):
+        """Muestra las estadísticas de la caché de búsquedas de libros"""
+        stats = self.cache.stats()
+        await ctx.send(
+            f"📊 Caché de libros: {stats['size']} entradas | "
+            f"Aciertos: {stats['hits']} | Fallos: {stats['misses']} | Agrupadas: {stats['coalesced']} | "
+            f"Tasa de acierto: {stats['hit_rate']:.0%} | "
+            f"Latencia media API: {stats['avg_fetch_ms']:.0f}ms | Ahorrado: ~{stats['saved_ms'] / 1000:.1f}s"
+        )
 
 async def setup(bot):
     # Asegurarse de que aiohttp está instalado
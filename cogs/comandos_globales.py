@@ -1,29 +1,191 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
+import logging
+import os
+import time
+
+from utils.cache import AsyncTTLCache
+from utils.jobs import PRIORITY_LOW, PRIORITY_NAMES
+from utils.metrics import register_cache, unregister_cache
+from utils.purge import PurgeEngine
+from utils.slash import defer
+
+logger = logging.getLogger('discord_bot.global_commands')
+
+# Segundos entre actualizaciones del mensaje de progreso de !limpiartodo
+PURGE_PROGRESS_INTERVAL = float(os.environ.get("PURGE_PROGRESS_INTERVAL", "5"))
+# Borrados individuales simultáneos para los mensajes de más de 14 días
+PURGE_CONCURRENCY = int(os.environ.get("PURGE_CONCURRENCY", "3"))
+# Segundos que se reutilizan el dueño y los recuentos de miembros pedidos para !serverinfo
+GUILD_INFO_TTL = int(os.environ.get("GUILD_INFO_TTL", "600"))
+
+JOB_STATUS = {"queued": "⏳ en cola", "running": "⚙️ en curso", "done": "✅ terminada",
+              "failed": "❌ con error", "cancelled": "🛑 cancelada"}
 
 class GlobalCommands(commands.Cog):
-    @commands.command(name="limpiartodo", aliases=["clearall", "purgeall"])
+    def __init__(self, bot):
+        self.bot = bot
+        # Datos que dependerían de la caché de miembros: se piden a la API y se guardan un rato
+        self.guild_info = AsyncTTLCache(maxsize=256, ttl=GUILD_INFO_TTL)
+
+    async def cog_load(self):
+        register_cache('guild_info', self.guild_info)
+
+    async def cog_unload(self):
+        unregister_cache('guild_info')
+
+    async def fetch_guild_info(self, guild):
+        """Dueño y recuentos aproximados de miembros del servidor, sin depender de la caché de miembros"""
+        async def fetch():
+            owner = guild.owner
+            if owner is None and guild.owner_id:
+                try:
+                    owner = await guild.fetch_member(guild.owner_id)
+                except discord.NotFound:
+                    owner = None
+            counts = await self.bot.fetch_guild(guild.id, with_counts=True)
+            # Solo se guarda el texto: un Member retendría el servidor y sus roles
+            return {
+                "owner": str(owner) if owner else f"<@{guild.owner_id}>",
+                "members": counts.approximate_member_count or guild.member_count,
+                "online": counts.approximate_presence_count,
+            }
+
+        return await self.guild_info.get_or_fetch(guild.id, fetch)
+    
+    @commands.hybrid_command(name="limpiartodo", aliases=["clearall", "purgeall"])
     @commands.has_permissions(manage_messages=True)
     async def limpiartodo(self, ctx):
         """Elimina TODOS los mensajes del canal actual."""
-        await ctx.send("🧹 Borrando todos los mensajes...", delete_after=2)
-        deleted = await ctx.channel.purge()
-        await ctx.send(f"🧹 Se han borrado {len(deleted)} mensajes.", delete_after=3)
+        key = f"purge:{ctx.channel.id}"
+        if key in self.bot.jobs.active:
+            await ctx.send("⏳ Ya se está limpiando este canal. Usa `!cancelarlimpieza` para detenerlo.")
+            return
+
+        channel = ctx.channel
+        # Se borra todo hasta el propio comando; el mensaje de estado (posterior) se queda para mostrar el progreso
+        before = discord.Object(id=ctx.message.id + 1)
+
+        async def run(job):
+            async def progress(stats):
+                await job.progress(f"🧹 Borrando... {stats.summary()}", force=True)
+
+            engine = PurgeEngine(channel, before=before, concurrency=PURGE_CONCURRENCY,
+                                 progress=progress, progress_interval=PURGE_PROGRESS_INTERVAL)
+            # El motor atiende la cancelación y devuelve lo borrado hasta entonces
+            stats = await engine.run()
+            logger.info(f"Limpieza de #{channel} {'cancelada' if stats.cancelled else 'terminada'}: {stats.summary()}")
+            return stats
+
+        def render(stats, message):
+            if stats.cancelled:
+                return {"content": f"⏹️ Limpieza cancelada: {stats.summary()}", "delete_after": 10}
+            return {"content": f"🧹 Limpieza terminada: {stats.summary()}", "delete_after": 10}
+
+        await self.bot.jobs.submit(ctx, key, f"!limpiartodo en #{channel}", run, render,
+                                   placeholder="🧹 Borrando todos los mensajes...", priority=PRIORITY_LOW,
+                                   error_message="❌ Error al limpiar el canal")
+
+    @commands.hybrid_command(name="cancelarlimpieza", aliases=["stoppurge"])
+    @commands.has_permissions(manage_messages=True)
+    async def cancelarlimpieza(self, ctx):
+        """Detiene la limpieza en curso del canal actual."""
+        job = self.bot.jobs.active.get(f"purge:{ctx.channel.id}")
+        if job is None:
+            await ctx.send("❌ No hay ninguna limpieza en curso en este canal.")
+            return
+        self.bot.jobs.cancel(job)
+        # El mensaje de progreso de la limpieza muestra el resultado; esto solo confirma la orden
+        await ctx.send("🛑 Cancelando la limpieza...", ephemeral=True, delete_after=10)
+
+    @commands.hybrid_command(name="jobs", aliases=["tareas"])
+    async def jobs(self, ctx):
+        """Muestra las tareas en segundo plano en curso y las últimas terminadas."""
+        queue = self.bot.jobs
+        embed = discord.Embed(title="⚙️ Tareas en segundo plano", color=discord.Color.orange())
+
+        def describe(job):
+            line = f"`#{job.id}` {job.name} — {JOB_STATUS[job.status]} ({job.elapsed():.0f}s"
+            if job.status == "queued":
+                line += f", prioridad {PRIORITY_NAMES[job.priority]}"
+            if len(job.subscribers) > 1:
+                line += f", {len(job.subscribers)} esperando"
+            line += ")"
+            if job.status == "running" and job.progress_text:
+                line += f"\n  {job.progress_text[:80]}"
+            return line
+
+        active = sorted(queue.active.values(), key=lambda job: (job.status != "running", job.id))
+        running = sum(1 for job in active if job.status == "running")
+        embed.add_field(
+            name=f"Activas: {running} en curso, {len(active) - running} en cola",
+            value='\n'.join(describe(job) for job in active[:15]) or "Ninguna",
+            inline=False
+        )
+        finished = list(queue.finished)[::-1][:10]
+        if finished:
+            embed.add_field(name="Últimas terminadas", value='\n'.join(describe(job) for job in finished), inline=False)
+        embed.set_footer(text=f"Workers: {queue.workers} | !cancelarjob <id> cancela una tarea")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="cancelarjob", aliases=["canceljob"])
+    @app_commands.describe(job_id="Número de la tarea (ver !jobs)")
+    async def cancelarjob(self, ctx, job_id: int):
+        """Cancela una tarea en segundo plano (de quien la inició o del dueño del bot)."""
+        job = self.bot.jobs.get(job_id)
+        if job is None:
+            await ctx.send(f"❌ No hay ninguna tarea #{job_id} activa.")
+            return
+        if ctx.author.id != job.owner_id and not await self.bot.is_owner(ctx.author):
+            await ctx.send("❌ Solo quien inició la tarea puede cancelarla.")
+            return
+        self.bot.jobs.cancel(job)
+        await ctx.send(f"🛑 Cancelando la tarea #{job_id}...", delete_after=10)
     
-    @commands.command()
+    @commands.hybrid_command()
     async def ping(self, ctx):
         """Muestra la latencia del bot."""
         await ctx.send(f'🏓 Pong! Latencia: {round(self.bot.latency * 1000)}ms')
 
-    @commands.command()
+    @commands.hybrid_command(name="reload", aliases=["recargar"])
+    @commands.is_owner()
+    @app_commands.describe(cog="Nombre del módulo, p. ej. music_player")
+    async def reload(self, ctx, cog: str):
+        """Recarga un módulo sin reiniciar el bot."""
+        await defer(ctx)
+        name = cog if cog.startswith("cogs.") else f"cogs.{cog}"
+        start = time.perf_counter()
+        try:
+            if name in self.bot.extensions:
+                await self.bot.reload_extension(name)
+            else:
+                await self.bot.load_extension(name)
+        except commands.ExtensionError as e:
+            logger.error(f"Error al recargar {name}: {str(e)}")
+            await ctx.send(f"❌ Error al recargar `{name}`: {e}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(f"Módulo recargado: {name} ({elapsed:.0f}ms)")
+        await ctx.send(f"🔄 Módulo `{name}` recargado en {elapsed:.0f}ms.")
+        # Si el módulo ha cambiado sus comandos, se publican los nuevos
+        await self.bot.sync_commands()
+
+    @commands.hybrid_command()
+    @commands.guild_only()
     async def serverinfo(self, ctx):
         """Muestra información del servidor."""
+        await defer(ctx)
         guild = ctx.guild
+        info = await self.fetch_guild_info(guild)
         embed = discord.Embed(title=f"Servidor: {guild.name}", color=discord.Color.green())
         embed.add_field(name="ID", value=guild.id)
-        embed.add_field(name="Miembros", value=guild.member_count)
-        embed.add_field(name="Dueño", value=guild.owner)
-        embed.set_thumbnail(url=guild.icon.url if guild.icon else discord.Embed.Empty)
+        members = info["members"]
+        if info["online"] is not None:
+            members = f"{members} ({info['online']} en línea)"
+        embed.add_field(name="Miembros", value=members)
+        embed.add_field(name="Dueño", value=info["owner"])
+        embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
         await ctx.send(embed=embed)
 
 async def setup(bot):
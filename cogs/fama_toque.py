@@ -1,17 +1,105 @@
 import discord
-from discord.ext import commands
+from discord import app_commands
+from discord.ext import commands, tasks
+import asyncio
+import os
 import random
 import logging
-from collections import defaultdict
+import time
+
+from utils.game_store import Game, create_game_store
 
 logger = logging.getLogger('discord_bot.fama_toque')
 
+# El solucionador (para !pista) necesita numpy; sin él el juego funciona igual
+try:
+    from utils.fama_solver import FamaToqueSolver, load_score_table
+except ImportError:
+    FamaToqueSolver = None
+
+GAME_STORE = os.environ.get("FAMA_TOQUE_STORE", "sqlite")
+GAME_DB_PATH = os.environ.get("FAMA_TOQUE_DB_PATH", "data/fama_toque.db")
+# Segundos sin actividad tras los que una partida se da por abandonada
+GAME_TTL = int(os.environ.get("FAMA_TOQUE_GAME_TTL", "86400"))
+SCORES_PATH = os.environ.get("FAMA_TOQUE_SCORES_PATH", "data/fama_scores.npy")
+
+# Embed de reglas que se reutiliza en cada partida (solo cambia el pie)
+RULES_EMBED = discord.Embed(
+    title="🎮 Fama y Toque",
+    description=(
+        "He generado un número secreto de 4 dígitos. "
+        "Tienes 7 intentos para adivinarlo.\n\n"
+        "**REGLAS:**\n"
+        "• **Fama**: Dígito correcto en posición correcta\n"
+        "• **Toque**: Dígito correcto en posición incorrecta\n\n"
+        "Para adivinar, simplemente escribe un número de 4 cifras (o usa `/adivinar`).\n"
+        "Para rendirte, escribe `!rendirse`."
+    ),
+    color=discord.Color.blue()
+)
+
 class FamaToque(commands.Cog):
     """Juego de Fama y Toque"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.active_games = {}  # {user_id: {"number": "1234", "attempts": 0, "guesses": []}}
+        self.store = create_game_store(GAME_STORE, GAME_DB_PATH)
+        self.active_games = {}  # {user_id: Game}
+        self.solver = None
+        self.solver_lock = asyncio.Lock()  # la memoria del solucionador no admite hilos simultáneos
+    
+    async def cog_load(self):
+        start = time.perf_counter()
+        await self.store.start()
+        # Con varios procesos cada uno se queda con las partidas de los servidores de sus shards
+        self.active_games = {
+            user_id: game for user_id, game in (await self.store.load_all()).items()
+            if self.bot.owns_guild(game.guild_id)
+        }
+        for game in self.active_games.values():
+            for guess in game.guesses:
+                game.record_result(guess, *self.evaluate_guess(game.number, guess))
+            self.bot.router.register(game.channel_id, game.user_id, self.on_game_message)
+        logger.info(f"Cargadas {len(self.active_games)} partidas en {(time.perf_counter() - start) * 1000:.0f}ms")
+        self.expire_games.start()
+        if FamaToqueSolver is not None:
+            self.bot.loop.create_task(self.load_solver())
+        else:
+            logger.warning("Se requiere numpy para el comando !pista")
+    
+    async def load_solver(self):
+        """Carga (o calcula la primera vez) la tabla de resultados sin bloquear el event loop"""
+        start = time.perf_counter()
+        try:
+            table = await asyncio.to_thread(load_score_table, SCORES_PATH)
+        except Exception as e:
+            logger.error(f"Error al cargar la tabla de resultados: {str(e)}")
+            return
+        self.solver = FamaToqueSolver(table)
+        logger.info(f"Solucionador listo en {time.perf_counter() - start:.2f}s")
+    
+    async def cog_unload(self):
+        self.expire_games.cancel()
+        for game in self.active_games.values():
+            self.bot.router.unregister(game.channel_id, game.user_id)
+        await self.store.close()
+    
+    def end_game(self, user_id):
+        """Elimina una partida de memoria y del almacenamiento"""
+        game = self.active_games.pop(user_id, None)
+        if game is not None:
+            self.bot.router.unregister(game.channel_id, user_id)
+        self.store.delete(user_id)
+    
+    @tasks.loop(minutes=10)
+    async def expire_games(self):
+        """Elimina las partidas abandonadas"""
+        cutoff = time.time() - GAME_TTL
+        expired = [user_id for user_id, game in self.active_games.items() if game.updated_at < cutoff]
+        for user_id in expired:
+            self.end_game(user_id)
+        if expired:
+            logger.info(f"Eliminadas {len(expired)} partidas abandonadas")
     
     def generate_secret_number(self):
         """Genera un número secreto de 4 cifras con dígitos diferentes"""
@@ -37,7 +125,7 @@ class FamaToque(commands.Cog):
                 
         return famas, toques
     
-    @commands.command(name='famatoque', aliases=['ft', 'jugar'])
+    @commands.hybrid_command(name='famatoque', aliases=['ft', 'jugar'])
     async def start_game(self, ctx):
         """Inicia un nuevo juego de Fama y Toque"""
         user_id = ctx.author.id
@@ -47,34 +135,26 @@ class FamaToque(commands.Cog):
             await ctx.send(f"❌ Ya tienes un juego en curso. Usa `!rendirse` para terminar el juego actual.")
             return
         
+        # La partida puede estar en un servidor atendido por otro proceso del bot
+        if await self.store.load(user_id) is not None:
+            await ctx.send("❌ Ya tienes un juego en curso en otro servidor. Termínalo antes de empezar otro.")
+            return
+        
         # Crear nuevo juego
         secret_number = self.generate_secret_number()
-        self.active_games[user_id] = {
-            "number": secret_number,
-            "attempts": 0,
-            "guesses": []
-        }
+        game = Game(user_id, ctx.channel.id, secret_number, guild_id=ctx.guild.id if ctx.guild else None)
+        self.active_games[user_id] = game
+        self.store.save(game)
+        self.bot.router.register(game.channel_id, user_id, self.on_game_message)
         
         logger.info(f"Nuevo juego para {ctx.author.name} - Número secreto: {secret_number}")
         
-        embed = discord.Embed(
-            title="🎮 Fama y Toque",
-            description=(
-                "He generado un número secreto de 4 dígitos. "
-                "Tienes 7 intentos para adivinarlo.\n\n"
-                "**REGLAS:**\n"
-                "• **Fama**: Dígito correcto en posición correcta\n"
-                "• **Toque**: Dígito correcto en posición incorrecta\n\n"
-                "Para adivinar, simplemente escribe un número de 4 cifras.\n"
-                "Para rendirte, escribe `!rendirse`."
-            ),
-            color=discord.Color.blue()
-        )
+        embed = RULES_EMBED.copy()
         embed.set_footer(text=f"Jugador: {ctx.author.name} | Intento 0/7")
         
         await ctx.send(embed=embed)
     
-    @commands.command(name='rendirse')
+    @commands.hybrid_command(name='rendirse')
     async def surrender(self, ctx):
         """Rendirse en el juego actual"""
         user_id = ctx.author.id
@@ -83,42 +163,84 @@ class FamaToque(commands.Cog):
             await ctx.send("❌ No tienes un juego activo.")
             return
         
-        secret_number = self.active_games[user_id]["number"]
-        del self.active_games[user_id]
+        secret_number = self.active_games[user_id].number
+        self.end_game(user_id)
         
         await ctx.send(f"😔 Te has rendido. El número secreto era: **{secret_number}**")
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # Ignorar mensajes del bot
-        if message.author.bot:
+    @commands.hybrid_command(name='adivinar')
+    @app_commands.describe(numero="Número de 4 cifras")
+    async def guess(self, ctx, numero: str):
+        """Intenta adivinar el número secreto de tu juego actual"""
+        # Sin el intent message_content (solo comandos de barra) es la única forma de jugar
+        game = self.active_games.get(ctx.author.id)
+        if game is None:
+            await ctx.send("❌ No tienes un juego activo.")
             return
         
-        user_id = message.author.id
+        if game.channel_id != ctx.channel.id:
+            await ctx.send(f"❌ Tu juego está en <#{game.channel_id}>.")
+            return
         
-        # Verificar si el usuario tiene un juego activo
-        if user_id in self.active_games:
-            # Verificar si el mensaje es un intento de adivinar
-            content = message.content.strip()
-            
-            # Verificar si es un número de 4 dígitos
-            if content.isdigit() and len(content) == 4:
-                await self.process_guess(message, content)
-        await self.bot.process_commands(message)
+        numero = numero.strip()
+        if len(numero) != 4 or not numero.isdigit():
+            await ctx.send("❌ El intento debe ser un número de 4 cifras.")
+            return
+        
+        await self.process_guess(ctx.author, ctx.send, numero)
     
-    async def process_guess(self, message, guess):
-        """Procesa un intento de adivinar el número"""
-        user_id = message.author.id
+    @commands.hybrid_command(name='pista')
+    async def hint(self, ctx):
+        """Sugiere el siguiente intento óptimo para tu juego actual"""
+        game = self.active_games.get(ctx.author.id)
+        if game is None:
+            await ctx.send("❌ No tienes un juego activo.")
+            return
+        
+        if self.solver is None:
+            await ctx.send("⏳ Las pistas no están disponibles en este momento.")
+            return
+        
+        history = [(g, famas, toques) for g, (famas, toques) in zip(game.guesses, game.results)]
+        # Con muchos candidatos el cálculo tarda decenas de ms: fuera del event loop
+        async with self.solver_lock:
+            suggestion, remaining = await asyncio.to_thread(self.solver.suggest, history)
+        
+        if suggestion is None:
+            await ctx.send("❌ Ningún número encaja con tus intentos.")
+            return
+        
+        await ctx.send(
+            f"💡 Prueba con **{suggestion}**. "
+            f"Quedan {remaining} números posibles según tus intentos."
+        )
+    
+    async def on_game_message(self, message):
+        """Recibe (vía el router) los mensajes de un jugador en el canal de su partida"""
+        # Verificar si es un número de 4 dígitos
+        content = message.content.strip()
+        if len(content) != 4 or not content.isdigit():
+            return False
+        
+        await self.process_guess(message.author, message.channel.send, content)
+        return True
+    
+    async def process_guess(self, author, send, guess):
+        """Procesa un intento de adivinar el número y responde con `send`"""
+        user_id = author.id
         game = self.active_games[user_id]
-        secret_number = game["number"]
+        secret_number = game.number
         
         # Incrementar intentos
-        game["attempts"] += 1
-        attempts = game["attempts"]
-        game["guesses"].append(guess)
+        game.attempts += 1
+        attempts = game.attempts
+        game.guesses.append(guess)
+        game.touch()
         
-        # Evaluar intento
+        # Evaluar intento; el historial de los anteriores ya está renderizado
+        previous_history = game.history
         famas, toques = self.evaluate_guess(secret_number, guess)
+        game.record_result(guess, famas, toques)
         
         # Preparar mensaje de respuesta
         embed = discord.Embed(
@@ -130,30 +252,29 @@ class FamaToque(commands.Cog):
         embed.add_field(name="Toques", value=f"**{toques}**", inline=True)
         
         # Mostrar intentos previos
-        if len(game["guesses"]) > 1:
-            history = "\n".join([
-                f"#{i+1}: {g} → Famas: {self.evaluate_guess(secret_number, g)[0]}, Toques: {self.evaluate_guess(secret_number, g)[1]}"
-                for i, g in enumerate(game["guesses"][:-1])
-            ])
-            embed.add_field(name="Intentos anteriores", value=f"```\n{history}\n```", inline=False)
+        if previous_history:
+            embed.add_field(name="Intentos anteriores", value=f"```\n{previous_history}\n```", inline=False)
         
-        embed.set_footer(text=f"Jugador: {message.author.name} | Intento {attempts}/7")
+        embed.set_footer(text=f"Jugador: {author.name} | Intento {attempts}/7")
         
         # Victoria
         if famas == 4:
             embed.title = f"🎉 ¡VICTORIA! El número era {secret_number}"
             embed.description = f"¡Felicidades! Has adivinado el número secreto en {attempts} intentos."
             embed.color = discord.Color.green()
-            del self.active_games[user_id]
+            self.end_game(user_id)
         
         # Derrota
         elif attempts >= 7:
             embed.title = f"😞 DERROTA - El número era {secret_number}"
             embed.description = "Has agotado tus 7 intentos sin adivinar el número."
             embed.color = discord.Color.red()
-            del self.active_games[user_id]
+            self.end_game(user_id)
+        
+        else:
+            self.store.save(game)
             
-        await message.channel.send(embed=embed)
+        await send(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(FamaToque(bot))
\ No newline at end of file
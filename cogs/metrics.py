@@ -0,0 +1,185 @@
+import discord
+from discord.ext import commands
+from aiohttp import web
+import asyncio
+import logging
+import os
+import time
+
+from utils.metrics import (
+    COMMAND_ERRORS,
+    COMMAND_INVOCATIONS,
+    COMMAND_LATENCY,
+    DISCORD_CACHE_ENTRIES,
+    LOOP_LAG,
+    REGISTRY,
+    percentile,
+    registered_caches,
+    resident_memory,
+)
+
+logger = logging.getLogger('discord_bot.metrics')
+
+# Dirección del endpoint de Prometheus; METRICS_PORT=0 lo desactiva
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))
+# Con DISCORD_WORKERS>1 cada proceso hijo usa el puerto siguiente: METRICS_PORT + índice del proceso
+if METRICS_PORT:
+    METRICS_PORT += int(os.environ.get("DISCORD_WORKER_INDEX", "0"))
+# Cada cuánto mide el vigilante el retraso del event loop (segundos)
+LAG_INTERVAL = 0.5
+LAG_WARNING = 0.25
+
+class Metrics(commands.Cog):
+    """Métricas de comandos, peticiones externas y event loop"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.runner = None
+        self.watchdog = None
+
+    async def cog_load(self):
+        self.bot.before_invoke(self.before_command)
+        self.bot.after_invoke(self.after_command)
+        self.watchdog = asyncio.create_task(self.watch_loop_lag())
+        DISCORD_CACHE_ENTRIES.collect = lambda: {(name,): size for name, size in self.discord_cache_sizes().items()}
+        if METRICS_PORT:
+            await self.start_server()
+
+    async def cog_unload(self):
+        self.bot._before_invoke = None
+        self.bot._after_invoke = None
+        DISCORD_CACHE_ENTRIES.collect = None
+        if self.watchdog:
+            self.watchdog.cancel()
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def start_server(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, METRICS_HOST, METRICS_PORT).start()
+        except OSError as e:
+            logger.error(f"No se pudo abrir el endpoint de métricas: {str(e)}")
+            await self.runner.cleanup()
+            self.runner = None
+            return
+        logger.info(f"Métricas disponibles en http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+    async def handle_metrics(self, request):
+        return web.Response(text=REGISTRY.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def watch_loop_lag(self):
+        """Mide cuánto se retrasa un sleep respecto a lo pedido: ese retraso es el bloqueo del loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            lag = max(0.0, loop.time() - start - LAG_INTERVAL)
+            LOOP_LAG.observe(lag)
+            if lag > LAG_WARNING:
+                logger.warning(f"Event loop bloqueado durante {lag * 1000:.0f}ms")
+
+    def discord_cache_sizes(self):
+        """Objetos guardados en las cachés internas de discord.py"""
+        guilds = self.bot.guilds
+        return {
+            "guilds": len(guilds),
+            "users": len(self.bot.users),
+            "members": sum(len(guild.members) for guild in guilds),
+            "channels": sum(len(guild.channels) for guild in guilds),
+            "voice_states": sum(len(guild._voice_states) for guild in guilds),
+            "messages": len(self.bot.cached_messages),
+            "emojis": len(self.bot.emojis),
+            "stickers": len(self.bot.stickers),
+            "voice_clients": len(self.bot.voice_clients),
+        }
+
+    async def before_command(self, ctx):
+        ctx.metrics_start = time.perf_counter()
+
+    @staticmethod
+    def command_labels(ctx):
+        return {
+            "cog": ctx.cog.qualified_name if ctx.cog else "",
+            "command": ctx.command.qualified_name,
+        }
+
+    def record_invocation(self, ctx):
+        ctx.metrics_recorded = True
+        labels = self.command_labels(ctx)
+        COMMAND_INVOCATIONS.inc(**labels)
+        start = getattr(ctx, 'metrics_start', None)
+        if start is not None:
+            COMMAND_LATENCY.observe(time.perf_counter() - start, **labels)
+
+    async def after_command(self, ctx):
+        if getattr(ctx, 'metrics_start', None) is None or ctx.command is None:
+            return
+        self.record_invocation(ctx)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error):
+        # Los errores se cuentan aquí y no en after_invoke: con los comandos de barra discord.py
+        # solo llama a los hooks posteriores si el comando termina bien
+        if ctx.command is None:
+            return
+        if not getattr(ctx, 'metrics_recorded', False):
+            self.record_invocation(ctx)
+        COMMAND_ERRORS.inc(**self.command_labels(ctx))
+
+    @commands.hybrid_command(name='stats')
+    async def stats(self, ctx):
+        """Muestra la latencia p50/p99 de los comandos de cada módulo"""
+        embed = discord.Embed(title="📈 Estadísticas de comandos", color=discord.Color.purple())
+
+        cogs = sorted({cog for cog, _ in COMMAND_INVOCATIONS.values})
+        for cog in cogs:
+            invocations = sum(v for (c, _), v in COMMAND_INVOCATIONS.values.items() if c == cog)
+            errors = sum(v for (c, _), v in COMMAND_ERRORS.values.items() if c == cog)
+            samples = COMMAND_LATENCY.recent(cog=cog)
+            p50 = percentile(samples, 0.5) or 0.0
+            p99 = percentile(samples, 0.99) or 0.0
+            embed.add_field(
+                name=cog or "Sin módulo",
+                value=f"Usos: {invocations} | Errores: {errors}\np50: {p50 * 1000:.0f}ms | p99: {p99 * 1000:.0f}ms",
+                inline=False
+            )
+
+        lag = LOOP_LAG.quantile(0.99)
+        embed.set_footer(text=f"Retraso del event loop p99: {(lag or 0.0) * 1000:.1f}ms | "
+                              f"Latencia gateway: {round(self.bot.latency * 1000)}ms")
+
+        if not cogs:
+            embed.description = "Todavía no se ha ejecutado ningún comando."
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name='memoria', aliases=['memory'])
+    async def memoria(self, ctx):
+        """Muestra la memoria del proceso y el tamaño de cada caché"""
+        embed = discord.Embed(title="🧠 Memoria", color=discord.Color.purple())
+        embed.description = f"Memoria residente: {resident_memory() / 2 ** 20:.1f} MiB"
+
+        max_messages = self.bot._connection.max_messages
+        sizes = self.discord_cache_sizes()
+        lines = [f"{name}: {size}" for name, size in sizes.items()]
+        lines[list(sizes).index("messages")] += f" / {max_messages}" if max_messages else " (desactivada)"
+        embed.add_field(name="discord.py", value="\n".join(lines), inline=False)
+
+        caches = registered_caches()
+        if caches:
+            embed.add_field(
+                name="Cachés del bot",
+                value="\n".join(f"{name}: {len(cache)} / {cache.maxsize} (acierto {cache.stats()['hit_rate']:.0%})"
+                                for name, cache in sorted(caches.items())),
+                inline=False
+            )
+        embed.set_footer(text=f"Conversaciones en curso: {len(self.bot.router)}")
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Metrics(bot))
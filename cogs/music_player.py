@@ -1,84 +1,278 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import wavelink
+import asyncio
 import logging
+import os
+
+from utils.admission import cooldown, limit
+from utils.cache import AsyncTTLCache
+from utils.lavalink_pool import LavalinkPool, load_node_configs
+from utils.metrics import HTTP_LATENCY, register_cache, unregister_cache
+from utils.music_queue import LOOP_MODES, LOOP_OFF, LOOP_QUEUE, LOOP_TRACK, GuildQueue, QueueEntry, resolve_entry
+from utils.slash import defer
 
 logger = logging.getLogger('discord_bot.music_lavalink')
 
+LAVALINK_URI = os.environ.get("LAVALINK_URI", "lava-v3.ajieblogs.eu.org:443")
+LAVALINK_PASSWORD = os.environ.get("LAVALINK_PASSWORD", "https://dsc.gg/ajidevserver")
+LAVALINK_SECURE = os.environ.get("LAVALINK_SECURE", "true").lower() == "true"
+# Varios nodos: LAVALINK_NODES='[{"id": "eu", "uri": "host:2333", "password": "...", "secure": false}, ...]'
+LAVALINK_NODES = load_node_configs(os.environ.get("LAVALINK_NODES"), LAVALINK_URI, LAVALINK_PASSWORD, LAVALINK_SECURE)
+LAVALINK_HEALTH_INTERVAL = float(os.environ.get("LAVALINK_HEALTH_INTERVAL", "10"))
+
+# Canciones de la cola que se resuelven por adelantado
+PREFETCH = 2
+LOOP_LABELS = {LOOP_OFF: "desactivada", LOOP_TRACK: "canción actual", LOOP_QUEUE: "toda la cola"}
+
 class MusicPlayerLavalink(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.bot.loop.create_task(self.connect_lavalink())
+        self.queues = {}  # {guild_id: GuildQueue}
+        # Caché compartida entre servidores: búsqueda normalizada -> pista (6 horas)
+        self.track_cache = AsyncTTLCache(maxsize=2048, ttl=6 * 3600)
+        # Los nodos se conectan, sondean y reconectan en segundo plano
+        self.pool = LavalinkPool(bot, LAVALINK_NODES, interval=LAVALINK_HEALTH_INTERVAL)
+
+    async def cog_load(self):
+        register_cache('tracks', self.track_cache)
+        self.pool.start()
+
+    async def cog_unload(self):
+        unregister_cache('tracks')
+        await self.pool.close()
+        for queue in self.queues.values():
+            queue.clear()
+
+    async def search_track(self, query):
+        """Devuelve la primera pista para la búsqueda, usando la caché compartida"""
+        key = ' '.join(query.casefold().split())
+
+        async def fetch():
+            async with limit('lavalink'):
+                with HTTP_LATENCY.time(backend='lavalink'):
+                    tracks = await wavelink.YouTubeTrack.search(query, node=self.pool.best_node())
+            return tracks[0] if tracks else None
+
+        return await self.track_cache.get_or_fetch(key, fetch)
 
-    async def connect_lavalink(self):
-        print("Intentando conectar a Lavalink...")  # <-- Depuración
+    def get_queue(self, ctx):
+        queue = self.queues.get(ctx.guild.id)
+        if queue is None:
+            queue = self.queues[ctx.guild.id] = GuildQueue(text_channel=ctx.channel)
+        return queue
+
+    def prefetch(self, queue):
+        """Lanza en segundo plano la resolución de las próximas canciones"""
+        for entry in queue.upcoming(PREFETCH):
+            if entry.track is None and entry.resolution is None:
+                task = asyncio.create_task(self.resolve_quietly(entry))
+                queue.prefetches.add(task)
+                task.add_done_callback(queue.prefetches.discard)
+
+    async def resolve_quietly(self, entry):
         try:
-            node: wavelink.Node = wavelink.Node(
-            uri="lava-v3.ajieblogs.eu.org:443",
-            password="https://dsc.gg/ajidevserver",
-            secure=True,
-            )
-            await wavelink.NodePool.connect(client=self.bot, nodes=[node])
-            self.bot.lavalink_ready = True
-            print("¡Conectado a Lavalink!")  # <-- Depuración
-            logger.info("Conectado a Lavalink público")
+            await resolve_entry(entry, self.search_track)
+        except asyncio.CancelledError:
+            pass
         except Exception as e:
-            print(f"Error conectando a Lavalink: {e}")  # <-- Depuración
-            logger.error(f"Error conectando a Lavalink: {e}")
+            logger.warning(f"Error al resolver '{entry.query}' por adelantado: {e}")
+
+    async def play_next(self, player, queue):
+        """Reproduce la siguiente canción de la cola; las que no se encuentran se saltan"""
+        while True:
+            entry = queue.advance()
+            if entry is None:
+                return None
+            try:
+                track = await resolve_entry(entry, self.search_track)
+            except Exception as e:
+                logger.warning(f"Error al resolver '{entry.query}': {e}")
+                track = None
+            if track is None:
+                # Para no repetir una canción que no se puede resolver
+                queue.current = None
+                if queue.text_channel:
+                    await queue.text_channel.send(f"❌ No se encontraron resultados para: **{entry.query}**")
+                continue
+
+            await player.play(track)
+            self.prefetch(queue)
+            return entry
+
+    @commands.Cog.listener()
+    async def on_wavelink_track_end(self, payload):
+        # REPLACED: se ha llamado a play() con otra pista, no hay que avanzar la cola
+        if payload.reason == 'REPLACED':
+            return
+        player = payload.player
+        queue = self.queues.get(player.guild.id) if player and player.guild else None
+        if queue is None:
+            return
+
+        entry = await self.play_next(player, queue)
+        if entry is not None and queue.text_channel:
+            await queue.text_channel.send(f"▶️ Reproduciendo: **{entry.title}**")
 
-    @commands.command(name="join")
+    @commands.hybrid_command(name="join")
     async def join(self, ctx):
-        if not wavelink.NodePool.nodes:
+        """Une el bot a tu canal de voz"""
+        await defer(ctx)
+        node = self.pool.best_node()
+        if node is None:
             await ctx.send("⏳ Esperando conexión con el servidor de música. Intenta de nuevo en unos segundos.")
             return
         if not ctx.author.voice:
             await ctx.send("❌ Debes estar en un canal de voz.")
             return
         channel = ctx.author.voice.channel
-        await channel.connect(cls=wavelink.Player)
+        await channel.connect(cls=self.pool.player_factory(node))
         await ctx.send(f"Me he unido a {channel.mention}")
 
-    @commands.command(name="play")
+    @commands.hybrid_command(name="play")
+    @app_commands.describe(search="Canción a buscar o URL")
+    @cooldown('play')
     async def play(self, ctx, *, search: str):
+        """Reproduce una canción o la añade a la cola"""
+        # La búsqueda en Lavalink puede superar los 3 segundos que da Discord para responder
+        await defer(ctx)
         if not ctx.voice_client:
             await ctx.invoke(self.join)
         player: wavelink.Player = ctx.voice_client
+        if not player:
+            return
+
+        queue = self.get_queue(ctx)
+        queue.text_channel = ctx.channel
+        if queue.is_full():
+            await ctx.send(f"❌ La cola está llena ({queue.max_size} canciones).")
+            return
+
+        entry = QueueEntry(search, ctx.author.id)
 
-        # Buscar la canción
-        tracks = await wavelink.YouTubeTrack.search(search)
-        if not tracks:
+        # Si ya suena algo, la canción va a la cola y se resuelve en segundo plano
+        if player.is_playing() or player.is_paused() or queue.current is not None:
+            queue.enqueue(entry)
+            self.prefetch(queue)
+            await ctx.send(f"➕ Añadido a la cola (#{len(queue)}): **{search}**")
+            return
+
+        track = await resolve_entry(entry, self.search_track)
+        if track is None:
             await ctx.send("❌ No se encontraron resultados.")
             return
-        track = tracks[0]
+        queue.current = entry
         await player.play(track)
         await ctx.send(f"▶️ Reproduciendo: **{track.title}**")
 
-    @commands.command(name="pause")
+    @commands.hybrid_command(name="queue", aliases=["cola"])
+    async def show_queue(self, ctx):
+        """Muestra la cola de reproducción"""
+        queue = self.queues.get(ctx.guild.id)
+        if queue is None or (queue.current is None and not len(queue)):
+            await ctx.send("📭 La cola está vacía.")
+            return
+
+        embed = discord.Embed(title="🎶 Cola de reproducción", color=discord.Color.blurple())
+        if queue.current is not None:
+            embed.add_field(name="Sonando", value=queue.current.title, inline=False)
+        lines = [f"{i}. {entry.title}" for i, entry in enumerate(queue, 1)][:20]
+        if len(queue) > 20:
+            lines.append(f"... y {len(queue) - 20} más")
+        if lines:
+            embed.add_field(name=f"Siguientes ({len(queue)})", value='\n'.join(lines), inline=False)
+        embed.set_footer(text=f"Repetición: {LOOP_LABELS[queue.loop]}")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="remove", aliases=["quitar"])
+    @app_commands.describe(position="Posición en la cola (ver !queue)")
+    async def remove(self, ctx, position: int):
+        """Quita una canción de la cola"""
+        queue = self.queues.get(ctx.guild.id)
+        try:
+            entry = queue.remove(position) if queue else None
+        except IndexError:
+            entry = None
+        if entry is None:
+            await ctx.send("❌ No hay ninguna canción en esa posición.")
+            return
+        self.prefetch(queue)
+        await ctx.send(f"🗑️ Quitada de la cola: **{entry.title}**")
+
+    @commands.hybrid_command(name="shuffle", aliases=["mezclar"])
+    async def shuffle(self, ctx):
+        """Mezcla la cola de reproducción"""
+        queue = self.queues.get(ctx.guild.id)
+        if queue is None or len(queue) < 2:
+            await ctx.send("❌ No hay suficientes canciones en la cola.")
+            return
+        queue.shuffle()
+        self.prefetch(queue)
+        await ctx.send("🔀 Cola mezclada.")
+
+    @commands.hybrid_command(name="loop", aliases=["repetir"])
+    @app_commands.describe(mode="off, track (canción) o queue (cola); sin indicar, alterna entre ellos")
+    async def loop(self, ctx, mode: str = None):
+        """Cambia el modo de repetición"""
+        queue = self.get_queue(ctx)
+        if mode is None:
+            # Sin argumento, alterna entre los modos
+            mode = LOOP_MODES[(LOOP_MODES.index(queue.loop) + 1) % len(LOOP_MODES)]
+        mode = {"cancion": LOOP_TRACK, "canción": LOOP_TRACK, "cola": LOOP_QUEUE, "no": LOOP_OFF}.get(mode, mode)
+        if mode not in LOOP_MODES:
+            await ctx.send("❌ Modos disponibles: `off`, `track` (canción) o `queue` (cola).")
+            return
+        queue.loop = mode
+        await ctx.send(f"🔁 Repetición: {LOOP_LABELS[mode]}.")
+
+    @commands.hybrid_command(name="pause")
     async def pause(self, ctx):
+        """Pausa la canción actual"""
         player: wavelink.Player = ctx.voice_client
         if player and player.is_playing():
             await player.pause()
             await ctx.send("⏸️ Pausado.")
+        elif ctx.interaction is not None:
+            # Los comandos de barra siempre necesitan una respuesta
+            await ctx.send("❌ No está sonando nada.", ephemeral=True)
 
-    @commands.command(name="resume")
+    @commands.hybrid_command(name="resume")
     async def resume(self, ctx):
+        """Reanuda la canción pausada"""
         player: wavelink.Player = ctx.voice_client
         if player and player.is_paused():
             await player.resume()
             await ctx.send("▶️ Reanudado.")
+        elif ctx.interaction is not None:
+            await ctx.send("❌ No hay nada en pausa.", ephemeral=True)
 
-    @commands.command(name="skip")
+    @commands.hybrid_command(name="skip")
     async def skip(self, ctx):
+        """Salta a la siguiente canción de la cola"""
         player: wavelink.Player = ctx.voice_client
         if player and player.is_playing():
+            queue = self.queues.get(ctx.guild.id)
+            if queue is not None and queue.loop == LOOP_TRACK:
+                # Al saltar no se repite la canción actual
+                queue.current = None
+            # Al terminar la pista, on_wavelink_track_end pasa a la siguiente
             await player.stop()
             await ctx.send("⏭️ Saltado.")
+        elif ctx.interaction is not None:
+            await ctx.send("❌ No está sonando nada.", ephemeral=True)
 
-    @commands.command(name="leave")
+    @commands.hybrid_command(name="leave")
     async def leave(self, ctx):
+        """Desconecta el bot del canal de voz y vacía la cola"""
+        queue = self.queues.pop(ctx.guild.id, None)
+        if queue is not None:
+            queue.clear()
         if ctx.voice_client:
             await ctx.voice_client.disconnect()
             await ctx.send("👋 Desconectado.")
+        elif ctx.interaction is not None:
+            await ctx.send("❌ No estoy en ningún canal de voz.", ephemeral=True)
 
 async def setup(bot):
     await bot.add_cog(MusicPlayerLavalink(bot))
\ No newline at end of file
@@ -1,13 +1,28 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import yt_dlp as youtube_dl
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.admission import Overloaded, cooldown, limit
+from utils.embeds import chunk_embeds, send_embeds
+from utils.metrics import HTTP_LATENCY
 
 logger = logging.getLogger('discord_bot.rubius')
 
+# Número de videos que se piden al canal y que se muestran
+LATEST_VIDEOS = 5
+# Minutos entre actualizaciones en segundo plano del listado
+REFRESH_MINUTES = 10
+
+# Hilos para las extracciones de yt-dlp, que son bloqueantes
+YTDL_WORKERS = 2
+
 class RubiusVideos(commands.Cog):
     """Comandos relacionados con El Rubius"""
-    
+
     def __init__(self, bot):
         self.bot = bot
         self.rubius_channel_url = "https://www.youtube.com/@elrubius/videos"
@@ -16,68 +31,132 @@ class RubiusVideos(commands.Cog):
             'extract_flat': True,
             'force_generic_extractor': True,
             'ignoreerrors': True,
+            'playlistend': LATEST_VIDEOS,  # Solo los más recientes, no el canal entero
         }
-    
-    @commands.command(name='rubiusnew')
-    async def rubius_new(self, ctx):
-        """Muestra los últimos 10 videos del Rubius Z"""
-        async with ctx.typing():
+        # Última copia válida del listado: {"info": {...}, "entries": [...], "updated_at": float}
+        self.snapshot = None
+        self.refresh_lock = asyncio.Lock()
+        self.ytdl_executor = None
+
+    async def cog_load(self):
+        # Pool acotado propio del cog: se cierra al descargarlo (p. ej. con !reload)
+        self.ytdl_executor = ThreadPoolExecutor(max_workers=YTDL_WORKERS, thread_name_prefix='ytdl')
+        self.refresh_snapshot.start()
+
+    async def cog_unload(self):
+        self.refresh_snapshot.cancel()
+        if self.ytdl_executor:
+            self.ytdl_executor.shutdown(wait=False, cancel_futures=True)
+
+    def extract_channel(self, url):
+        """Extrae la información del canal (bloqueante, se ejecuta en el pool)"""
+        with youtube_dl.YoutubeDL(self.ytdl_opts) as ytdl:
+            return ytdl.extract_info(url, download=False)
+
+    async def update_snapshot(self):
+        """Actualiza el listado sin bloquear el event loop; si falla, se conserva el anterior"""
+        requested_at = time.time()
+        async with self.refresh_lock:
+            # Si otra llamada lo actualizó mientras se esperaba el lock, no se repite la extracción
+            if self.snapshot is not None and self.snapshot["updated_at"] >= requested_at:
+                return self.snapshot
+
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
             try:
-                # Informar al usuario que estamos procesando su solicitud
-                await ctx.send("🔍 Buscando los últimos videos de El Rubius Z... Esto puede tardar unos segundos.")
-                
-                # Obtener datos del canal usando yt-dlp
-                with youtube_dl.YoutubeDL(self.ytdl_opts) as ytdl:
-                    info = ytdl.extract_info(self.rubius_channel_url, download=False)
-                    
-                    if 'entries' not in info:
-                        await ctx.send("❌ No se pudo obtener información del canal.")
-                        return
-                    
-                    # Tomar solo los 5 primeros videos (los más recientes)
-                    latest_videos = info['entries'][:5]
-                    
-                    if not latest_videos:
-                        await ctx.send("❌ No se encontraron videos recientes.")
-                        return
-                    
-                    # Crear un embed principal con información del canal
-                    embed = discord.Embed(
-                        title="📺 Últimos videos de El Rubius Z",
-                        color=discord.Color.red(),
-                        url=self.rubius_channel_url
-                    )
-                    
-                    # Añadir miniatura del canal en el embed principal
-                    if 'thumbnails' in info and info['thumbnails']:
-                        embed.set_thumbnail(url=info['thumbnails'][0]['url'])
-                    
-                    # Enviar embed principal
-                    await ctx.send(embed=embed)
-                    
-                    # Enviar un embed para cada video
-                    for i, video in enumerate(latest_videos, 1):
-                        title = video.get('title', 'Sin título')
-                        video_url = f"https://www.youtube.com/watch?v={video['id']}"
-                        
-                        # Crear embed individual para cada video
-                        video_embed = discord.Embed(
-                            title=f"{i}. {title}",
-                            url=video_url,
-                            color=discord.Color.red()
-                        )
-                        
-                        # Añadir miniatura si está disponible
-                        if 'thumbnails' in video and video['thumbnails']:
-                            # Elegir la miniatura de mejor calidad disponible
-                            thumbnail_url = video['thumbnails'][-1]['url']
-                            video_embed.set_image(url=thumbnail_url)
-                        
-                        await ctx.send(embed=video_embed)
-            
+                async with limit('yt_dlp'):
+                    with HTTP_LATENCY.time(backend='yt_dlp'):
+                        info = await loop.run_in_executor(self.ytdl_executor, self.extract_channel, self.rubius_channel_url)
+            except Overloaded:
+                raise
             except Exception as e:
-                logger.error(f"Error al obtener videos del Rubius: {str(e)}")
-                await ctx.send(f"❌ Error al obtener videos: {str(e)}")
+                logger.error(f"Error al actualizar videos del Rubius: {str(e)}")
+                return self.snapshot
+
+            entries = [entry for entry in (info or {}).get('entries') or [] if entry][:LATEST_VIDEOS]
+            if not entries:
+                logger.warning("La actualización no devolvió videos, se mantiene el listado anterior")
+                return self.snapshot
+
+            self.snapshot = {
+                "info": {"thumbnails": info.get('thumbnails') or []},
+                "entries": entries,
+                "updated_at": time.time(),
+            }
+            logger.info(f"Listado del Rubius actualizado en {time.perf_counter() - start:.2f}s")
+            return self.snapshot
+
+    @tasks.loop(minutes=REFRESH_MINUTES)
+    async def refresh_snapshot(self):
+        try:
+            await self.update_snapshot()
+        except Overloaded:
+            logger.warning("yt-dlp saturado, el listado se actualizará en la próxima vuelta")
+
+    @refresh_snapshot.before_loop
+    async def before_refresh_snapshot(self):
+        await self.bot.wait_until_ready()
+
+    def build_embeds(self, snapshot):
+        info = snapshot["info"]
+        latest_videos = snapshot["entries"]
+
+        # Crear un embed principal con información del canal
+        embed = discord.Embed(
+            title="📺 Últimos videos de El Rubius Z",
+            color=discord.Color.red(),
+            url=self.rubius_channel_url
+        )
+
+        # Añadir miniatura del canal en el embed principal
+        if info['thumbnails']:
+            embed.set_thumbnail(url=info['thumbnails'][0]['url'])
+
+        embeds = [embed]
+
+        # Un embed para cada video, todos enviados en un único mensaje
+        for i, video in enumerate(latest_videos, 1):
+            title = video.get('title', 'Sin título')
+            video_url = f"https://www.youtube.com/watch?v={video['id']}"
+
+            # Crear embed individual para cada video
+            video_embed = discord.Embed(
+                title=f"{i}. {title}",
+                url=video_url,
+                color=discord.Color.red()
+            )
+
+            # Añadir miniatura si está disponible
+            if 'thumbnails' in video and video['thumbnails']:
+                # Elegir la miniatura de mejor calidad disponible
+                thumbnail_url = video['thumbnails'][-1]['url']
+                video_embed.set_image(url=thumbnail_url)
+
+            embeds.append(video_embed)
+
+        return embeds
+
+    @commands.hybrid_command(name='rubiusnew')
+    @cooldown('rubiusnew')
+    async def rubius_new(self, ctx):
+        """Muestra los últimos 5 videos del Rubius Z"""
+        snapshot = self.snapshot
+        if snapshot is not None:
+            await send_embeds(ctx, self.build_embeds(snapshot))
+            return
+
+        # Solo la primera vez (antes de la primera actualización) hay que esperar a yt-dlp: se hace en la cola
+        # de tareas, y quienes lo pidan mientras tanto reciben el resultado de la misma extracción
+        def render(snapshot, message):
+            if snapshot is None:
+                return {"content": "❌ No se pudo obtener información del canal."}
+            # Cabecera y LATEST_VIDEOS videos caben en un solo mensaje
+            return {"content": None, "embeds": chunk_embeds(self.build_embeds(snapshot))[0]}
+
+        await self.bot.jobs.submit(ctx, "rubiusnew", "!rubiusnew", lambda job: self.update_snapshot(), render,
+                                   placeholder="🔍 Buscando los últimos videos de El Rubius Z... "
+                                               "Esto puede tardar unos segundos.",
+                                   error_message="❌ Error al obtener videos")
 
 async def setup(bot):
-    await bot.add_cog(RubiusVideos(bot))
\ No newline at end of file
+    await bot.add_cog(RubiusVideos(bot))
@@ -0,0 +1,323 @@
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+import aiohttp
+import asyncio
+import logging
+import os
+import random
+import time
+
+from utils.youtube_feeds import (
+    CHANNEL_ID_IN_PAGE_RE,
+    CHANNEL_ID_RE,
+    FeedSource,
+    FeedStore,
+    parse_feed,
+)
+from utils.embeds import send_embeds
+from utils.metrics import HTTP_LATENCY
+from utils.slash import defer
+
+logger = logging.getLogger('discord_bot.youtube_feeds')
+
+FEEDS_PATH = os.environ.get("YOUTUBE_FEEDS_PATH", "data/youtube_feeds.json")
+# Segundos entre sondeos de cada fuente y margen de variación aleatoria
+POLL_INTERVAL = int(os.environ.get("YOUTUBE_POLL_INTERVAL", "300"))
+POLL_JITTER = 0.2
+# Sondeos simultáneos como máximo
+MAX_CONCURRENT_POLLS = 8
+# Suscripciones en el almacén compartido: {channel_id de YouTube: {"title": ..., "channels": [...]}}.
+# Cualquier proceso las modifica; solo el que atiende el shard 0 sondea los feeds y guarda FEEDS_PATH.
+SUBSCRIPTIONS_KEY = "youtube_feeds:subscriptions"
+
+class YouTubeFeeds(commands.Cog):
+    """Suscripciones de canales de texto a canales de YouTube con anuncios automáticos"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.store = FeedStore(FEEDS_PATH)
+        self.sources = {}  # {channel_id de YouTube: FeedSource} (solo en el proceso que sondea)
+        self.poller = False
+        self.session = None
+        self.poll_semaphore = asyncio.Semaphore(MAX_CONCURRENT_POLLS)
+        self.save_lock = asyncio.Lock()
+
+    async def cog_load(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=MAX_CONCURRENT_POLLS, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=15)
+        )
+        # Con varios procesos cada video se descarga y se anuncia una sola vez, desde el del shard 0
+        self.poller = self.bot.owns_guild(None)
+        if not self.poller:
+            return
+        self.sources = await asyncio.to_thread(self.store.load)
+        file_subscriptions = {channel_id: {"title": source.title, "channels": sorted(source.channels)}
+                              for channel_id, source in self.sources.items()}
+        # El fichero solo se usa si el almacén compartido aún no tiene las suscripciones (memoria o primer arranque)
+        subscriptions = await self.bot.shared_store.update(
+            SUBSCRIPTIONS_KEY, lambda current: current if current is not None else file_subscriptions)
+        self.apply_subscriptions(subscriptions)
+        # Repartir los primeros sondeos para no lanzarlos todos a la vez
+        now = time.monotonic()
+        for source in self.sources.values():
+            source.next_poll = now + random.uniform(0, POLL_INTERVAL)
+        self.poll_feeds.start()
+        logger.info(f"Cargadas {len(self.sources)} fuentes de YouTube")
+
+    async def cog_unload(self):
+        if self.poller:
+            self.poll_feeds.cancel()
+            await self.save()
+        if self.session:
+            await self.session.close()
+
+    async def save(self):
+        async with self.save_lock:
+            await asyncio.to_thread(self.store.save, self.sources)
+
+    async def load_subscriptions(self):
+        return await self.bot.shared_store.get(SUBSCRIPTIONS_KEY) or {}
+
+    async def update_subscriptions(self, func):
+        """Modifica las suscripciones compartidas de forma atómica y las aplica si este proceso sondea"""
+        subscriptions = await self.bot.shared_store.update(SUBSCRIPTIONS_KEY, lambda current: func(current or {}))
+        if self.poller:
+            self.apply_subscriptions(subscriptions)
+        return subscriptions
+
+    def apply_subscriptions(self, subscriptions):
+        """Ajusta las fuentes sondeadas a las suscripciones compartidas (las nuevas se sondean enseguida)"""
+        for channel_id, entry in subscriptions.items():
+            source = self.sources.get(channel_id)
+            if source is None:
+                source = self.sources[channel_id] = FeedSource(channel_id, title=entry.get("title"))
+            source.channels = set(entry["channels"])
+        for channel_id in set(self.sources) - set(subscriptions):
+            del self.sources[channel_id]
+
+    def schedule(self, source):
+        """Programa el siguiente sondeo de la fuente con un intervalo con jitter"""
+        jitter = random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+        source.next_poll = time.monotonic() + POLL_INTERVAL * jitter
+
+    async def resolve_channel_id(self, query):
+        """Obtiene el ID (UC...) de un canal a partir de su ID, URL o @handle"""
+        query = query.strip().strip('<>')
+        if CHANNEL_ID_RE.match(query):
+            return query
+
+        match = CHANNEL_ID_IN_PAGE_RE.search(query)
+        if match:
+            return match.group(1)
+
+        if query.startswith('@'):
+            url = f"https://www.youtube.com/{query}"
+        elif query.startswith('http'):
+            url = query
+        else:
+            url = f"https://www.youtube.com/@{query}"
+
+        try:
+            async with self.session.get(url, cookies={"CONSENT": "YES+1"}) as response:
+                if response.status != 200:
+                    return None
+                page = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Error al buscar el canal de YouTube '{query}': {str(e)}")
+            return None
+        match = CHANNEL_ID_IN_PAGE_RE.search(page)
+        return match.group(1) if match else None
+
+    async def fetch_feed(self, source):
+        """Descarga el feed con una petición condicional; devuelve None si no ha cambiado"""
+        headers = {}
+        if source.etag:
+            headers['If-None-Match'] = source.etag
+        if source.last_modified:
+            headers['If-Modified-Since'] = source.last_modified
+
+        with HTTP_LATENCY.time(backend='youtube_feed'):
+            async with self.session.get(source.url, headers=headers) as response:
+                if response.status == 304:
+                    return None
+                if response.status != 200:
+                    raise RuntimeError(f"estado HTTP {response.status}")
+                source.etag = response.headers.get('ETag')
+                source.last_modified = response.headers.get('Last-Modified')
+                text = await response.text()
+
+        return parse_feed(text)
+
+    async def poll_source(self, source):
+        """Sondea una fuente y anuncia sus videos nuevos en todos los canales suscritos"""
+        async with self.poll_semaphore:
+            try:
+                result = await self.fetch_feed(source)
+            except Exception as e:
+                logger.warning(f"Error al sondear el feed de {source.channel_id}: {str(e)}")
+                return False
+            finally:
+                self.schedule(source)
+
+        if result is None:
+            return False
+
+        title, videos = result
+        source.title = title or source.title
+        new_videos = source.mark_new(videos)
+
+        # En el primer sondeo solo se registran los videos existentes
+        if not source.seeded:
+            source.seeded = True
+            return True
+
+        if new_videos:
+            await self.announce(source, new_videos)
+        return True
+
+    async def announce(self, source, videos):
+        """Anuncia los videos nuevos agrupando los embeds en el menor número de mensajes"""
+        embeds = []
+        for video in videos:
+            embed = discord.Embed(
+                title=video['title'],
+                url=f"https://www.youtube.com/watch?v={video['id']}",
+                description=f"📢 Nuevo video de **{source.title}**",
+                color=discord.Color.red()
+            )
+            if video['thumbnail']:
+                embed.set_image(url=video['thumbnail'])
+            embeds.append(embed)
+
+        for channel_id in list(source.channels):
+            # Con shards en otros procesos el canal puede no estar en caché; se envía igualmente por la API
+            channel = self.bot.get_channel(channel_id) or self.bot.get_partial_messageable(channel_id)
+            try:
+                await send_embeds(channel, embeds)
+            except discord.HTTPException as e:
+                logger.warning(f"No se pudo anunciar en el canal {channel_id}: {str(e)}")
+
+    @tasks.loop(seconds=15)
+    async def poll_feeds(self):
+        # Recoger las suscripciones hechas desde otros procesos
+        subscriptions = await self.load_subscriptions()
+        self.apply_subscriptions(subscriptions)
+
+        now = time.monotonic()
+        due = [source for source in self.sources.values() if source.channels and source.next_poll <= now]
+        if not due:
+            return
+
+        results = await asyncio.gather(*(self.poll_source(source) for source in due))
+        if any(results):
+            await self.save()
+        # Los títulos se conocen al sondear; se comparten para que los comandos los muestren
+        titles = {source.channel_id: source.title for source in self.sources.values()
+                  if source.title and subscriptions.get(source.channel_id, {}).get("title") != source.title}
+        if titles:
+            def set_titles(current):
+                for channel_id, title in titles.items():
+                    if channel_id in current:
+                        current[channel_id]["title"] = title
+                return current
+            await self.update_subscriptions(set_titles)
+
+    @poll_feeds.before_loop
+    async def before_poll_feeds(self):
+        await self.bot.wait_until_ready()
+
+    @commands.hybrid_command(name='suscribir')
+    @commands.has_permissions(manage_channels=True)
+    @app_commands.describe(youtube_channel="URL, @usuario o ID del canal de YouTube",
+                           channel="Canal donde anunciar los videos (por defecto, este)")
+    async def subscribe(self, ctx, youtube_channel: str, channel: discord.TextChannel = None):
+        """Anuncia los nuevos videos de un canal de YouTube en este canal (o en el indicado)"""
+        await defer(ctx)
+        channel = channel or ctx.channel
+        channel_id = await self.resolve_channel_id(youtube_channel)
+        if channel_id is None:
+            await ctx.send("❌ No se encontró el canal de YouTube.")
+            return
+
+        added = False
+
+        def add(subscriptions):
+            nonlocal added
+            entry = subscriptions.setdefault(channel_id, {"title": None, "channels": []})
+            if channel.id not in entry["channels"]:
+                entry["channels"].append(channel.id)
+                added = True
+            return subscriptions
+
+        subscriptions = await self.update_subscriptions(add)
+        if not added:
+            await ctx.send(f"ℹ️ {channel.mention} ya está suscrito a ese canal.")
+            return
+
+        title = subscriptions[channel_id]["title"]
+        if self.poller:
+            source = self.sources[channel_id]
+            if not source.seeded:
+                # Registrar los videos actuales para anunciar solo los que se suban después
+                await self.poll_source(source)
+            await self.save()
+            title = source.title or title
+        # En otro proceso, el que sondea registra los videos actuales en su próxima vuelta
+
+        await ctx.send(f"✅ {channel.mention} recibirá los nuevos videos de **{title or channel_id}**.")
+
+    @commands.hybrid_command(name='desuscribir')
+    @commands.has_permissions(manage_channels=True)
+    @app_commands.describe(youtube_channel="URL, @usuario o ID del canal de YouTube",
+                           channel="Canal con la suscripción (por defecto, este)")
+    async def unsubscribe(self, ctx, youtube_channel: str, channel: discord.TextChannel = None):
+        """Deja de anunciar los videos de un canal de YouTube"""
+        await defer(ctx)
+        channel = channel or ctx.channel
+        channel_id = await self.resolve_channel_id(youtube_channel)
+        removed = None
+
+        def remove(subscriptions):
+            nonlocal removed
+            entry = subscriptions.get(channel_id)
+            if entry is not None and channel.id in entry["channels"]:
+                entry["channels"].remove(channel.id)
+                removed = entry
+                if not entry["channels"]:
+                    del subscriptions[channel_id]
+            return subscriptions
+
+        await self.update_subscriptions(remove)
+        if removed is None:
+            await ctx.send("❌ Ese canal no tiene esa suscripción.")
+            return
+        if self.poller:
+            await self.save()
+
+        await ctx.send(f"🗑️ {channel.mention} ya no recibirá videos de **{removed['title'] or channel_id}**.")
+
+    @commands.hybrid_command(name='suscripciones')
+    @commands.guild_only()
+    async def subscriptions(self, ctx):
+        """Muestra las suscripciones de YouTube de este servidor"""
+        guild_channels = {channel.id for channel in ctx.guild.text_channels}
+        lines = []
+        for youtube_id, entry in (await self.load_subscriptions()).items():
+            for channel_id in sorted(set(entry["channels"]) & guild_channels):
+                lines.append(f"• **{entry['title'] or youtube_id}** → <#{channel_id}>")
+
+        if not lines:
+            await ctx.send("ℹ️ Este servidor no tiene suscripciones de YouTube.")
+            return
+
+        embed = discord.Embed(
+            title="📺 Suscripciones de YouTube",
+            description='\n'.join(lines),
+            color=discord.Color.red()
+        )
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(YouTubeFeeds(bot))
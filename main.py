@@ -1,16 +1,31 @@
 import discord
 from discord.ext import commands
+import asyncio
 import os
 import logging
+import pkgutil
 import ssl
+import time
 import certifi
-import os
+
+import cogs
+from utils.admission import busy_message
+from utils.jobs import JobQueue
+from utils.message_router import MessageRouter
+from utils.shard_supervisor import ShardSupervisor, fetch_recommended_shards, parse_shard_ids
+from utils.shared_store import create_shared_store
+from utils.slash import sync_command_tree
 
 ssl._create_default_https_context = ssl.create_default_context(cafile=certifi.where())
-# Importar los módulos de cogs
 
 DISCORD_TOKEN = os.environ.get("DISCORD_TOKEN")
 DISCORD_PREFIX = os.environ.get("DISCORD_PREFIX", "!") 
+# Con DISCORD_PREFIX_COMMANDS=off solo hay comandos de barra: no se analiza cada mensaje ni se pide
+# el intent message_content (Fama y Toque se juega entonces con /adivinar)
+DISCORD_PREFIX_COMMANDS = os.environ.get("DISCORD_PREFIX_COMMANDS", "on").lower() != "off"
+# Sincronización de los comandos de barra al arrancar: 'auto' (solo si han cambiado), 'always' u 'off'
+COMMAND_SYNC = os.environ.get("COMMAND_SYNC", "auto").lower()
+COMMAND_SYNC_STATE_PATH = os.environ.get("COMMAND_SYNC_STATE_PATH", "data/command_tree.json")
 
 # Configurar logging
 logging.basicConfig(
@@ -19,43 +34,182 @@ logging.basicConfig(
 )
 logger = logging.getLogger('discord_bot')
 
+# Extensiones que no se deben cargar (separadas por comas, p. ej. "music_player,rubius_videos")
+DISABLED_COGS = {name.strip() for name in os.environ.get("DISCORD_DISABLED_COGS", "").split(",") if name.strip()}
+
+# Modo con shards (opcional): DISCORD_SHARDING=auto usa AutoShardedBot. Con DISCORD_WORKERS>1 este
+# proceso solo supervisa y reparte los shards entre varios procesos hijos.
+DISCORD_SHARDING = os.environ.get("DISCORD_SHARDING", "off").lower()
+DISCORD_SHARD_COUNT = int(os.environ["DISCORD_SHARD_COUNT"]) if os.environ.get("DISCORD_SHARD_COUNT") else None
+DISCORD_SHARD_IDS = parse_shard_ids(os.environ["DISCORD_SHARD_IDS"]) if os.environ.get("DISCORD_SHARD_IDS") else None
+DISCORD_WORKERS = int(os.environ.get("DISCORD_WORKERS", "1"))
+# Estado compartido entre procesos (cooldowns, cachés): 'memory' para un solo proceso o 'sqlite'
+SHARED_STORE = os.environ.get("SHARED_STORE", "memory")
+SHARED_STORE_PATH = os.environ.get("SHARED_STORE_PATH", "data/shared.db")
+# Tareas lentas en segundo plano: workers simultáneos, tareas en cola como máximo y segundos entre
+# actualizaciones del mensaje de progreso
+JOBS_WORKERS = int(os.environ.get("JOBS_WORKERS", "4"))
+JOBS_MAX_QUEUED = int(os.environ.get("JOBS_MAX_QUEUED", "100"))
+JOBS_PROGRESS_INTERVAL = float(os.environ.get("JOBS_PROGRESS_INTERVAL", "2"))
+
+# Perfil de cachés de discord.py: 'default' o 'low_memory'. DISCORD_MAX_MESSAGES (0 = sin caché de
+# mensajes) y DISCORD_MEMBER_CACHE ('none', 'voice', 'joined' o p. ej. 'voice,joined') ajustan el perfil.
+CACHE_PROFILES = {
+    "default": {"max_messages": 1000, "member_cache": "voice", "disabled_intents": ()},
+    # El bot no usa emojis, stickers, reacciones ni eventos de escritura: sin esos intents no se guardan
+    "low_memory": {
+        "max_messages": 0,
+        "member_cache": "voice",
+        "disabled_intents": ("emojis_and_stickers", "reactions", "typing", "invites", "webhooks",
+                             "integrations", "guild_scheduled_events", "auto_moderation"),
+    },
+}
+DISCORD_CACHE_PROFILE = os.environ.get("DISCORD_CACHE_PROFILE", "default")
+DISCORD_MAX_MESSAGES = os.environ.get("DISCORD_MAX_MESSAGES")
+DISCORD_MEMBER_CACHE = os.environ.get("DISCORD_MEMBER_CACHE")
+
+
+def discover_extensions():
+    """Devuelve los módulos del paquete cogs que definen una extensión"""
+    return [
+        f"{cogs.__name__}.{module.name}"
+        for module in pkgutil.iter_modules(cogs.__path__)
+        if not module.name.startswith('_') and module.name not in DISABLED_COGS
+    ]
+
+
+class DiscordBot(commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = MessageRouter(self, process_commands=DISCORD_PREFIX_COMMANDS)
+        self.shared_store = create_shared_store(SHARED_STORE, SHARED_STORE_PATH)
+        self.jobs = JobQueue(JOBS_WORKERS, JOBS_MAX_QUEUED, JOBS_PROGRESS_INTERVAL)
+
+    def owns_guild(self, guild_id):
+        """Indica si los eventos de `guild_id` (None para mensajes directos) llegan a este proceso"""
+        shard_ids = getattr(self, 'shard_ids', None)
+        if not self.shard_count or shard_ids is None:
+            return True
+        # Discord envía los mensajes directos por el shard 0
+        shard_id = (guild_id >> 22) % self.shard_count if guild_id else 0
+        return shard_id in shard_ids
+
+    async def load_timed_extension(self, name):
+        """Carga una extensión y devuelve el tiempo que ha tardado (importación + setup)"""
+        start = time.perf_counter()
+        await self.load_extension(name)
+        return time.perf_counter() - start
+
+    async def setup_hook(self):
+        # Se ejecuta una sola vez antes de conectar al gateway (no en cada reconexión)
+        await self.shared_store.start()
+        self.jobs.start()
+        extensions = discover_extensions()
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.load_timed_extension(name) for name in extensions),
+            return_exceptions=True
+        )
+        for name, result in zip(extensions, results):
+            if isinstance(result, BaseException):
+                logger.error(f'Error al cargar el módulo {name}: {str(result)}')
+            else:
+                logger.info(f'Módulo cargado: {name} ({result * 1000:.0f}ms)')
+        logger.info(f'{len(extensions)} módulos procesados en {(time.perf_counter() - start) * 1000:.0f}ms')
+        await self.sync_commands()
+
+    async def sync_commands(self, force=False):
+        """Publica los comandos de barra si han cambiado desde la última sincronización"""
+        # Con varios procesos solo sincroniza el que atiende el shard 0
+        if COMMAND_SYNC == 'off' or not self.owns_guild(None):
+            return False
+        return await sync_command_tree(self.tree, COMMAND_SYNC_STATE_PATH, force=force or COMMAND_SYNC == 'always')
+
+    async def on_message(self, message):
+        # Sustituye al on_message por defecto: los comandos se procesan una sola vez
+        await self.router.dispatch(message)
+
+    async def on_command_error(self, ctx, error):
+        # Rechazos por carga o cooldown: se avisa al usuario de cuándo puede reintentar
+        message = busy_message(error)
+        if message is not None:
+            await ctx.send(message, delete_after=10)
+            return
+        # Un comando de barra sin respuesta aparece como fallido en Discord: se explica el motivo
+        if ctx.interaction is not None and isinstance(error, (commands.CheckFailure, commands.UserInputError)):
+            await ctx.send(f"❌ {error}", ephemeral=True)
+            return
+        await super().on_command_error(ctx, error)
+
+    async def on_ready(self):
+        logger.info(f'Bot conectado como {self.user.name}')
+        logger.info('¡Bot listo!')
+
+    async def close(self):
+        await self.jobs.close()
+        await super().close()
+        await self.shared_store.close()
+
+
+class ShardedDiscordBot(DiscordBot, commands.AutoShardedBot):
+    """Mismo bot con varias conexiones al gateway (todos los shards o el rango DISCORD_SHARD_IDS)"""
+
+    async def on_shard_ready(self, shard_id):
+        logger.info(f'Shard {shard_id} listo')
+
+
+def member_cache_flags(value):
+    """'voice,joined' -> MemberCacheFlags; 'none' deja solo al propio bot en la caché"""
+    flags = discord.MemberCacheFlags.none()
+    for name in value.split(','):
+        name = name.strip()
+        if name and name != 'none':
+            setattr(flags, name, True)
+    return flags
+
+
+def client_options():
+    """Intents y cachés de discord.py según el perfil configurado"""
+    profile = CACHE_PROFILES[DISCORD_CACHE_PROFILE]
+    intents = discord.Intents.default()
+    intents.message_content = DISCORD_PREFIX_COMMANDS
+    for name in profile["disabled_intents"]:
+        setattr(intents, name, False)
+
+    max_messages = int(DISCORD_MAX_MESSAGES) if DISCORD_MAX_MESSAGES is not None else profile["max_messages"]
+    return {
+        "intents": intents,
+        # discord.py trata 0 como el valor por defecto (1000); None desactiva la caché
+        "max_messages": max_messages or None,
+        "member_cache_flags": member_cache_flags(DISCORD_MEMBER_CACHE or profile["member_cache"]),
+        # Sin el intent de miembros no hay nada que pedir al arrancar; los datos se piden bajo demanda
+        "chunk_guilds_at_startup": False,
+    }
+
+
+def create_bot():
+    options = client_options()
+    if DISCORD_SHARDING == 'auto':
+        return ShardedDiscordBot(command_prefix=DISCORD_PREFIX, shard_count=DISCORD_SHARD_COUNT,
+                                 shard_ids=DISCORD_SHARD_IDS, **options)
+    return DiscordBot(command_prefix=DISCORD_PREFIX, **options)
+
+
+async def run_supervisor():
+    shard_count, max_concurrency = DISCORD_SHARD_COUNT, 1
+    if shard_count is None:
+        shard_count, max_concurrency = await fetch_recommended_shards(DISCORD_TOKEN)
+    # Al menos un shard por proceso
+    shard_count = max(shard_count, DISCORD_WORKERS)
+    supervisor = ShardSupervisor(os.path.abspath(__file__), shard_count, DISCORD_WORKERS, max_concurrency)
+    await supervisor.run()
+
 # Crear instancia del bot con intents
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix=DISCORD_PREFIX, intents=intents)
-
-@bot.event
-async def on_ready():
-    logger.info(f'Bot conectado como {bot.user.name}')
-    
-    # Cargar todos los cogs (módulos)
-    try:
-        # Mostrar directorio actual para debugging
-        current_dir = os.getcwd()
-        logger.info(f"Directorio actual: {current_dir}")
-        
-        # Cargar el módulo music_player
-        await bot.load_extension('cogs.music_player')
-        logger.info('Módulo cargado: music_player')
-        
-        # Cargar el nuevo módulo para videos del Rubius
-        await bot.load_extension('cogs.rubius_videos')
-        logger.info('Módulo cargado: rubius_videos')
-
-        await bot.load_extension('cogs.fama_toque')
-        logger.info('Módulo cargado: fama_toque')
-
-        await bot.load_extension('cogs.book_search')
-        logger.info('Módulo cargado: book_search')
-
-        await bot.load_extension('cogs.comandos_globales')
-        logger.info('Módulo cargado: global_commands')
-
-    except Exception as e:
-        logger.error(f'Error al cargar módulos: {str(e)}')
-
-    logger.info('¡Bot listo!')
-
-# Iniciar el bot
+bot = create_bot()
+
+# Iniciar el bot (o el supervisor de procesos)
 if __name__ == '__main__':
-    bot.run(DISCORD_TOKEN)
\ No newline at end of file
+    if DISCORD_WORKERS > 1:
+        asyncio.run(run_supervisor())
+    else:
+        bot.run(DISCORD_TOKEN)
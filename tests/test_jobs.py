@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+from utils.jobs import JobQueue
+
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, **kwargs):
+        self.edits.append(kwargs)
+
+
+class FakeAuthor:
+    id = 1
+
+
+class FakeContext:
+    author = FakeAuthor()
+
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content):
+        message = FakeMessage()
+        self.messages.append(message)
+        return message
+
+
+class JobQueueCloseTest(unittest.IsolatedAsyncioTestCase):
+    async def test_close_with_job_that_swallows_cancel(self):
+        """Un trabajo que atiende la cancelación y devuelve un resultado parcial no bloquea el cierre"""
+        started = asyncio.Event()
+
+        async def run(job):
+            started.set()
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                return "parcial"
+            return "completo"
+
+        queue = JobQueue(workers=2)
+        queue.start()
+        ctx = FakeContext()
+        job = await queue.submit(ctx, "purge:1", "borrado", run, lambda result, message: {"content": result},
+                                 "⏳ Borrando...")
+        await started.wait()
+
+        await asyncio.wait_for(queue.close(), timeout=5)
+
+        self.assertEqual(job.status, "cancelled")
+        self.assertTrue(job.done)
+        self.assertEqual(ctx.messages[0].edits, [])
+        self.assertTrue(all(task.done() for task in queue._tasks))
+
+
+if __name__ == '__main__':
+    unittest.main()
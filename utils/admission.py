@@ -0,0 +1,203 @@
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import time
+
+from discord.ext import commands
+
+from utils.metrics import ADMISSION_SHED, COOLDOWN_REJECTIONS, register_limiter
+
+logger = logging.getLogger('discord_bot.admission')
+
+# Límites por servicio externo:
+#   concurrency: peticiones simultáneas | rate/burst: cubo de fichas (peticiones por segundo, 0 = sin límite)
+#   max_waiting: peticiones en espera antes de rechazar | max_wait: segundos máximos de espera
+DEFAULT_LIMITS = {
+    "openlibrary": {"concurrency": 8, "rate": 10.0, "burst": 10, "max_waiting": 50, "max_wait": 10.0},
+    "yt_dlp": {"concurrency": 2, "rate": 0.0, "burst": 1, "max_waiting": 4, "max_wait": 30.0},
+    "lavalink": {"concurrency": 10, "rate": 20.0, "burst": 20, "max_waiting": 100, "max_wait": 10.0},
+}
+
+# Cooldowns de los comandos caros: {comando: {"user"|"guild": [usos, segundos]}}
+DEFAULT_COOLDOWNS = {
+    "libro": {"user": [3, 10], "guild": [15, 10]},
+    "rubiusnew": {"user": [1, 10], "guild": [3, 10]},
+    "play": {"user": [5, 10], "guild": [10, 10]},
+}
+
+BUCKET_TYPES = {"user": commands.BucketType.user, "guild": commands.BucketType.guild}
+
+
+class Overloaded(commands.CommandError):
+    """El servicio externo no admite más peticiones ahora mismo"""
+
+    def __init__(self, backend, retry_after):
+        self.backend = backend
+        self.retry_after = retry_after
+        super().__init__(f"{backend} saturado, reintentar en {retry_after:.0f}s")
+
+
+class TokenBucket:
+    """Cubo de fichas: `rate` fichas por segundo hasta un máximo de `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """Consume una ficha y devuelve cuántos segundos hay que esperar a que esté disponible"""
+        if not self.rate:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class BackendLimiter:
+    """Control de admisión de un servicio externo.
+
+    Un semáforo acota las peticiones simultáneas y un cubo de fichas su ritmo.
+    Las que no caben esperan en una cola acotada; si la cola está llena o la
+    espera supera `max_wait`, se rechazan con `Overloaded` en lugar de acumularse.
+    """
+
+    def __init__(self, name, concurrency, rate=0.0, burst=1, max_waiting=50, max_wait=10.0):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+        self.avg_duration = 1.0  # media móvil de la duración de cada petición (segundos)
+
+    def retry_after(self):
+        """Estimación de cuándo habrá hueco según la cola y la duración media"""
+        return max(1.0, self.avg_duration * (self.waiting + 1) / self.concurrency)
+
+    def _reject(self):
+        self.shed += 1
+        ADMISSION_SHED.inc(backend=self.name)
+        retry_after = self.retry_after()
+        logger.warning(f"Petición a {self.name} rechazada ({self.active} activas, {self.waiting} en espera)")
+        return Overloaded(self.name, retry_after)
+
+    async def _acquire(self):
+        await self.semaphore.acquire()
+        try:
+            delay = self.bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self.waiting >= self.max_waiting:
+            raise self._reject()
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            raise self._reject() from None
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+            self.avg_duration = 0.8 * self.avg_duration + 0.2 * (time.monotonic() - start)
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "rate": self.bucket.rate,
+            "max_waiting": self.max_waiting,
+            "active": self.active,
+            "waiting": self.waiting,
+        }
+
+
+def _load_config(env_name, defaults):
+    """Valores por defecto con los cambios de la variable de entorno (JSON) aplicados por clave"""
+    config = {name: dict(values) for name, values in defaults.items()}
+    overrides = os.environ.get(env_name)
+    if overrides:
+        for name, values in json.loads(overrides).items():
+            config.setdefault(name, {}).update(values)
+    return config
+
+
+# ADMISSION_LIMITS='{"openlibrary": {"concurrency": 4}}' cambia solo esa clave
+LIMITERS = {
+    name: BackendLimiter(name, **config)
+    for name, config in _load_config("ADMISSION_LIMITS", DEFAULT_LIMITS).items()
+}
+for _name, _limiter in LIMITERS.items():
+    register_limiter(_name, _limiter)
+
+COOLDOWNS = _load_config("COMMAND_COOLDOWNS", DEFAULT_COOLDOWNS)
+
+
+def limit(backend):
+    """Context manager asíncrono que reserva un hueco en `backend`"""
+    return LIMITERS[backend].slot()
+
+
+def cooldown(command):
+    """Cooldowns por usuario y por servidor configurados para `command`.
+
+    Se aplican en un before_invoke del comando y no en un check: los checks
+    también se evalúan sin ejecutar el comando (p. ej. !help con verify_checks)
+    y gastarían el cupo. Los contadores viven en el almacén compartido del bot,
+    así que se respetan aunque el usuario escriba en servidores atendidos por
+    procesos distintos.
+    """
+    rules = [(scope, rate, per) for scope, (rate, per) in COOLDOWNS.get(command, {}).items()]
+
+    async def hook(*args):
+        ctx = args[-1]  # en un cog discord.py pasa también la instancia
+        store = ctx.bot.shared_store
+        buckets = [(scope, rate, per, f"cooldown:{command}:{scope}:{BUCKET_TYPES[scope].get_key(ctx.message)}")
+                   for scope, rate, per in rules]
+        # El incremento es atómico en el almacén; si algún cupo se pasa, se devuelve lo consumido
+        taken = []
+        for scope, rate, per, key in buckets:
+            count, expires_at = await store.incr(key, per)
+            taken.append((key, per))
+            if count > rate:
+                for taken_key, taken_per in taken:
+                    await store.incr(taken_key, taken_per, amount=-1)
+                COOLDOWN_REJECTIONS.inc(command=command, scope=scope)
+                raise commands.CommandOnCooldown(commands.Cooldown(rate, per), max(0.0, expires_at - time.time()),
+                                                 BUCKET_TYPES[scope])
+
+    return commands.before_invoke(hook)
+
+
+def busy_message(error):
+    """Respuesta para el usuario cuando se rechaza un comando por carga o cooldown; None si no aplica"""
+    if isinstance(error, commands.CommandInvokeError):
+        error = error.original
+    if isinstance(error, Overloaded):
+        return f"⏳ Hay mucha demanda ahora mismo. Intenta de nuevo en {math.ceil(error.retry_after)}s."
+    if isinstance(error, commands.CommandOnCooldown):
+        if error.type is commands.BucketType.guild:
+            return f"⏳ Este comando se está usando mucho en el servidor. Intenta de nuevo en {math.ceil(error.retry_after)}s."
+        return f"⏳ Vas muy rápido. Intenta de nuevo en {math.ceil(error.retry_after)}s."
+    return None
@@ -0,0 +1,268 @@
+"""Índice local de libros (SQLite FTS5) construido a partir de los volcados de Open Library.
+
+Uso: python -m utils.book_index [--db data/books.db] ol_dump_authors.txt.gz ol_dump_works.txt.gz
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger('discord_bot.book_index')
+
+# Filas por transacción durante la importación
+BATCH_SIZE = 5000
+# Orden de las coincidencias: bm25 con el peso de cada columna (título, subtítulo, autores)
+RANK = "bm25(10.0, 2.0, 4.0)"
+# Consultas cuya clasificación se guarda: con palabras muy comunes puntuar todas las coincidencias
+# cuesta decenas de ms, así se paga una vez y no en cada página ni en cada repetición
+HITS_CACHE_SIZE = 256
+# Longitud mínima de la última palabra para buscarla también como prefijo
+MIN_PREFIX = 3
+YEAR_RE = re.compile(r'\b(\d{4})\b')
+WORD_RE = re.compile(r'\w+')
+
+
+def open_dump(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def parse_dump(lines):
+    """Registros (tipo, JSON) de un volcado: tipo, clave, revisión, fecha y JSON separados por tabuladores"""
+    for line in lines:
+        parts = line.split('\t', 4)
+        if len(parts) != 5:
+            continue
+        try:
+            yield parts[0], json.loads(parts[4])
+        except ValueError:
+            continue
+
+
+def work_row(record):
+    title = record.get('title')
+    if not title or 'key' not in record:
+        return None
+    author_keys = []
+    for entry in record.get('authors', []):
+        author = entry.get('author') if isinstance(entry, dict) else None
+        # Algunas obras antiguas guardan la clave directamente en lugar de {"key": ...}
+        key = author.get('key') if isinstance(author, dict) else author
+        if isinstance(key, str):
+            author_keys.append(key)
+    year = YEAR_RE.search(str(record.get('first_publish_date') or ''))
+    covers = [cover for cover in record.get('covers', []) if isinstance(cover, int) and cover > 0]
+    return (record['key'], title, record.get('subtitle'), json.dumps(author_keys),
+            int(year.group(1)) if year else None, covers[0] if covers else None)
+
+
+def author_row(record):
+    if not record.get('name') or 'key' not in record:
+        return None
+    return record['key'], record['name']
+
+
+def match_expression(query):
+    """Consulta FTS5 con todas las palabras; la última también como prefijo ("don" "quij"*)"""
+    words = WORD_RE.findall(query.casefold())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    if len(words[-1]) >= MIN_PREFIX:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class BookIndex:
+    """Obras de Open Library indexadas por título, subtítulo y autores.
+
+    Las búsquedas devuelven el mismo formato que la API ({"numFound", "docs"})
+    ordenado por bm25. `imported_at` indica cuándo se terminó la última importación
+    para que el cog pueda ignorar un índice desactualizado.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.imported_at = None
+        self._hits = OrderedDict()  # {(consulta FTS, máximo): [id, ...] ordenados por bm25}
+        self._lock = asyncio.Lock()
+
+    def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS works ("
+            "id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, title TEXT NOT NULL, subtitle TEXT, "
+            "author_keys TEXT NOT NULL, author_name TEXT, first_publish_year INTEGER, cover_i INTEGER);"
+            "CREATE TABLE IF NOT EXISTS authors (key TEXT PRIMARY KEY, name TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'imported_at'").fetchone()
+        self.imported_at = float(row[0]) if row else None
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def age(self):
+        """Segundos desde la última importación o None si el índice está vacío"""
+        return time.time() - self.imported_at if self.imported_at is not None else None
+
+    def import_dump(self, path, progress=None):
+        """Importa un volcado de obras o de autores leyendo línea a línea (memoria constante).
+
+        Devuelve {tipo: filas}. Hay que llamar a `finalize` cuando estén todos importados.
+        """
+        self.conn.execute("PRAGMA synchronous=OFF")
+        tables = {
+            "/type/work": (work_row, "INSERT OR REPLACE INTO works "
+                                     "(key, title, subtitle, author_keys, first_publish_year, cover_i) "
+                                     "VALUES (?, ?, ?, ?, ?, ?)"),
+            "/type/author": (author_row, "INSERT OR REPLACE INTO authors VALUES (?, ?)"),
+        }
+        batches = {record_type: [] for record_type in tables}
+        counts = dict.fromkeys(tables, 0)
+
+        def flush(record_type):
+            self.conn.execute("BEGIN")
+            self.conn.executemany(tables[record_type][1], batches[record_type])
+            self.conn.execute("COMMIT")
+            counts[record_type] += len(batches[record_type])
+            batches[record_type].clear()
+            if progress:
+                progress(counts)
+
+        with open_dump(path) as lines:
+            for record_type, record in parse_dump(lines):
+                if record_type not in tables:
+                    continue
+                row = tables[record_type][0](record)
+                if row is None:
+                    continue
+                batches[record_type].append(row)
+                if len(batches[record_type]) >= BATCH_SIZE:
+                    flush(record_type)
+        for record_type in tables:
+            if batches[record_type]:
+                flush(record_type)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        return counts
+
+    def finalize(self):
+        """Resuelve los nombres de los autores y reconstruye el índice de texto completo"""
+        self.conn.execute("BEGIN")
+        self.conn.execute(
+            "UPDATE works SET author_name = (SELECT json_group_array(authors.name) "
+            "FROM json_each(works.author_keys) JOIN authors ON authors.key = json_each.value)"
+        )
+        # Sin contenido propio (content=''): solo guarda los términos; los datos se leen de `works`
+        self.conn.execute("DROP TABLE IF EXISTS works_fts")
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE works_fts USING fts5(title, subtitle, authors, content='', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='3 4')"
+        )
+        self.conn.execute(
+            "INSERT INTO works_fts(rowid, title, subtitle, authors) "
+            "SELECT id, title, coalesce(subtitle, ''), "
+            "coalesce((SELECT group_concat(value, ' ') FROM json_each(works.author_name)), '') FROM works"
+        )
+        self.conn.execute("INSERT INTO works_fts(works_fts) VALUES ('optimize')")
+        # Orden por defecto de la tabla: queda guardado en el índice para ORDER BY rank
+        self.conn.execute("INSERT INTO works_fts(works_fts, rank) VALUES ('rank', ?)", (RANK,))
+        self.imported_at = time.time()
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('imported_at', ?)", (str(self.imported_at),))
+        self.conn.execute("COMMIT")
+        self._hits.clear()
+
+    def ranked_hits(self, expression, max_results):
+        """Ids de las `max_results` mejores coincidencias ordenados por bm25.
+
+        Se puntúan todas las coincidencias (ORDER BY rank con LIMIT solo conserva las
+        mejores, no corta antes de ordenar), así que ninguna buena se queda fuera.
+        """
+        key = (expression, max_results)
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = [rowid for rowid, in self.conn.execute(
+                "SELECT rowid FROM works_fts WHERE works_fts MATCH ? ORDER BY rank LIMIT ?",
+                (expression, max_results)
+            )]
+            self._hits[key] = hits
+            if len(self._hits) > HITS_CACHE_SIZE:
+                self._hits.popitem(last=False)
+        else:
+            self._hits.move_to_end(key)
+        return hits
+
+    def search_sync(self, query, page=0, page_size=5, max_results=100):
+        expression = match_expression(query)
+        if expression is None or self.imported_at is None:
+            return {"numFound": 0, "docs": []}
+        hits = self.ranked_hits(expression, max_results)
+        ids = hits[page * page_size:(page + 1) * page_size]
+        rows = self.conn.execute(
+            "SELECT id, key, title, author_name, first_publish_year, cover_i FROM works "
+            f"WHERE id IN ({', '.join('?' * len(ids))})", ids
+        ).fetchall() if ids else []
+        rows.sort(key=lambda row: ids.index(row[0]))
+        docs = []
+        for _, key, title, author_name, year, cover in rows:
+            doc = {"key": key, "title": title}
+            authors = json.loads(author_name) if author_name else []
+            if authors:
+                doc["author_name"] = authors
+            if year is not None:
+                doc["first_publish_year"] = year
+            if cover is not None:
+                doc["cover_i"] = cover
+            docs.append(doc)
+        return {"numFound": len(hits), "docs": docs}
+
+    async def open(self):
+        await asyncio.to_thread(self.connect)
+
+    async def search(self, query, page=0, page_size=5, max_results=100):
+        async with self._lock:
+            return await asyncio.to_thread(self.search_sync, query, page, page_size, max_results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('dumps', nargs='+', help="volcados de obras y autores (.txt o .txt.gz)")
+    parser.add_argument('--db', default=os.environ.get("BOOK_INDEX_PATH") or "data/books.db")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    index = BookIndex(args.db)
+    index.connect()
+    start = time.perf_counter()
+    for path in args.dumps:
+        last_report = [time.perf_counter()]
+
+        def progress(counts):
+            if time.perf_counter() - last_report[0] >= 10:
+                last_report[0] = time.perf_counter()
+                logger.info(f"{path}: {sum(counts.values())} registros")
+
+        counts = index.import_dump(path, progress)
+        logger.info(f"{path}: {counts.get('/type/work', 0)} obras y {counts.get('/type/author', 0)} autores")
+    index.finalize()
+    index.close()
+    logger.info(f"Índice creado en {args.db} en {time.perf_counter() - start:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import math
+
+import discord
+
+from utils.admission import Overloaded, busy_message
+
+logger = logging.getLogger('discord_bot.books')
+
+# Discord exige responder a una interacción en 3 segundos; si la página tarda más se confirma antes
+INTERACTION_DEADLINE = 2.0
+
+
+def book_embed(book):
+    """Embed con los detalles de un resultado de Open Library"""
+    embed = discord.Embed(
+        title=book.get('title', 'Título desconocido'),
+        color=discord.Color.blue()
+    )
+
+    # Añadir autor si está disponible
+    authors = book.get('author_name', ['Autor desconocido'])
+    author_text = ', '.join(authors[:3])
+    if len(authors) > 3:
+        author_text += f" y {len(authors) - 3} más"
+    embed.add_field(name="✍️ Autor", value=author_text, inline=False)
+
+    # Añadir año de publicación si está disponible
+    if 'first_publish_year' in book:
+        embed.add_field(name="📅 Año de publicación", value=book['first_publish_year'], inline=True)
+
+    # Añadir idioma si está disponible
+    languages = book.get('language', [])
+    if languages:
+        embed.add_field(name="🌐 Idioma", value=', '.join(languages[:3]), inline=True)
+
+    # Añadir enlace a Open Library
+    if 'key' in book:
+        # Extraer el ID de la obra de la clave
+        work_id = book['key'].split('/')[-1]
+        book_link = f"https://openlibrary.org{book['key']}"
+        embed.url = book_link
+
+        # Añadir enlace para leer el libro si está disponible
+        read_link = f"https://openlibrary.org/works/{work_id}/check-in"
+        embed.add_field(
+            name="📚 Leer",
+            value=f"[Ver en Open Library]({book_link}) | [Verificar disponibilidad]({read_link})",
+            inline=False
+        )
+
+    # Añadir portada si está disponible
+    if 'cover_i' in book:
+        cover_url = f"https://covers.openlibrary.org/b/id/{book['cover_i']}-L.jpg"
+        embed.set_thumbnail(url=cover_url)
+
+    return embed
+
+
+class BookResultsView(discord.ui.View):
+    """Resultados de !libro por páginas: botones para cambiar de página y un menú para ver cada libro.
+
+    Solo se guarda la página visible; las demás se piden con `fetch_page(query, page)`,
+    que pasa por la caché del cog. Mientras se lee una página se pide la siguiente.
+    Al caducar la vista se quitan los botones y se suelta todo el estado.
+    """
+
+    def __init__(self, fetch_page, query, data, author_id, page_size=5, max_results=100, timeout=180.0):
+        super().__init__(timeout=timeout)
+        self.fetch_page = fetch_page
+        self.query = query
+        self.author_id = author_id
+        self.page_size = page_size
+        self.total = data.get('numFound', 0)
+        self.pages = max(1, math.ceil(min(self.total, max_results) / page_size))
+        self.page = 0
+        self.selected = 0
+        self.docs = data['docs']
+        self.message = None
+        self._prefetches = set()
+        self.refresh_items()
+
+    def refresh_items(self):
+        self.select_book.options = [
+            discord.SelectOption(
+                label=f"{self.page * self.page_size + i + 1}. {doc.get('title', 'Título desconocido')}"[:100],
+                description=', '.join(doc.get('author_name', []))[:100] or None,
+                value=str(i),
+                default=i == self.selected,
+            )
+            for i, doc in enumerate(self.docs)
+        ]
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+
+    def build_embed(self):
+        embed = book_embed(self.docs[self.selected])
+        start = self.page * self.page_size
+        titles = [f"{'▶' if i == self.selected else '  '} {start + i + 1}. {doc.get('title', 'Título desconocido')}"
+                  for i, doc in enumerate(self.docs)]
+        embed.add_field(
+            name=f"🔍 Resultados {start + 1}-{start + len(self.docs)} de {self.total}",
+            value='\n'.join(titles),
+            inline=False
+        )
+        embed.set_footer(text=f"Búsqueda: {self.query} | Página {self.page + 1}/{self.pages}")
+        return embed
+
+    def prefetch(self, page):
+        """Pide `page` en segundo plano para que esté en caché cuando se pulse el botón"""
+        if page >= self.pages:
+            return
+        task = asyncio.create_task(self._prefetch(page))
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+
+    async def _prefetch(self, page):
+        try:
+            await self.fetch_page(self.query, page)
+        except Overloaded:
+            # Con Open Library saturada no se adelanta nada: la página se pedirá si se llega a ella
+            pass
+        except Exception as e:
+            logger.warning(f"Error al precargar la página {page + 1} de '{self.query}': {str(e)}")
+
+    async def go_to(self, interaction, page):
+        if not 0 <= page < self.pages:
+            # Pulsación sobre un botón que ya estaba desactivado: se reenvían los componentes actuales
+            await interaction.response.edit_message(view=self)
+            return
+        task = asyncio.ensure_future(self.fetch_page(self.query, page))
+        try:
+            data = await asyncio.wait_for(asyncio.shield(task), INTERACTION_DEADLINE)
+            respond = interaction.response.edit_message
+        except asyncio.TimeoutError:
+            await interaction.response.defer()
+            data = await task
+            respond = interaction.edit_original_response
+
+        if not data or not data.get('docs'):
+            raise RuntimeError("Open Library no devolvió resultados para esta página")
+        self.page = page
+        self.selected = 0
+        self.docs = data['docs']
+        self.refresh_items()
+        await respond(embed=self.build_embed(), view=self)
+        self.prefetch(page + 1)
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Solo quien hizo la búsqueda puede usar estos botones.",
+                                                    ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.select(placeholder="Ver detalles de...", row=0)
+    async def select_book(self, interaction, select):
+        self.selected = min(int(select.values[0]), len(self.docs) - 1)
+        self.refresh_items()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="Anterior", emoji="◀️", style=discord.ButtonStyle.secondary, row=1)
+    async def previous_page(self, interaction, button):
+        await self.go_to(interaction, self.page - 1)
+
+    @discord.ui.button(label="Siguiente", emoji="▶️", style=discord.ButtonStyle.secondary, row=1)
+    async def next_page(self, interaction, button):
+        await self.go_to(interaction, self.page + 1)
+
+    @discord.ui.button(label="Cerrar", emoji="✖️", style=discord.ButtonStyle.danger, row=1)
+    async def close(self, interaction, button):
+        self.stop()
+        self.release()
+        await interaction.response.edit_message(view=None)
+
+    async def on_error(self, interaction, error, item):
+        message = busy_message(error)
+        if message is None:
+            logger.error(f"Error en los resultados de '{self.query}': {str(error)}")
+            message = "❌ Error al cargar los resultados de Open Library."
+        send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+        await send(message, ephemeral=True)
+
+    async def on_timeout(self):
+        message = self.message
+        self.release()
+        if message is not None:
+            try:
+                await message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+    def release(self):
+        """Suelta la página visible y las precargas pendientes"""
+        for task in self._prefetches:
+            task.cancel()
+        self._prefetches.clear()
+        self.docs = []
+        self.message = None
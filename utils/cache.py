@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class AsyncTTLCache:
+    """Caché asíncrona con expiración (TTL), desalojo LRU y agrupación de peticiones concurrentes.
+
+    Las peticiones simultáneas con la misma clave esperan a una única
+    petición en curso en lugar de lanzar una cada una.
+    """
+
+    def __init__(self, maxsize=256, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # {clave: (expira_en, valor)}
+        self._inflight = {}  # {clave: asyncio.Task}
+
+        # Contadores para medir la eficacia de la caché
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetch_time = 0.0  # Segundos acumulados en peticiones reales
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key):
+        """Devuelve el valor en caché o None si no existe o ha expirado"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        """Guarda un valor y desaloja el menos usado si se supera el tamaño máximo"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    async def get_or_fetch(self, key, fetch):
+        """Devuelve el valor en caché o lo obtiene con `fetch()`.
+
+        Si ya hay una petición en curso para la misma clave, se espera a su
+        resultado. Los valores None no se guardan en caché.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield: si un llamante se cancela, los demás siguen esperando el resultado
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, fetch):
+        start = time.perf_counter()
+        try:
+            value = await fetch()
+        finally:
+            self.fetch_time += time.perf_counter() - start
+
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        """Resumen de aciertos, fallos y latencia ahorrada estimada"""
+        lookups = self.hits + self.misses + self.coalesced
+        avg_fetch = self.fetch_time / self.misses if self.misses else 0.0
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "avg_fetch_ms": avg_fetch * 1000,
+            "saved_ms": (self.hits + self.coalesced) * avg_fetch * 1000,
+        }
@@ -0,0 +1,35 @@
+# Límites de Discord por mensaje
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+def chunk_embeds(embeds):
+    """Agrupa los embeds en el menor número de mensajes que respetan los límites de Discord"""
+    chunks = []
+    current = []
+    current_chars = 0
+    for embed in embeds:
+        size = len(embed)
+        if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE
+                        or current_chars + size > MAX_EMBED_CHARS_PER_MESSAGE):
+            chunks.append(current)
+            current = []
+            current_chars = 0
+        current.append(embed)
+        current_chars += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def send_embeds(destination, embeds, content=None, **kwargs):
+    """Envía una lista de embeds con el mínimo de llamadas a la API.
+
+    `content` solo se añade al primer mensaje. Devuelve los mensajes enviados.
+    """
+    messages = []
+    for i, chunk in enumerate(chunk_embeds(embeds)):
+        messages.append(await destination.send(content=content if i == 0 else None, embeds=chunk, **kwargs))
+    if not messages and content:
+        messages.append(await destination.send(content=content, **kwargs))
+    return messages
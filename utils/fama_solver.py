@@ -0,0 +1,134 @@
+import itertools
+import logging
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.files import atomic_write
+
+logger = logging.getLogger('discord_bot.fama_solver')
+
+# Todos los números de 4 cifras con dígitos distintos (10·9·8·7 = 5040)
+CODES = [''.join(p) for p in itertools.permutations('0123456789', 4)]
+CODE_INDEX = {code: i for i, code in enumerate(CODES)}
+
+# Cada resultado (famas, toques) se codifica en un byte como famas * 5 + toques
+NUM_SCORES = 25
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(1 << 10)], dtype=np.uint8)
+
+
+def encode_score(famas, toques):
+    return famas * 5 + toques
+
+
+def decode_score(score):
+    return divmod(int(score), 5)
+
+
+def build_score_table(chunk_size=512):
+    """Calcula la tabla 5040×5040 de resultados entre cada par de números"""
+    digits = np.array([[int(c) for c in code] for code in CODES], dtype=np.uint8)
+    masks = (np.uint16(1) << digits.astype(np.uint16)).sum(axis=1, dtype=np.uint16)
+
+    n = len(CODES)
+    table = np.empty((n, n), dtype=np.uint8)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        famas = (digits[start:stop, None, :] == digits[None, :, :]).sum(axis=2, dtype=np.uint8)
+        common = _POPCOUNT[masks[start:stop, None] & masks[None, :]]
+        table[start:stop] = famas * 5 + (common - famas)
+    return table
+
+
+def load_score_table(path=None):
+    """Carga la tabla desde disco (mapeada en memoria) o la calcula y la guarda"""
+    if path and os.path.exists(path):
+        table = np.load(path, mmap_mode='r')
+        if table.shape == (len(CODES), len(CODES)) and table.dtype == np.uint8:
+            return table
+        logger.warning(f"Tabla de resultados inválida en {path}, se recalcula")
+
+    table = build_score_table()
+    if path:
+        # Con varios procesos arrancando a la vez, ninguno debe mapear un fichero a medio escribir
+        atomic_write(path, lambda f: np.save(f, table), binary=True)
+    return table
+
+
+class FamaToqueSolver:
+    """Motor de resolución de Fama y Toque basado en la tabla de resultados precalculada"""
+
+    # Por simetría todas las primeras jugadas son equivalentes
+    FIRST_GUESS = '0123'
+    # Los conjuntos grandes (tras un solo intento) son los caros de evaluar y los más repetidos
+    MEMO_MIN_CANDIDATES = 256
+    MEMO_SIZE = 512
+
+    def __init__(self, table):
+        self.table = table
+        self.all_indices = np.arange(len(CODES))
+        self.digits = np.array([[int(c) for c in code] for code in CODES], dtype=np.uint8)
+        self._memo = OrderedDict()
+
+    def score(self, secret, guess):
+        return decode_score(self.table[CODE_INDEX[guess], CODE_INDEX[secret]])
+
+    def scores(self, guess):
+        """Resultado codificado de `guess` contra cada número posible"""
+        index = CODE_INDEX.get(guess)
+        if index is not None:
+            return self.table[index]
+        # Intentos con dígitos repetidos (el juego los admite): mismas reglas que FamaToque.evaluate_guess
+        guess_digits = np.array([int(c) for c in guess], dtype=np.uint8)
+        same = self.digits == guess_digits
+        present = (self.digits[:, None, :] == guess_digits[None, :, None]).any(axis=2)
+        famas = same.sum(axis=1)
+        toques = (present & ~same).sum(axis=1)
+        return (famas * 5 + toques).astype(np.uint8)
+
+    def candidates(self, history):
+        """Índices de los números compatibles con [(intento, famas, toques), ...]"""
+        mask = np.ones(len(CODES), dtype=bool)
+        for guess, famas, toques in history:
+            mask &= self.scores(guess) == encode_score(famas, toques)
+        return np.flatnonzero(mask)
+
+    def best_guess(self, candidates):
+        """Jugada minimax: minimiza el mayor grupo de candidatos que puede quedar"""
+        if len(candidates) <= 2:
+            return CODES[candidates[0]]
+        if len(candidates) == len(CODES):
+            return self.FIRST_GUESS
+        if len(candidates) < self.MEMO_MIN_CANDIDATES:
+            return self._minimax(candidates)
+
+        key = candidates.tobytes()
+        guess = self._memo.get(key)
+        if guess is None:
+            guess = self._memo[key] = self._minimax(candidates)
+            if len(self._memo) > self.MEMO_SIZE:
+                self._memo.popitem(last=False)
+        else:
+            self._memo.move_to_end(key)
+        return guess
+
+    def _minimax(self, candidates):
+        # Histograma de resultados de cada posible jugada contra los candidatos
+        scores = self.table[:, candidates].astype(np.intp)
+        scores += (self.all_indices * NUM_SCORES)[:, None]
+        counts = np.bincount(scores.ravel(), minlength=len(CODES) * NUM_SCORES)
+        worst = counts.reshape(len(CODES), NUM_SCORES).max(axis=1)
+
+        # A igualdad de peor caso, preferir un candidato (puede ganar directamente)
+        is_candidate = np.zeros(len(CODES), dtype=bool)
+        is_candidate[candidates] = True
+        return CODES[np.lexsort((~is_candidate, worst))[0]]
+
+    def suggest(self, history):
+        """Devuelve (jugada sugerida, número de candidatos restantes)"""
+        candidates = self.candidates(history)
+        if len(candidates) == 0:
+            return None, 0
+        return self.best_guess(candidates), len(candidates)
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+
+def atomic_write(path, write, binary=False):
+    """Escritura atómica: `write(f)` escribe en un temporal que luego reemplaza a `path`.
+
+    Quien lea el fichero a la vez (u otro proceso que lo escriba) ve la versión
+    anterior o la nueva completa, nunca una a medias.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb" if binary else "w", encoding=None if binary else "utf-8") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger('discord_bot.game_store')
+
+
+class Game:
+    """Estado de una partida de Fama y Toque"""
+
+    __slots__ = ("user_id", "channel_id", "number", "attempts", "guesses", "updated_at", "guild_id",
+                 "results", "history")
+
+    def __init__(self, user_id, channel_id, number, attempts=0, guesses=None, updated_at=None, guild_id=None):
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id  # None en mensajes directos
+        self.number = number
+        self.attempts = attempts
+        self.guesses = guesses if guesses is not None else []
+        self.updated_at = updated_at if updated_at is not None else time.time()
+        # Resultados (famas, toques) e historial ya renderizado de cada intento;
+        # no se persisten porque se reconstruyen a partir de `guesses`
+        self.results = []
+        self.history = ""
+
+    def touch(self):
+        self.updated_at = time.time()
+
+    def record_result(self, guess, famas, toques):
+        """Añade el resultado de un intento al historial sin recalcular los anteriores"""
+        self.results.append((famas, toques))
+        line = f"#{len(self.results)}: {guess} → Famas: {famas}, Toques: {toques}"
+        self.history = f"{self.history}\n{line}" if self.history else line
+
+    def to_row(self):
+        return (self.user_id, self.channel_id, self.number, self.attempts, ','.join(self.guesses), self.updated_at,
+                self.guild_id)
+
+    @classmethod
+    def from_row(cls, row):
+        user_id, channel_id, number, attempts, guesses, updated_at, guild_id = row
+        return cls(user_id, channel_id, number, attempts, guesses.split(',') if guesses else [], updated_at, guild_id)
+
+
+class GameStore:
+    """Interfaz de almacenamiento de partidas.
+
+    `save` y `delete` no esperan al disco: las implementaciones pueden
+    agrupar las escrituras y aplicarlas en segundo plano.
+    """
+
+    async def start(self):
+        pass
+
+    async def load_all(self):
+        """Devuelve {user_id: Game} con todas las partidas guardadas"""
+        return {}
+
+    async def load(self, user_id):
+        """Partida guardada de `user_id` (puede ser de otro proceso del bot) o None"""
+        return None
+
+    def save(self, game):
+        pass
+
+    def delete(self, user_id):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def close(self):
+        await self.flush()
+
+
+class MemoryGameStore(GameStore):
+    """Sin persistencia: las partidas se pierden al reiniciar"""
+
+
+class SQLiteGameStore(GameStore):
+    """Almacenamiento en SQLite (modo WAL) con escritura diferida por lotes"""
+
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.conn = None
+        self._pending = {}  # {user_id: fila o None si hay que borrarla}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS games ("
+            "user_id INTEGER PRIMARY KEY, channel_id INTEGER, number TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL, guesses TEXT NOT NULL, updated_at REAL NOT NULL, guild_id INTEGER)"
+        )
+        # Bases de datos anteriores a la columna guild_id
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(games)")}
+        if 'guild_id' not in columns:
+            conn.execute("ALTER TABLE games ADD COLUMN guild_id INTEGER")
+        return conn
+
+    async def start(self):
+        self.conn = await asyncio.to_thread(self._connect)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def load_all(self):
+        rows = await asyncio.to_thread(lambda: self.conn.execute("SELECT * FROM games").fetchall())
+        return {row[0]: Game.from_row(row) for row in rows}
+
+    async def load(self, user_id):
+        # Los cambios aún no escritos tienen prioridad sobre lo que hay en disco
+        if user_id in self._pending:
+            row = self._pending[user_id]
+        else:
+            row = await asyncio.to_thread(
+                lambda: self.conn.execute("SELECT * FROM games WHERE user_id = ?", (user_id,)).fetchone()
+            )
+        return Game.from_row(row) if row is not None else None
+
+    def save(self, game):
+        # Se guarda una copia de la fila para que cambios posteriores no afecten al lote
+        self._pending[game.user_id] = game.to_row()
+
+    def delete(self, user_id):
+        self._pending[user_id] = None
+
+    def _write(self, pending):
+        upserts = [row for row in pending.values() if row is not None]
+        deletes = [(user_id,) for user_id, row in pending.items() if row is None]
+        with self.conn:
+            self.conn.execute("BEGIN")
+            if upserts:
+                self.conn.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?)", upserts)
+            if deletes:
+                self.conn.executemany("DELETE FROM games WHERE user_id = ?", deletes)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending or self.conn is None:
+                return
+            pending, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(self._write, pending)
+            except Exception as e:
+                logger.error(f"Error al guardar partidas: {str(e)}")
+                # Reintentar en el siguiente lote sin pisar cambios más recientes
+                for user_id, row in pending.items():
+                    self._pending.setdefault(user_id, row)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+        await self.flush()
+        if self.conn:
+            await asyncio.to_thread(self.conn.close)
+            self.conn = None
+
+
+def create_game_store(kind, path):
+    """Crea el almacenamiento configurado ('sqlite' o 'memory')"""
+    if kind == 'memory':
+        return MemoryGameStore()
+    if kind == 'sqlite':
+        return SQLiteGameStore(path)
+    raise ValueError(f"Almacenamiento de partidas desconocido: {kind}")
@@ -0,0 +1,285 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+import discord
+
+from utils.admission import Overloaded, busy_message
+from utils.metrics import JOB_DURATION, JOB_WAIT, JOBS_ACTIVE, JOBS_FINISHED
+
+logger = logging.getLogger('discord_bot.jobs')
+
+# Prioridades: menor número, antes se ejecuta
+PRIORITY_HIGH = 0  # respuestas que el usuario está esperando (búsquedas)
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2  # trabajos largos (borrados masivos)
+PRIORITY_NAMES = {PRIORITY_HIGH: "alta", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "baja"}
+
+
+class Subscriber:
+    """Quien espera el resultado de un trabajo: su mensaje provisional y cómo mostrar el resultado"""
+
+    __slots__ = ("owner_id", "message", "render")
+
+    def __init__(self, owner_id, render):
+        self.owner_id = owner_id
+        self.message = None  # se asigna en cuanto se envía el mensaje provisional
+        self.render = render  # (resultado, mensaje) -> kwargs para message.edit
+
+
+class Job:
+    """Trabajo en segundo plano con clave de deduplicación"""
+
+    __slots__ = ("id", "key", "name", "priority", "run", "error_message", "queue", "subscribers", "status",
+                 "progress_text", "created_at", "started_at", "finished_at", "last_edit", "cancel_requested",
+                 "result", "error", "_task", "_done")
+
+    def __init__(self, queue, job_id, key, name, priority, run, error_message):
+        self.queue = queue
+        self.id = job_id
+        self.key = key
+        self.name = name
+        self.priority = priority
+        self.run = run  # corrutina (job) -> resultado
+        self.error_message = error_message
+        self.subscribers = []
+        self.status = "queued"  # queued, running, done, failed, cancelled
+        self.progress_text = None
+        self.created_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.last_edit = 0.0
+        self.cancel_requested = False
+        self.result = None
+        self.error = None
+        self._task = None
+        self._done = asyncio.Event()
+
+    @property
+    def kind(self):
+        """Tipo de trabajo (prefijo de la clave), para las métricas"""
+        return self.key.split(':', 1)[0]
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def owner_id(self):
+        return self.subscribers[0].owner_id if self.subscribers else None
+
+    def elapsed(self):
+        end = self.finished_at or time.monotonic()
+        return end - (self.started_at or self.created_at)
+
+    async def wait(self):
+        await self._done.wait()
+        return self.result
+
+    async def progress(self, text, force=False):
+        await self.queue.progress(self, text, force)
+
+
+class JobQueue:
+    """Cola de trabajos lentos con un número acotado de workers.
+
+    Los trabajos con la misma clave se agrupan: quien llega después recibe el
+    resultado del que ya está en cola o en curso en su propio mensaje. Los de
+    prioridad baja no pueden ocupar más de `low_priority_workers` workers, así
+    que un borrado largo no deja sin turno a las búsquedas.
+    """
+
+    def __init__(self, workers=4, max_queued=100, progress_interval=2.0, history=20):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.progress_interval = progress_interval
+        self.low_priority_workers = max(1, workers // 2)
+        self.active = {}  # {clave: Job} en cola o en curso
+        self.finished = deque(maxlen=history)
+        self._heap = []  # (prioridad, orden, Job)
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self._running_low = 0
+        self._changed = None
+        self._tasks = []
+        self._closing = False
+
+    def start(self):
+        self._closing = False
+        self._changed = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        self._closing = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._heap.clear()
+        self.active.clear()
+
+    @property
+    def queued(self):
+        return len(self._heap)
+
+    def get(self, job_id):
+        for job in self.active.values():
+            if job.id == job_id:
+                return job
+        return None
+
+    async def submit(self, ctx, key, name, run, render, placeholder, priority=PRIORITY_NORMAL,
+                     error_message="❌ Error al ejecutar la tarea"):
+        """Encola `run` (o se une al trabajo con la misma clave) y envía el mensaje provisional.
+
+        El mensaje provisional se edita con el progreso y al terminar con `render(resultado, mensaje)`.
+        Lanza Overloaded si la cola está llena.
+        """
+        job = self.active.get(key)
+        if job is None:
+            if len(self._heap) >= self.max_queued:
+                raise Overloaded("jobs", max(1.0, self.queued / self.workers))
+            job = Job(self, next(self._ids), key, name, priority, run, error_message)
+            self.active[key] = job
+            job.subscribers.append(Subscriber(ctx.author.id, render))
+            await self._push(job)
+        else:
+            job.subscribers.append(Subscriber(ctx.author.id, render))
+        subscriber = job.subscribers[-1]
+
+        text = placeholder
+        if job.progress_text and len(job.subscribers) > 1:
+            text = f"{placeholder}\n{job.progress_text}"
+        subscriber.message = await ctx.send(text)
+        # Si el trabajo terminó mientras se enviaba el mensaje, el resultado se entrega ahora
+        if job.done:
+            await self._deliver(job, subscriber)
+        return job
+
+    def cancel(self, job):
+        """Cancela un trabajo en cola o en curso; devuelve False si ya había terminado"""
+        if job.done:
+            return False
+        job.cancel_requested = True
+        if job._task is not None:
+            job._task.cancel()
+        elif job.status == "queued":
+            self._heap = [entry for entry in self._heap if entry[2] is not job]
+            heapq.heapify(self._heap)
+            asyncio.create_task(self._finish(job, "cancelled"))
+        return True
+
+    async def progress(self, job, text, force=False):
+        """Muestra el progreso en los mensajes provisionales (como mucho uno cada `progress_interval`)"""
+        job.progress_text = text
+        now = time.monotonic()
+        if not force and now - job.last_edit < self.progress_interval:
+            return
+        job.last_edit = now
+        await asyncio.gather(*(self._edit(subscriber.message, content=text)
+                               for subscriber in job.subscribers if subscriber.message is not None))
+
+    async def _push(self, job):
+        async with self._changed:
+            heapq.heappush(self._heap, (job.priority, next(self._order), job))
+            self._update_gauges()
+            self._changed.notify()
+
+    def _runnable(self):
+        if not self._heap:
+            return False
+        priority = self._heap[0][0]
+        return priority < PRIORITY_LOW or self._running_low < self.low_priority_workers
+
+    async def _worker(self):
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(self._runnable)
+                _, _, job = heapq.heappop(self._heap)
+                if job.cancel_requested:
+                    continue
+                if job.priority >= PRIORITY_LOW:
+                    self._running_low += 1
+            try:
+                await self._execute(job)
+            finally:
+                if job.priority >= PRIORITY_LOW:
+                    self._running_low -= 1
+                async with self._changed:
+                    self._changed.notify_all()
+
+    async def _execute(self, job):
+        job.status = "running"
+        job.started_at = time.monotonic()
+        JOB_WAIT.observe(job.started_at - job.created_at, kind=job.kind)
+        self._update_gauges()
+        job._task = asyncio.create_task(job.run(job))
+        try:
+            job.result = await job._task
+        except asyncio.CancelledError:
+            if self._closing or not job.cancel_requested:
+                # Se está cerrando el bot: se cancela el trabajo junto con el worker, sin editar mensajes
+                job._task.cancel()
+                await self._finish(job, "cancelled", deliver=False)
+                raise
+            await self._finish(job, "cancelled")
+            return
+        except Exception as e:
+            job.error = e
+            if not isinstance(e, Overloaded):
+                logger.error(f"Error en el trabajo #{job.id} ({job.name}): {str(e)}")
+            status = "failed"
+        else:
+            # Un trabajo puede atender la cancelación por su cuenta y devolver un resultado parcial
+            status = "cancelled" if job.cancel_requested else "done"
+        if self._closing:
+            # El trabajo se ha tragado la cancelación del cierre (un borrado devuelve lo hecho hasta
+            # entonces): tampoco se editan mensajes y el worker termina
+            await self._finish(job, "cancelled", deliver=False)
+            raise asyncio.CancelledError
+        await self._finish(job, status)
+
+    async def _finish(self, job, status, deliver=True):
+        if job.done:
+            return
+        job.status = status
+        job.finished_at = time.monotonic()
+        job._task = None
+        job._done.set()
+        if self.active.get(job.key) is job:
+            del self.active[job.key]
+        self.finished.append(job)
+        JOBS_FINISHED.inc(kind=job.kind, status=status)
+        if job.started_at is not None:
+            JOB_DURATION.observe(job.finished_at - job.started_at, kind=job.kind)
+        self._update_gauges()
+        if not deliver:
+            return
+        await asyncio.gather(*(self._deliver(job, subscriber)
+                               for subscriber in job.subscribers if subscriber.message is not None))
+
+    async def _deliver(self, job, subscriber):
+        if job.status == "failed":
+            message = busy_message(job.error) or f"{job.error_message}: {str(job.error)}"
+            await self._edit(subscriber.message, content=message)
+        elif job.status == "cancelled" and job.result is None:
+            await self._edit(subscriber.message, content=f"🛑 Tarea #{job.id} cancelada.")
+        else:
+            try:
+                kwargs = subscriber.render(job.result, subscriber.message)
+            except Exception as e:
+                logger.error(f"Error al mostrar el resultado del trabajo #{job.id}: {str(e)}")
+                kwargs = {"content": f"{job.error_message}: {str(e)}"}
+            await self._edit(subscriber.message, **kwargs)
+
+    async def _edit(self, message, **kwargs):
+        try:
+            await message.edit(**kwargs)
+        except discord.HTTPException as e:
+            logger.warning(f"No se pudo actualizar el mensaje de un trabajo: {e}")
+
+    def _update_gauges(self):
+        JOBS_ACTIVE.set(len(self._heap), state="queued")
+        JOBS_ACTIVE.set(sum(1 for job in self.active.values() if job.status == "running"), state="running")
@@ -0,0 +1,239 @@
+import asyncio
+import functools
+import json
+import logging
+import random
+import time
+
+import aiohttp
+import wavelink
+
+from utils.metrics import LAVALINK_NODE_LATENCY, LAVALINK_NODE_PLAYERS, LAVALINK_NODE_UP
+
+logger = logging.getLogger('discord_bot.lavalink_pool')
+
+# Segundos de latencia que equivalen a un player más al elegir nodo
+LATENCY_WEIGHT = 0.05
+# Sondeos fallidos seguidos para dar un nodo por caído
+MAX_PROBE_FAILURES = 2
+PROBE_TIMEOUT = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+def load_node_configs(nodes_json, uri, password, secure):
+    """Lista de nodos a partir de LAVALINK_NODES (JSON) o del nodo único LAVALINK_URI.
+
+    Formato de LAVALINK_NODES: [{"id": "eu", "uri": "host:2333", "password": "...", "secure": false}, ...]
+    """
+    if not nodes_json:
+        return [{"id": "main", "uri": uri, "password": password, "secure": secure}]
+
+    configs = []
+    for i, node in enumerate(json.loads(nodes_json)):
+        configs.append({
+            "id": str(node.get("id") or f"node-{i + 1}"),
+            "uri": node["uri"],
+            "password": node.get("password", password),
+            "secure": bool(node.get("secure", False)),
+        })
+    return configs
+
+
+class NodeHealth:
+    """Estado de salud de un nodo tal y como lo ve el pool"""
+
+    __slots__ = ("config", "node", "latency", "probe_failures", "connect_failures", "next_attempt", "next_probe")
+
+    def __init__(self, config):
+        self.config = config
+        self.node = None
+        self.latency = None  # media móvil de la latencia del sondeo (segundos)
+        self.probe_failures = 0
+        self.connect_failures = 0
+        self.next_attempt = 0.0
+        self.next_probe = 0.0
+
+    @property
+    def id(self):
+        return self.config["id"]
+
+    @property
+    def connected(self):
+        return (self.node is not None and self.node.status is wavelink.NodeStatus.CONNECTED
+                and self.node._websocket.is_connected())
+
+    @property
+    def healthy(self):
+        return self.connected and self.probe_failures < MAX_PROBE_FAILURES
+
+    def load(self):
+        """Puntuación para colocar players: menos es mejor"""
+        return len(self.node.players) + (self.latency or 0) / LATENCY_WEIGHT
+
+    def backoff(self):
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.connect_failures - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+
+class LavalinkPool:
+    """Conjunto de nodos Lavalink con sondeos de salud, reconexión y migración de players.
+
+    Un único bucle revisa cada `interval` segundos todos los nodos: reconecta los
+    caídos con espera exponencial, mide la latencia de los conectados pidiendo
+    /version y mueve los players de los nodos caídos al mejor nodo sano.
+    """
+
+    def __init__(self, bot, configs, interval=10.0):
+        self.bot = bot
+        self.interval = interval
+        self.health = {config["id"]: NodeHealth(config) for config in configs}
+        self.session = None
+        self._task = None
+        # Tras recargar el cog los nodos siguen registrados en wavelink
+        for health in self.health.values():
+            health.node = wavelink.NodePool.nodes.get(health.id)
+
+    def start(self):
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=PROBE_TIMEOUT))
+        self._task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        if self.session:
+            await self.session.close()
+
+    def best_node(self):
+        """El nodo sano menos cargado, o None si no hay ninguno"""
+        candidates = [health for health in self.health.values() if health.healthy]
+        if not candidates:
+            return None
+        return min(candidates, key=NodeHealth.load).node
+
+    def player_factory(self, node):
+        """Clase de player para `channel.connect(cls=...)` fijada a `node`.
+
+        La migración entre nodos la hace el pool, así que se desactiva la de wavelink.
+        """
+        return functools.partial(wavelink.Player, nodes=[node], swap_node_on_disconnect=False)
+
+    async def _health_loop(self):
+        # Los pasos son cortos para respetar las esperas de reconexión; cada nodo se sondea cada `interval`
+        tick = min(1.0, self.interval)
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Error revisando los nodos de Lavalink: {e}")
+            await asyncio.sleep(tick)
+
+    async def check(self):
+        if self.bot.user is None:
+            return
+        now = time.monotonic()
+        jobs = []
+        for health in self.health.values():
+            if health.connected:
+                if now >= health.next_probe:
+                    health.next_probe = now + self.interval
+                    jobs.append(self.probe(health))
+            elif now >= health.next_attempt:
+                jobs.append(self.connect(health))
+        if jobs:
+            await asyncio.gather(*jobs)
+
+        await self.failover()
+        for health in self.health.values():
+            LAVALINK_NODE_UP.set(int(health.healthy), node=health.id)
+            LAVALINK_NODE_PLAYERS.set(len(health.node.players) if health.node else 0, node=health.id)
+            if health.latency is not None:
+                LAVALINK_NODE_LATENCY.set(round(health.latency, 6), node=health.id)
+
+    async def connect(self, health):
+        config = health.config
+        try:
+            if health.node is None:
+                node = wavelink.Node(id=config["id"], uri=config["uri"], password=config["password"],
+                                     secure=config["secure"], retries=0)
+                # Con retries=0 wavelink no reintenta por su cuenta: de eso se encarga el pool
+                await wavelink.NodePool.connect(client=self.bot, nodes=[node])
+                if config["id"] not in wavelink.NodePool.nodes:
+                    raise RuntimeError("autenticación rechazada")
+                health.node = node
+            else:
+                # Si el websocket se cerró sin avisar, wavelink aún cree que está conectado y no reconectaría
+                await health.node._websocket.cleanup()
+                await health.node._connect(self.bot)
+        except Exception as e:
+            health.connect_failures += 1
+            delay = health.backoff()
+            health.next_attempt = time.monotonic() + delay
+            logger.warning(f"No se pudo conectar al nodo Lavalink '{health.id}' ({e}); "
+                           f"reintento en {delay:.1f}s")
+            return
+
+        health.connect_failures = 0
+        health.probe_failures = 0
+        health.next_probe = 0.0
+        # Margen para que llegue el `ready` del websocket antes de volver a intentarlo
+        health.next_attempt = time.monotonic() + PROBE_TIMEOUT
+        logger.info(f"Conectado al nodo Lavalink '{health.id}' ({config['uri']})")
+
+    async def probe(self, health):
+        start = time.perf_counter()
+        try:
+            async with self.session.get(f"{health.node.uri}/version",
+                                        headers={"Authorization": health.node.password}) as resp:
+                resp.raise_for_status()
+                await resp.read()
+        except Exception as e:
+            health.probe_failures += 1
+            logger.warning(f"Sondeo fallido del nodo Lavalink '{health.id}' "
+                           f"({health.probe_failures}/{MAX_PROBE_FAILURES}): {e}")
+            if health.probe_failures >= MAX_PROBE_FAILURES:
+                # El websocket puede seguir pareciendo abierto: se cierra para forzar la reconexión
+                await health.node._websocket.cleanup()
+            return
+
+        elapsed = time.perf_counter() - start
+        health.latency = elapsed if health.latency is None else 0.7 * health.latency + 0.3 * elapsed
+        health.probe_failures = 0
+
+    async def failover(self):
+        """Mueve los players de los nodos caídos al mejor nodo sano"""
+        for health in self.health.values():
+            if health.node is None or health.healthy or not health.node.players:
+                continue
+            for player in list(health.node.players.values()):
+                target = self.best_node()
+                if target is None:
+                    return
+                try:
+                    await self.migrate(player, target)
+                except Exception as e:
+                    logger.error(f"Error moviendo el player {player.guild.id} al nodo '{target.id}': {e}")
+
+    async def migrate(self, player, node):
+        """Traslada el player a `node` y reanuda la pista donde iba"""
+        old = player.current_node
+        guild_id = player.guild.id
+        try:
+            position = int(player.position)
+        except TypeError:
+            # Sin ningún playerUpdate recibido no se conoce la posición
+            position = 0
+
+        old._players.pop(guild_id, None)
+        player.current_node = node
+        player.nodes = [node]
+        node._players[guild_id] = player
+
+        # Mismos datos que enviaría wavelink: primero la sesión de voz, después la pista
+        await player._dispatch_voice_update()
+        encoded = player._player_state.get('track')
+        if encoded:
+            await node._send(method='PATCH', path=f'sessions/{node._session_id}/players', guild_id=guild_id,
+                             data={'encodedTrack': encoded, 'position': position,
+                                   'paused': player.is_paused(), 'volume': player.volume})
+        logger.info(f"Player {guild_id} movido del nodo '{old.id}' a '{node.id}'")
@@ -0,0 +1,38 @@
+class MessageRouter:
+    """Punto único de entrada de los mensajes del bot.
+
+    Los cogs registran interés en mensajes concretos (por ejemplo, los de un
+    usuario con una partida activa en un canal) y el resto de mensajes solo
+    pasan por el procesado de comandos, una única vez. Con `process_commands`
+    a False (solo comandos de barra) los mensajes sin ruta se descartan.
+    """
+
+    def __init__(self, bot, process_commands=True):
+        self.bot = bot
+        self.process_commands = process_commands
+        self._routes = {}  # {(channel_id, user_id): handler}
+
+    def __len__(self):
+        return len(self._routes)
+
+    def register(self, channel_id, user_id, handler):
+        """Envía a `handler` los mensajes de `user_id` en `channel_id`.
+
+        El handler es una corrutina que recibe el mensaje y devuelve True si
+        lo ha consumido (en ese caso no se procesa como comando).
+        """
+        self._routes[(channel_id, user_id)] = handler
+
+    def unregister(self, channel_id, user_id):
+        self._routes.pop((channel_id, user_id), None)
+
+    async def dispatch(self, message):
+        if message.author.bot:
+            return
+
+        handler = self._routes.get((message.channel.id, message.author.id))
+        if handler is not None and await handler(message):
+            return
+
+        if self.process_commands:
+            await self.bot.process_commands(message)
@@ -0,0 +1,250 @@
+import bisect
+import resource
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Límites por defecto de los histogramas de latencia (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def percentile(samples, q):
+    """Percentil `q` (0-1) de una lista de muestras o None si está vacía"""
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self.values.items()]
+
+
+class Gauge(Metric):
+    """Valor instantáneo; `collect` permite calcularlo al exportar: () -> {labels: valor}"""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self.values = {}
+        self.collect = collect
+
+    def set(self, value, **labels):
+        self.values[self._key(labels)] = value
+
+    def _samples(self):
+        values = dict(self.values)
+        if self.collect is not None:
+            values.update(self.collect())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values.items()]
+
+
+class Histogram(Metric):
+    """Histograma acumulativo con una ventana de muestras recientes para calcular percentiles"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, window=1024):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.window = window
+        self.series = {}  # {labels: [conteos por bucket, suma, total, muestras recientes]}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, deque(maxlen=self.window)]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+        series[3].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def recent(self, **labels):
+        """Muestras recientes de todas las series que coinciden con las etiquetas indicadas"""
+        wanted = [(self.labelnames.index(name), value) for name, value in labels.items()]
+        samples = []
+        for key, series in self.series.items():
+            if all(key[i] == value for i, value in wanted):
+                samples.extend(series[3])
+        return samples
+
+    def quantile(self, q, **labels):
+        """Percentil `q` (0-1) de las muestras recientes que coinciden con las etiquetas"""
+        return percentile(self.recent(**labels), q)
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total_sum, count, _) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total_sum}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Exporta todas las métricas en formato de texto de Prometheus"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def resident_memory():
+    """Memoria residente (RSS) del proceso en bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Fuera de Linux solo se conoce el máximo alcanzado (en KiB, o en bytes en macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+COMMAND_INVOCATIONS = REGISTRY.register(Counter(
+    "discord_bot_command_invocations_total", "Comandos ejecutados", ("cog", "command")))
+COMMAND_ERRORS = REGISTRY.register(Counter(
+    "discord_bot_command_errors_total", "Comandos que terminaron con error", ("cog", "command")))
+COMMAND_LATENCY = REGISTRY.register(Histogram(
+    "discord_bot_command_latency_seconds", "Duración de los comandos", ("cog", "command")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "discord_bot_outbound_request_seconds", "Duración de las peticiones a servicios externos", ("backend",)))
+BOOK_INDEX_LOOKUPS = REGISTRY.register(Counter(
+    "discord_bot_book_index_lookups_total", "Búsquedas en el índice local de libros", ("result",)))
+LOOP_LAG = REGISTRY.register(Histogram(
+    "discord_bot_event_loop_lag_seconds", "Retraso del event loop medido por el vigilante",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)))
+LAVALINK_NODE_UP = REGISTRY.register(Gauge(
+    "discord_bot_lavalink_node_up", "1 si el nodo Lavalink está conectado y responde", ("node",)))
+LAVALINK_NODE_LATENCY = REGISTRY.register(Gauge(
+    "discord_bot_lavalink_node_latency_seconds", "Latencia media del sondeo de salud del nodo", ("node",)))
+LAVALINK_NODE_PLAYERS = REGISTRY.register(Gauge(
+    "discord_bot_lavalink_node_players", "Players asignados al nodo", ("node",)))
+
+# Cachés registradas por los cogs: {nombre: objeto con stats()}
+_caches = {}
+
+
+def register_cache(name, cache):
+    _caches[name] = cache
+
+
+def unregister_cache(name):
+    _caches.pop(name, None)
+
+
+def registered_caches():
+    """Copia de las cachés registradas: {nombre: caché}"""
+    return dict(_caches)
+
+
+def _collect_cache(field):
+    return lambda: {(name,): cache.stats()[field] for name, cache in _caches.items()}
+
+
+for _field, _doc in (("hits", "Aciertos de caché"), ("misses", "Fallos de caché"),
+                     ("coalesced", "Peticiones agrupadas en una petición en curso"),
+                     ("hit_rate", "Tasa de acierto de caché"), ("size", "Entradas en caché")):
+    REGISTRY.register(Gauge(f"discord_bot_cache_{_field}", _doc, ("cache",), collect=_collect_cache(_field)))
+
+ADMISSION_SHED = REGISTRY.register(Counter(
+    "discord_bot_admission_shed_total", "Peticiones rechazadas por saturación del servicio externo", ("backend",)))
+COOLDOWN_REJECTIONS = REGISTRY.register(Counter(
+    "discord_bot_cooldown_rejections_total", "Comandos rechazados por cooldown", ("command", "scope")))
+
+# Limitadores de admisión por servicio externo: {nombre: objeto con stats()}
+_limiters = {}
+
+
+def register_limiter(name, limiter):
+    _limiters[name] = limiter
+
+
+def _collect_limiter(field):
+    return lambda: {(name,): limiter.stats()[field] for name, limiter in _limiters.items()}
+
+
+for _field, _doc in (("concurrency", "Peticiones simultáneas permitidas"),
+                     ("rate", "Peticiones por segundo permitidas (0 = sin límite)"),
+                     ("max_waiting", "Peticiones que pueden esperar turno"),
+                     ("active", "Peticiones en curso"), ("waiting", "Peticiones esperando turno")):
+    REGISTRY.register(Gauge(f"discord_bot_admission_{_field}", _doc, ("backend",), collect=_collect_limiter(_field)))
+
+JOBS_ACTIVE = REGISTRY.register(Gauge(
+    "discord_bot_jobs", "Trabajos en segundo plano en cola o en curso", ("state",)))
+JOBS_FINISHED = REGISTRY.register(Counter(
+    "discord_bot_jobs_finished_total", "Trabajos en segundo plano terminados", ("kind", "status")))
+JOB_WAIT = REGISTRY.register(Histogram(
+    "discord_bot_job_wait_seconds", "Tiempo en cola de los trabajos en segundo plano", ("kind",)))
+JOB_DURATION = REGISTRY.register(Histogram(
+    "discord_bot_job_duration_seconds", "Duración de los trabajos en segundo plano", ("kind",)))
+
+PROCESS_RSS = REGISTRY.register(Gauge(
+    "discord_bot_resident_memory_bytes", "Memoria residente del proceso",
+    collect=lambda: {(): resident_memory()}))
+# El cog de métricas le asigna `collect` con el tamaño de las cachés de discord.py
+DISCORD_CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "discord_bot_discord_cache_entries", "Objetos en las cachés de discord.py", ("cache",)))
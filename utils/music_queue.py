@@ -0,0 +1,101 @@
+import asyncio
+import random
+from collections import deque
+
+LOOP_OFF = 'off'
+LOOP_TRACK = 'track'
+LOOP_QUEUE = 'queue'
+LOOP_MODES = (LOOP_OFF, LOOP_TRACK, LOOP_QUEUE)
+
+
+class QueueEntry:
+    """Canción pedida; `resolution` es la tarea que obtiene la pista (se lanza por adelantado)"""
+
+    __slots__ = ("query", "requester", "track", "resolution")
+
+    def __init__(self, query, requester, track=None):
+        self.query = query
+        self.requester = requester
+        self.track = track
+        self.resolution = None
+
+    @property
+    def title(self):
+        return self.track.title if self.track is not None else self.query
+
+
+class GuildQueue:
+    """Cola de reproducción de un servidor"""
+
+    def __init__(self, text_channel=None, max_size=100):
+        self.entries = deque()
+        self.current = None
+        self.loop = LOOP_OFF
+        self.text_channel = text_channel
+        self.max_size = max_size
+        self.prefetches = set()  # tareas que resuelven por adelantado las próximas entradas
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def is_full(self):
+        return len(self.entries) >= self.max_size
+
+    def enqueue(self, entry):
+        self.entries.append(entry)
+
+    def remove(self, index):
+        """Quita la entrada en la posición `index` (empezando en 1) y la devuelve"""
+        if not 1 <= index <= len(self.entries):
+            raise IndexError(index)
+        entry = self.entries[index - 1]
+        del self.entries[index - 1]
+        if entry.resolution is not None:
+            entry.resolution.cancel()
+        return entry
+
+    def shuffle(self):
+        entries = list(self.entries)
+        random.shuffle(entries)
+        self.entries = deque(entries)
+
+    def advance(self):
+        """Pasa a la siguiente entrada según el modo de repetición; None si la cola ha terminado"""
+        finished = self.current
+        if finished is not None and self.loop == LOOP_TRACK:
+            return finished
+        if finished is not None and self.loop == LOOP_QUEUE:
+            self.entries.append(finished)
+
+        self.current = self.entries.popleft() if self.entries else None
+        return self.current
+
+    def upcoming(self, count):
+        """Las próximas `count` entradas (las que conviene resolver por adelantado)"""
+        return [self.entries[i] for i in range(min(count, len(self.entries)))]
+
+    def clear(self):
+        for task in self.prefetches:
+            task.cancel()
+        for entry in self.entries:
+            if entry.resolution is not None and not entry.resolution.done():
+                entry.resolution.cancel()
+        self.entries.clear()
+        self.current = None
+
+
+async def resolve_entry(entry, resolver):
+    """Obtiene la pista de la entrada reutilizando la resolución en curso si ya se lanzó"""
+    if entry.track is not None:
+        return entry.track
+    resolution = entry.resolution
+    if resolution is not None and resolution.done() and (resolution.cancelled() or resolution.exception()):
+        # Un fallo al resolver por adelantado (saturación, error de red) no decide si la canción existe
+        entry.resolution = None
+    if entry.resolution is None:
+        entry.resolution = asyncio.ensure_future(resolver(entry.query))
+    entry.track = await asyncio.shield(entry.resolution)
+    return entry.track
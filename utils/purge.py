@@ -0,0 +1,137 @@
+import asyncio
+import datetime
+import logging
+
+import discord
+
+logger = logging.getLogger('discord_bot.purge')
+
+# Discord borra en bloque hasta 100 mensajes, y solo si tienen menos de 14 días
+BULK_LIMIT = 100
+BULK_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+
+
+class PurgeStats:
+    """Progreso de un borrado"""
+
+    __slots__ = ("scanned", "bulk_deleted", "single_deleted", "failed", "started_at", "finished", "cancelled")
+
+    def __init__(self):
+        self.scanned = 0
+        self.bulk_deleted = 0
+        self.single_deleted = 0
+        self.failed = 0
+        self.started_at = discord.utils.utcnow()
+        self.finished = False
+        self.cancelled = False
+
+    @property
+    def deleted(self):
+        return self.bulk_deleted + self.single_deleted
+
+    @property
+    def elapsed(self):
+        return (discord.utils.utcnow() - self.started_at).total_seconds()
+
+    def summary(self):
+        return (f"{self.deleted} borrados ({self.bulk_deleted} en bloque, {self.single_deleted} uno a uno), "
+                f"{self.scanned} revisados en {self.elapsed:.0f}s")
+
+
+class PurgeEngine:
+    """Borra el historial de un canal anterior a `before`.
+
+    El historial se recorre por páginas mientras se borra: los mensajes recientes
+    van en bloques de 100 al endpoint de borrado masivo y los de más de 14 días
+    a un carril de borrado individual con `concurrency` tareas. discord.py espera
+    los límites de cada ruta, así que la concurrencia solo mantiene la cola llena.
+    """
+
+    def __init__(self, channel, before=None, concurrency=3, progress=None, progress_interval=5.0):
+        self.channel = channel
+        self.before = before
+        self.concurrency = concurrency
+        self.progress = progress  # corrutina (stats) -> None llamada periódicamente
+        self.progress_interval = progress_interval
+        self.stats = PurgeStats()
+
+    async def run(self):
+        bulk = asyncio.Queue(maxsize=2)
+        single = asyncio.Queue(maxsize=self.concurrency * 50)
+        workers = [asyncio.create_task(self._bulk_worker(bulk))]
+        workers += [asyncio.create_task(self._single_worker(single)) for _ in range(self.concurrency)]
+        reporter = asyncio.create_task(self._report()) if self.progress else None
+        try:
+            await self._scan(bulk, single)
+            await bulk.join()
+            await single.join()
+        except asyncio.CancelledError:
+            self.stats.cancelled = True
+        finally:
+            for task in workers:
+                task.cancel()
+            if reporter:
+                reporter.cancel()
+            self.stats.finished = True
+        return self.stats
+
+    async def _scan(self, bulk, single):
+        cutoff = discord.utils.utcnow() - BULK_MAX_AGE
+        chunk = []
+        async for message in self.channel.history(limit=None, before=self.before):
+            self.stats.scanned += 1
+            if message.created_at > cutoff:
+                chunk.append(message)
+                if len(chunk) == BULK_LIMIT:
+                    await bulk.put(chunk)
+                    chunk = []
+            else:
+                # El historial va de más nuevo a más antiguo: ya no quedan mensajes recientes
+                await single.put(message)
+        if chunk:
+            await bulk.put(chunk)
+
+    async def _bulk_worker(self, queue):
+        while True:
+            chunk = await queue.get()
+            try:
+                if len(chunk) == 1:
+                    await self._delete_one(chunk[0], bulk=True)
+                else:
+                    await self.channel.delete_messages(chunk)
+                    self.stats.bulk_deleted += len(chunk)
+            except discord.HTTPException as e:
+                logger.warning(f"Error en el borrado masivo en #{self.channel}: {e}")
+                self.stats.failed += len(chunk)
+            finally:
+                queue.task_done()
+
+    async def _single_worker(self, queue):
+        while True:
+            message = await queue.get()
+            try:
+                await self._delete_one(message)
+            finally:
+                queue.task_done()
+
+    async def _delete_one(self, message, bulk=False):
+        try:
+            await message.delete()
+        except discord.NotFound:
+            return
+        except discord.HTTPException as e:
+            logger.warning(f"Error al borrar el mensaje {message.id} en #{self.channel}: {e}")
+            self.stats.failed += 1
+            return
+        if bulk:
+            self.stats.bulk_deleted += 1
+        else:
+            self.stats.single_deleted += 1
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            try:
+                await self.progress(self.stats)
+            except discord.HTTPException as e:
+                logger.warning(f"No se pudo actualizar el progreso del borrado: {e}")
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+
+import aiohttp
+
+logger = logging.getLogger('discord_bot.supervisor')
+
+# Discord permite un IDENTIFY cada 5 segundos (por grupo de max_concurrency)
+IDENTIFY_INTERVAL = 5.0
+# Un proceso que aguanta este tiempo se considera estable y se reinicia la espera exponencial
+STABLE_AFTER = 60.0
+RESTART_BACKOFF_MAX = 60.0
+
+
+def parse_shard_ids(value):
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"""
+    shard_ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            shard_ids.extend(range(int(first), int(last) + 1))
+        else:
+            shard_ids.append(int(part))
+    return shard_ids
+
+
+def format_shard_ids(shard_ids):
+    return ','.join(str(shard_id) for shard_id in shard_ids)
+
+
+def split_shards(shard_count, workers):
+    """Reparte los shards 0..shard_count-1 en `workers` rangos contiguos lo más iguales posible"""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+async def fetch_recommended_shards(token, base_url="https://discord.com/api/v10"):
+    """Número de shards recomendado por Discord (GET /gateway/bot)"""
+    async with aiohttp.ClientSession(headers={"Authorization": f"Bot {token}"}) as session:
+        async with session.get(f"{base_url}/gateway/bot") as response:
+            response.raise_for_status()
+            data = await response.json()
+    return data["shards"], data.get("session_start_limit", {}).get("max_concurrency", 1)
+
+
+class ShardWorker:
+    """Proceso hijo que ejecuta el bot con un rango de shards"""
+
+    def __init__(self, index, shard_ids):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process = None
+        self.restarts = 0
+        self.failures = 0  # caídas seguidas, para la espera exponencial
+
+    @property
+    def name(self):
+        return f"worker-{self.index} (shards {format_shard_ids(self.shard_ids)})"
+
+
+class ShardSupervisor:
+    """Lanza un proceso por rango de shards y vuelve a lanzar los que terminan.
+
+    Cada hijo es `python main.py` con DISCORD_SHARD_IDS/DISCORD_SHARD_COUNT
+    fijados; el estado que comparten (cooldowns, cachés) va por el almacén
+    SQLite común. SIGINT/SIGTERM se reenvían a los hijos antes de salir.
+    """
+
+    def __init__(self, script, shard_count, workers, max_concurrency=1, env=None):
+        self.script = script
+        self.shard_count = shard_count
+        self.max_concurrency = max(1, max_concurrency)
+        self.workers = [ShardWorker(i, shard_ids) for i, shard_ids in enumerate(split_shards(shard_count, workers))]
+        self.env = dict(env if env is not None else os.environ)
+        self.stopping = False
+        self._stopped = None
+
+    def worker_env(self, worker):
+        env = dict(self.env)
+        env.update({
+            "DISCORD_SHARDING": "auto",
+            "DISCORD_SHARD_COUNT": str(self.shard_count),
+            "DISCORD_SHARD_IDS": format_shard_ids(worker.shard_ids),
+            "DISCORD_WORKER_INDEX": str(worker.index),
+            "DISCORD_WORKERS": "1",  # los hijos no vuelven a supervisar
+        })
+        # El almacén en memoria no se comparte entre procesos
+        env.setdefault("SHARED_STORE", "sqlite")
+        return env
+
+    def identify_delay(self, worker):
+        """Tiempo que tardan en identificarse los shards de los workers anteriores"""
+        previous = sum(len(w.shard_ids) for w in self.workers[:worker.index])
+        return IDENTIFY_INTERVAL * previous / self.max_concurrency
+
+    async def run(self):
+        self._stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                pass
+
+        logger.info(f"Supervisando {len(self.workers)} procesos para {self.shard_count} shards")
+        await asyncio.gather(*(self.keep_alive(worker) for worker in self.workers))
+
+    async def keep_alive(self, worker):
+        # Arranque escalonado para no superar el límite de IDENTIFY entre procesos
+        await self.sleep(self.identify_delay(worker))
+        while not self.stopping:
+            started = time.monotonic()
+            worker.process = await asyncio.create_subprocess_exec(
+                sys.executable, self.script, env=self.worker_env(worker)
+            )
+            logger.info(f"{worker.name} iniciado (pid {worker.process.pid})")
+            code = await worker.process.wait()
+            if self.stopping:
+                break
+
+            if time.monotonic() - started >= STABLE_AFTER:
+                worker.failures = 0
+            worker.failures += 1
+            worker.restarts += 1
+            delay = min(RESTART_BACKOFF_MAX, 2 ** (worker.failures - 1))
+            logger.error(f"{worker.name} terminó con código {code}; reinicio #{worker.restarts} en {delay}s")
+            await self.sleep(delay)
+        logger.info(f"{worker.name} detenido")
+
+    async def sleep(self, delay):
+        """Espera `delay` segundos o hasta que se pida parar"""
+        try:
+            await asyncio.wait_for(self._stopped.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def stop(self):
+        self.stopping = True
+        self._stopped.set()
+        for worker in self.workers:
+            if worker.process is not None and worker.process.returncode is None:
+                worker.process.terminate()
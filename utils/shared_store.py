@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger('discord_bot.shared_store')
+
+
+class SharedStore:
+    """Almacén clave-valor con caducidad para el estado que comparten los procesos del bot.
+
+    Los valores deben poder serializarse a JSON. `shared` indica si el estado
+    es visible para otros procesos (si no, los cogs pueden ahorrarse guardar
+    copias de lo que ya tienen en memoria).
+    """
+
+    shared = False
+
+    async def start(self):
+        pass
+
+    async def get(self, key):
+        raise NotImplementedError
+
+    async def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    async def delete(self, key):
+        raise NotImplementedError
+
+    async def update(self, key, func):
+        """Lectura-modificación-escritura atómica: guarda y devuelve `func(valor actual o None)`.
+
+        `func` es una función normal (sin await) y puede ejecutarse en otro hilo.
+        """
+        raise NotImplementedError
+
+    async def incr(self, key, ttl, amount=1):
+        """Contador de ventana fija: suma `amount` y devuelve (valor, instante en que caduca).
+
+        La ventana empieza con el primer incremento y dura `ttl` segundos;
+        con `amount=0` solo se consulta.
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryStore(SharedStore):
+    """Implementación en memoria para un único proceso"""
+
+    def __init__(self):
+        self._data = {}  # {clave: (valor, caducidad o None)}
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        return item
+
+    async def get(self, key):
+        item = self._live(key, time.time())
+        return item[0] if item is not None else None
+
+    async def set(self, key, value, ttl=None):
+        self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    async def delete(self, key):
+        self._data.pop(key, None)
+
+    async def update(self, key, func):
+        value = func(await self.get(key))
+        await self.set(key, value)
+        return value
+
+    async def incr(self, key, ttl, amount=1):
+        now = time.time()
+        item = self._live(key, now)
+        value, expires_at = item if item is not None else (0, now + ttl)
+        if amount:
+            value += amount
+            self._data[key] = (value, expires_at)
+        return value, expires_at
+
+
+class SQLiteStore(SharedStore):
+    """Implementación en un fichero SQLite (modo WAL) compartido por los procesos de la máquina"""
+
+    shared = True
+
+    def __init__(self, path, cleanup_interval=300):
+        self.path = path
+        self.cleanup_interval = cleanup_interval
+        self.conn = None
+        self._lock = asyncio.Lock()
+        self._cleanup_task = None
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        return conn
+
+    async def start(self):
+        self.conn = await asyncio.to_thread(self._connect)
+        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def _run(self, func, *args):
+        # Una sola conexión: las operaciones se serializan en este proceso y SQLite las bloquea entre procesos
+        async with self._lock:
+            return await asyncio.to_thread(func, *args)
+
+    def _get(self, key, now):
+        row = self.conn.execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def get(self, key):
+        return await self._run(self._get, key, time.time())
+
+    async def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        await self._run(self.conn.execute, "INSERT OR REPLACE INTO kv VALUES (?, ?, ?)",
+                        (key, json.dumps(value), expires_at))
+
+    async def delete(self, key):
+        await self._run(self.conn.execute, "DELETE FROM kv WHERE key = ?", (key,))
+
+    def _update(self, key, func, now):
+        # BEGIN IMMEDIATE toma el bloqueo de escritura antes de leer: ningún otro proceso se cuela en medio
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            value = func(self._get(key, now))
+            self.conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, NULL)", (key, json.dumps(value)))
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return value
+
+    async def update(self, key, func):
+        return await self._run(self._update, key, func, time.time())
+
+    def _incr(self, key, ttl, amount, now):
+        # La ventana caducada se reinicia dentro de la misma sentencia, así que es atómico entre procesos
+        return self.conn.execute(
+            "INSERT INTO kv VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+            "value = CASE WHEN expires_at <= ? THEN excluded.value ELSE CAST(value AS INTEGER) + ? END, "
+            "expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END "
+            "RETURNING CAST(value AS INTEGER), expires_at",
+            (key, str(amount), now + ttl, now, amount, now)
+        ).fetchone()
+
+    async def incr(self, key, ttl, amount=1):
+        value, expires_at = await self._run(self._incr, key, ttl, amount, time.time())
+        return value, expires_at
+
+    async def _cleanup_loop(self):
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            try:
+                await self._run(self.conn.execute, "DELETE FROM kv WHERE expires_at <= ?", (time.time(),))
+            except sqlite3.Error as e:
+                logger.error(f"Error al limpiar el almacén compartido: {str(e)}")
+
+    async def close(self):
+        if self._cleanup_task:
+            self._cleanup_task.cancel()
+        if self.conn:
+            await asyncio.to_thread(self.conn.close)
+            self.conn = None
+
+
+def create_shared_store(kind, path):
+    """Crea el almacén configurado ('memory' o 'sqlite')"""
+    if kind == 'memory':
+        return MemoryStore()
+    if kind == 'sqlite':
+        return SQLiteStore(path)
+    raise ValueError(f"Almacén compartido desconocido: {kind}")
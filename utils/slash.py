@@ -0,0 +1,62 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+import discord
+
+from utils.files import atomic_write
+
+logger = logging.getLogger('discord_bot.slash')
+
+
+def tree_hash(tree, application_id):
+    """Huella de los comandos de barra tal y como se enviarían a Discord"""
+    payload = sorted((command.to_dict() for command in tree.get_commands()),
+                     key=lambda command: (command.get("type", 1), command["name"]))
+    data = json.dumps({"application_id": application_id, "commands": payload}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def load_sync_state(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo leer el estado de sincronización ({path}): {e}")
+        return {}
+
+
+async def sync_command_tree(tree, path, force=False):
+    """Sincroniza los comandos de barra solo si han cambiado desde la última sincronización.
+
+    La huella de lo sincronizado se guarda en `path`; si coincide con la del árbol
+    actual no se llama a la API, así los reinicios no gastan el límite de
+    sincronizaciones. Devuelve True si se ha sincronizado.
+    """
+    digest = tree_hash(tree, tree.client.application_id)
+    if not force and load_sync_state(path).get("hash") == digest:
+        logger.info("Comandos de barra sin cambios: no se sincronizan")
+        return False
+
+    start = time.perf_counter()
+    try:
+        synced = await tree.sync()
+    except discord.HTTPException as e:
+        logger.error(f"Error al sincronizar los comandos de barra: {e}")
+        return False
+    atomic_write(path, lambda f: json.dump({"hash": digest, "synced_at": time.time()}, f))
+    logger.info(f"{len(synced)} comandos de barra sincronizados en {(time.perf_counter() - start) * 1000:.0f}ms")
+    return True
+
+
+async def defer(ctx):
+    """Confirma la interacción de un comando de barra que puede tardar más de 3 segundos.
+
+    Con comandos de prefijo, o si ya se ha respondido, no hace nada.
+    """
+    if ctx.interaction is not None and not ctx.interaction.response.is_done():
+        await ctx.defer()
@@ -0,0 +1,99 @@
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from utils.files import atomic_write
+
+FEED_URL = "https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
+
+# Cuántos IDs vistos se conservan por fuente (el feed solo devuelve los 15 últimos)
+MAX_SEEN = 100
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_YT = "{http://www.youtube.com/xml/schemas/2015}"
+_MEDIA = "{http://search.yahoo.com/mrss/}"
+
+CHANNEL_ID_RE = re.compile(r"^UC[\w-]{22}$")
+CHANNEL_ID_IN_PAGE_RE = re.compile(r'(?:"channelId":"|/channel/)(UC[\w-]{22})')
+
+
+def parse_feed(text):
+    """Convierte el feed Atom de un canal en (título del canal, lista de videos).
+
+    Los videos se devuelven del más reciente al más antiguo.
+    """
+    root = ET.fromstring(text)
+    channel_title = root.findtext(f"{_ATOM}title", default="")
+    videos = []
+    for entry in root.iter(f"{_ATOM}entry"):
+        video_id = entry.findtext(f"{_YT}videoId")
+        if not video_id:
+            continue
+        thumbnail = entry.find(f"{_MEDIA}group/{_MEDIA}thumbnail")
+        videos.append({
+            "id": video_id,
+            "title": entry.findtext(f"{_ATOM}title", default="Sin título"),
+            "published": entry.findtext(f"{_ATOM}published", default=""),
+            "thumbnail": thumbnail.get("url") if thumbnail is not None else None,
+        })
+    return channel_title, videos
+
+
+class FeedSource:
+    """Estado de sondeo de un canal de YouTube, compartido por todos los suscriptores"""
+
+    __slots__ = ("channel_id", "title", "seen", "etag", "last_modified", "channels", "next_poll", "seeded")
+
+    def __init__(self, channel_id, title="", seen=(), etag=None, last_modified=None, channels=(), seeded=False):
+        self.channel_id = channel_id
+        self.title = title
+        self.seen = list(seen)  # IDs vistos, del más antiguo al más reciente
+        self.etag = etag
+        self.last_modified = last_modified
+        self.channels = set(channels)  # IDs de canales de texto suscritos
+        self.next_poll = 0.0
+        self.seeded = seeded  # False hasta el primer sondeo: no se anuncian videos antiguos
+
+    @property
+    def url(self):
+        return FEED_URL.format(channel_id=self.channel_id)
+
+    def mark_new(self, videos):
+        """Devuelve los videos no vistos (del más antiguo al más reciente) y los marca como vistos"""
+        seen = set(self.seen)
+        new = [video for video in reversed(videos) if video["id"] not in seen]
+        self.seen.extend(video["id"] for video in new)
+        del self.seen[:-MAX_SEEN]
+        return new
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "seen": self.seen,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "channels": sorted(self.channels),
+            "seeded": self.seeded,
+        }
+
+
+class FeedStore:
+    """Persistencia en JSON de las fuentes suscritas y los videos ya vistos"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        return {
+            channel_id: FeedSource(channel_id, **fields)
+            for channel_id, fields in data.get("sources", {}).items()
+        }
+
+    def save(self, sources):
+        data = {"sources": {channel_id: source.to_dict() for channel_id, source in sources.items()}}
+        atomic_write(self.path, lambda f: json.dump(data, f))